@@ -0,0 +1,193 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from telegram.error import RetryAfter
+from metrics import TELEGRAM_LATENCY, TELEGRAM_MESSAGES, TELEGRAM_QUEUE
+from ratelimit import RateLimiter
+
+# Порог открытия, гистерезис закрытия и шаг "расширения" - в процентах чистой прибыли
+ALERT_THRESHOLD = 0.5
+ALERT_HYSTERESIS = 0.2
+ALERT_WIDEN_STEP = 0.25
+# Не чаще одного уведомления по одной возможности за ALERT_COOLDOWN секунд
+ALERT_COOLDOWN = 300
+
+# Лимиты Telegram: ~30 сообщений/с на бота и ~1 сообщение/с в один чат
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_CHAT_INTERVAL = 1.0
+SENDER_WORKERS = 8
+TELEGRAM_MAX_LENGTH = 4000
+
+OPENED = 'opened'
+WIDENED = 'widened'
+CLOSED = 'closed'
+
+OpportunityKey = Tuple[str, str, str]
+
+
+class AlertTracker:
+    # Отслеживает состояние возможностей между тиками и выдает только переходы:
+    # открылась / расширилась / закрылась. Время передается снаружи, чтобы работать и в реплее.
+    def __init__(self, threshold: float = ALERT_THRESHOLD, hysteresis: float = ALERT_HYSTERESIS,
+                 widen_step: float = ALERT_WIDEN_STEP, cooldown: float = ALERT_COOLDOWN):
+        self.threshold = threshold
+        self.close_threshold = threshold - hysteresis
+        self.widen_step = widen_step
+        self.cooldown = cooldown
+        # {(символ, биржа покупки, биржа продажи): состояние}
+        self.open: Dict[OpportunityKey, Dict] = {}
+        self.last_alert: Dict[OpportunityKey, float] = {}
+
+    def _cooled_down(self, key: OpportunityKey, now: float) -> bool:
+        last = self.last_alert.get(key)
+        return last is None or now - last >= self.cooldown
+
+    def update(self, snapshot: Dict[str, Dict], now: float) -> List[Dict]:
+        events = []
+        current: Dict[OpportunityKey, Dict] = {}
+        for symbol_key, entry in snapshot.items():
+            for opp in entry['opportunities']:
+                current[(symbol_key, opp['buy_exchange'], opp['sell_exchange'])] = opp
+
+        for key, opp in current.items():
+            value = opp.get('net_percent', opp['difference'])
+            state = self.open.get(key)
+
+            if state is None:
+                if value < self.threshold:
+                    continue
+                state = self.open[key] = {'opened_at': now, 'announced': False, 'alerted': value, 'peak': value}
+            elif value < self.close_threshold:
+                continue  # закроется ниже
+
+            state['opportunity'] = opp
+            state['peak'] = max(state['peak'], value)
+            if not self._cooled_down(key, now):
+                continue
+
+            if not state['announced']:
+                events.append(self._event(OPENED, key, state, value))
+                state['announced'] = True
+            elif value >= state['alerted'] + self.widen_step:
+                events.append(self._event(WIDENED, key, state, value))
+            else:
+                continue
+            state['alerted'] = value
+            self.last_alert[key] = now
+
+        # Закрываем то, что упало ниже порога с гистерезисом или пропало из снимка.
+        # Символы, по которым в этом тике нет данных, и пары с биржей без данных в этом тике не трогаем:
+        # возможность пропала из снимка из-за опоздания биржи, а не из-за цены.
+        for key in list(self.open):
+            opp = current.get(key)
+            entry = snapshot.get(key[0])
+            if entry is None:
+                continue
+            stale = entry.get('stale')
+            if opp is None and stale and (key[1] in stale or key[2] in stale):
+                continue
+            if opp is not None and opp.get('net_percent', opp['difference']) >= self.close_threshold:
+                continue
+            state = self.open.pop(key)
+            if state['announced']:
+                event = self._event(CLOSED, key, state, opp.get('net_percent', opp['difference']) if opp else None)
+                event['duration'] = now - state['opened_at']
+                events.append(event)
+
+        return events
+
+    def _event(self, kind: str, key: OpportunityKey, state: Dict, value: Optional[float]) -> Dict:
+        return {
+            'type': kind,
+            'symbol': key[0],
+            'buy_exchange': key[1],
+            'sell_exchange': key[2],
+            'percent': value,
+            'previous': state['alerted'],
+            'peak': state['peak'],
+            'opportunity': state['opportunity']
+        }
+
+
+def format_alerts_messages(events: List[Dict], symbols: Dict[str, Dict]) -> List[str]:
+    # Все переходы за тик одним сообщением; если не влезает в лимит Telegram - несколькими
+    header = f"🔔 <b>АРБИТРАЖ</b>\n⏰ {datetime.now().strftime('%H:%M:%S')}\n"
+    messages = [header]
+    for event in events:
+        name = symbols.get(event['symbol'], {}).get('name', event['symbol'])
+        route = f"{event['buy_exchange']} → {event['sell_exchange']}"
+        opp = event['opportunity']
+        if event['type'] == OPENED:
+            line = f"\n🟢 <b>{name}</b> {route}: <b>{event['percent']:.2f}%</b>\n"
+            if 'net_profit' in opp:
+                line += f"└ ${opp['net_profit']:.2f} на ${opp['notional']:.0f}\n"
+        elif event['type'] == WIDENED:
+            line = f"\n📈 <b>{name}</b> {route}: {event['previous']:.2f}% → <b>{event['percent']:.2f}%</b>\n"
+        else:
+            line = f"\n🔴 <b>{name}</b> {route}: закрылась, максимум {event['peak']:.2f}%"
+            line += f" за {event['duration'] / 60:.0f} мин\n"
+
+        if len(messages[-1]) + len(line) > TELEGRAM_MAX_LENGTH:
+            messages.append(header)
+        messages[-1] += line
+    return messages
+
+
+class AlertSender:
+    # Очередь отправки с общим лимитом бота и интервалом на чат; несколько воркеров
+    # рассылают по разным чатам параллельно.
+    def __init__(self, bot=None, workers: int = SENDER_WORKERS):
+        self.bot = bot
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.limiter = RateLimiter(TELEGRAM_GLOBAL_RATE, 1.0)
+        self._next_allowed: Dict[int, float] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.sent = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def send(self, chat_id: int, text: str):
+        self.queue.put_nowait((chat_id, text))
+        TELEGRAM_QUEUE.set(self.queue.qsize())
+
+    async def _worker(self):
+        while True:
+            chat_id, text = await self.queue.get()
+            try:
+                # Резервируем слот в чате до ожидания, чтобы два воркера не отправили в один чат разом
+                now = time.monotonic()
+                slot = max(now, self._next_allowed.get(chat_id, 0.0))
+                self._next_allowed[chat_id] = slot + TELEGRAM_CHAT_INTERVAL
+                if slot > now:
+                    await asyncio.sleep(slot - now)
+
+                await self.limiter.acquire()
+                started = time.perf_counter()
+                await self.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+                TELEGRAM_LATENCY.observe(time.perf_counter() - started)
+                TELEGRAM_MESSAGES.inc('ok')
+                self.limiter.on_response(200)
+                self.sent += 1
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+                TELEGRAM_MESSAGES.inc('retry_after')
+                self.limiter.on_response(429, retry_after=float(retry_after))
+                self.queue.put_nowait((chat_id, text))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                TELEGRAM_MESSAGES.inc('error')
+                print(f"Ошибка отправки в чат {chat_id}: {e}")
+            finally:
+                self.queue.task_done()
+                TELEGRAM_QUEUE.set(self.queue.qsize())
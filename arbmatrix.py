@@ -0,0 +1,102 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Сколько лучших возможностей оставлять на символ
+TOP_K = 10
+
+# Режимы расчета спреда:
+# 'last'       - разница последних цен, как в исходном попарном цикле
+# 'executable' - лучший ask на бирже покупки против лучшего bid на бирже продажи, в обе стороны
+MODE_LAST = 'last'
+MODE_EXECUTABLE = 'executable'
+
+
+def to_arrays(prices_by_symbol: List[List[Dict]]) -> Tuple[List[List[str]], np.ndarray, np.ndarray, np.ndarray]:
+    # Матрицы символы × биржи; биржи идут в порядке списка цен символа, пустые ячейки = NaN
+    n_symbols = len(prices_by_symbol)
+    n_venues = max((len(p) for p in prices_by_symbol), default=0)
+    last = np.full((n_symbols, n_venues), np.nan)
+    bid = np.full((n_symbols, n_venues), np.nan)
+    ask = np.full((n_symbols, n_venues), np.nan)
+    exchanges = []
+
+    for s, prices in enumerate(prices_by_symbol):
+        exchanges.append([p['exchange'] for p in prices])
+        for v, p in enumerate(prices):
+            last[s, v] = p['price']
+            bid[s, v] = p['bid']
+            ask[s, v] = p['ask']
+
+    return exchanges, last, bid, ask
+
+
+def spread_matrix(last: np.ndarray, bid: np.ndarray, ask: np.ndarray, mode: str = MODE_LAST) -> np.ndarray:
+    # Массив [символ, биржа покупки, биржа продажи] со спредом в процентах; NaN = пары нет
+    n_venues = last.shape[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if mode == MODE_EXECUTABLE:
+            buy = np.where(ask > 0, ask, np.nan)[:, :, None]
+            sell = np.where(bid > 0, bid, np.nan)[:, None, :]
+            spread = (sell - buy) / buy * 100
+            pair_mask = ~np.eye(n_venues, dtype=bool)
+        else:
+            price = np.where(last > 0, last, np.nan)
+            spread = np.abs((price[:, None, :] - price[:, :, None]) / price[:, :, None] * 100)
+            pair_mask = np.triu(np.ones((n_venues, n_venues), dtype=bool), k=1)
+    spread[:, ~pair_mask] = np.nan
+    return spread
+
+
+def top_opportunities(prices_by_symbol: List[List[Dict]], mode: str = MODE_LAST,
+                      top_k: Optional[int] = TOP_K) -> List[List[Dict]]:
+    # Все символы за один проход: матрица спредов и top-K через argpartition вместо полной сортировки
+    if not prices_by_symbol:
+        return []
+    exchanges, last, bid, ask = to_arrays(prices_by_symbol)
+    n_symbols, n_venues = last.shape
+    if n_venues < 2:
+        return [[] for _ in prices_by_symbol]
+
+    spread = spread_matrix(last, bid, ask, mode)
+    flat = spread.reshape(n_symbols, n_venues * n_venues)
+    score = np.where(np.isnan(flat), -np.inf, flat)
+
+    k = flat.shape[1] if top_k is None else min(top_k, flat.shape[1])
+    if k < flat.shape[1]:
+        candidates = np.argpartition(-score, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(flat.shape[1]), (n_symbols, flat.shape[1]))
+
+    if mode == MODE_LAST:
+        raw = (last[:, None, :] - last[:, :, None]).reshape(n_symbols, -1)
+
+    results = []
+    for s in range(n_symbols):
+        idx = candidates[s]
+        if k < flat.shape[1]:
+            # argpartition выбирает среди равных на границе произвольно - добираем все равные k-му
+            idx = np.flatnonzero(score[s] >= score[s, idx].min())
+        # По убыванию спреда, при равенстве - в порядке пар (i, j), как стабильная сортировка
+        idx = idx[np.lexsort((idx, -score[s, idx]))][:k]
+        opportunities = []
+        for flat_idx in idx:
+            if score[s, flat_idx] == -np.inf:
+                break
+            i, j = divmod(int(flat_idx), n_venues)
+            if mode == MODE_LAST:
+                buy_price, sell_price = last[s, i], last[s, j]
+                direction = 'BUY' if raw[s, flat_idx] > 0 else 'SELL'
+            else:
+                buy_price, sell_price = ask[s, i], bid[s, j]
+                direction = 'BUY'
+            opportunities.append({
+                'buy_exchange': exchanges[s][i],
+                'sell_exchange': exchanges[s][j],
+                'buy_price': float(buy_price),
+                'sell_price': float(sell_price),
+                'difference': float(flat[s, flat_idx]),
+                'profit_direction': direction
+            })
+        results.append(opportunities)
+
+    return results
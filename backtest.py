@@ -0,0 +1,190 @@
+# Офлайн-реплей: прогоняет записанные (или синтетические) тики через тот же поиск
+# возможностей и AlertTracker, что и бот, без сети, Telegram и реального времени.
+# Запуск: python backtest.py --store ticks [--start 2024-05-01 --end 2024-05-08 --symbols BTC,ETH]
+#         python backtest.py --synthetic 20000 [--symbols BTC,ETH,BNB,SOL]
+import argparse
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from alerts import (ALERT_COOLDOWN, ALERT_HYSTERESIS, ALERT_THRESHOLD, ALERT_WIDEN_STEP, CLOSED, OPENED,
+                    WIDENED, AlertTracker)
+from bot import SYMBOLS, ArbitrageBot
+from tickstore import TickReader
+
+# Тик реплея: (виртуальное время, {символ: [цены бирж]}) - формат monitor_all
+Tick = Tuple[float, Dict[str, List[Dict]]]
+
+
+def _price(exchange: str, symbol: str, bid: float, ask: float, last: float, volume: float) -> Dict:
+    return {'exchange': exchange, 'symbol': symbol, 'price': last, 'volume': volume, 'bid': bid, 'ask': ask}
+
+
+def store_ticks(root: str, start: float, end: float, symbols: Optional[List[str]],
+                venues: Optional[List[str]]) -> Iterator[Tick]:
+    # Записи с одинаковым ts - один тик; тик может начинаться в одном чанке и заканчиваться в следующем
+    reader = TickReader(root)
+    venue_names, symbol_names = reader.names['venues'], reader.names['symbols']
+    current_ts, results = None, {}
+    for chunk in reader.scan(start, end, symbols, venues):
+        columns = zip(*(chunk[name].tolist() for name in ('ts', 'venue', 'symbol', 'bid', 'ask', 'last', 'volume')))
+        for ts, venue, symbol, bid, ask, last, volume in columns:
+            if ts != current_ts:
+                if results:
+                    yield current_ts, results
+                current_ts, results = ts, {}
+            symbol = symbol_names[symbol]
+            results.setdefault(symbol, []).append(_price(venue_names[venue], symbol, bid, ask, last, volume))
+    if results:
+        yield current_ts, results
+
+
+def synthetic_ticks(bot: ArbitrageBot, symbols: List[str], ticks: int, interval: float,
+                    seed: int) -> Iterator[Tick]:
+    # Случайное блуждание справедливой цены, шум по биржам и редкие перекосы одной биржи
+    rng = random.Random(seed)
+    venues = [adapter.name for adapter in bot.adapters.values()]
+    fair = {symbol: rng.uniform(1, 60000) for symbol in symbols}
+    skew: Dict[Tuple[str, str], Tuple[float, int]] = {}
+    ts = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+    for _ in range(ticks):
+        ts += interval
+        results = {}
+        for symbol in symbols:
+            fair[symbol] *= 1 + rng.gauss(0, 0.0005)
+            prices = []
+            for venue in venues:
+                shift, left = skew.get((symbol, venue), (0.0, 0))
+                if left:
+                    skew[(symbol, venue)] = (shift, left - 1)
+                elif rng.random() < 0.002:
+                    skew[(symbol, venue)] = (rng.choice((-1, 1)) * rng.uniform(0.005, 0.02), rng.randint(1, 30))
+                mid = fair[symbol] * (1 + shift + rng.gauss(0, 0.0003))
+                half = mid * rng.uniform(0.00005, 0.0005)
+                prices.append(_price(venue, symbol, mid - half, mid + half, mid, rng.uniform(1e3, 1e6)))
+            results[symbol] = prices
+        yield ts, results
+
+
+def replay(bot: ArbitrageBot, tracker: AlertTracker, ticks: Iterator[Tick], symbols: Dict[str, Dict],
+           cycles: bool = False) -> Dict:
+    # Тот же путь, что и в _refresh, но без стаканов: чистая прибыль по лучшим ценам и комиссиям
+    stats = {'ticks': 0, 'records': 0, 'events': Counter(), 'episodes': [], 'pnl': 0.0,
+             'routes': defaultdict(Counter), 'cycles': 0, 'first_ts': None, 'last_ts': None}
+    opened: Dict[Tuple[str, str, str], float] = {}
+    started = time.perf_counter()
+
+    for ts, results in ticks:
+        results = {
+            key: [p for p in prices if p['exchange'] in bot.venue_keys]
+            for key, prices in results.items()
+        }
+        for key in results:
+            if key not in symbols:
+                symbols[key] = {'name': f'{key}/USDT'}
+        stats['ticks'] += 1
+        stats['records'] += sum(len(prices) for prices in results.values())
+        if stats['first_ts'] is None:
+            stats['first_ts'] = ts
+        stats['last_ts'] = ts
+
+        opportunities = bot.score_candidates(results, bot.find_candidates(symbols, results), {})
+        snapshot = bot.build_snapshot(results, opportunities)
+        if cycles:
+            stats['cycles'] += len(bot.update_graph(symbols, results))
+
+        for event in tracker.update(snapshot, ts):
+            route = (event['symbol'], event['buy_exchange'], event['sell_exchange'])
+            stats['events'][event['type']] += 1
+            if event['type'] == OPENED:
+                opened[route] = ts
+                stats['pnl'] += event['opportunity'].get('net_profit', 0.0)
+                stats['routes'][event['symbol']][route[1:]] += 1
+            elif event['type'] == CLOSED:
+                opened.pop(route, None)
+                stats['episodes'].append(event['duration'])
+
+    stats['wall'] = time.perf_counter() - started
+    stats['still_open'] = len(opened)
+    return stats
+
+
+def print_report(stats: Dict, symbols: Dict[str, Dict]):
+    wall = stats['wall'] or 1e-9
+    print("📊 ОТЧЕТ РЕПЛЕЯ")
+    if stats['first_ts'] is not None:
+        first = datetime.fromtimestamp(stats['first_ts'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        last = datetime.fromtimestamp(stats['last_ts'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"Период: {first} — {last} UTC")
+    print(f"Тиков: {stats['ticks']}, записей: {stats['records']}, за {wall:.2f} с")
+    print(f"Скорость: {stats['ticks'] / wall:.0f} тиков/с, {stats['records'] / wall:.0f} записей/с")
+
+    events = stats['events']
+    print(f"Открылось: {events[OPENED]}, расширилось: {events[WIDENED]}, закрылось: {events[CLOSED]}, "
+          f"открыто в конце: {stats['still_open']}")
+    episodes = stats['episodes']
+    if episodes:
+        print(f"Длительность: средняя {statistics.mean(episodes):.0f} с, медиана {statistics.median(episodes):.0f} с, "
+              f"максимум {max(episodes):.0f} с")
+    print(f"Оценка PnL (чистая прибыль на момент открытия): ${stats['pnl']:.2f}")
+    if stats['cycles']:
+        print(f"Циклов найдено (сумма по тикам): {stats['cycles']}")
+
+    for symbol, routes in sorted(stats['routes'].items()):
+        name = symbols.get(symbol, {}).get('name', symbol)
+        top = ', '.join(f"{buy} → {sell} ({n})" for (buy, sell), n in routes.most_common(3))
+        print(f"  {name}: {top}")
+
+
+def _parse_time(value: Optional[str], default: float) -> float:
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--store', help='каталог TickRecorder')
+    parser.add_argument('--synthetic', type=int, default=0, help='число синтетических тиков вместо записи')
+    parser.add_argument('--interval', type=float, default=1.0, help='шаг синтетических тиков (сек)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--start', help='начало: ISO-дата или unix-время (UTC)')
+    parser.add_argument('--end', help='конец: ISO-дата или unix-время (UTC)')
+    parser.add_argument('--symbols', help='через запятую, например BTC,ETH')
+    parser.add_argument('--venues', help='через запятую, например Binance,OKX')
+    parser.add_argument('--notional', type=float, default=1000.0)
+    parser.add_argument('--threshold', type=float, default=ALERT_THRESHOLD)
+    parser.add_argument('--hysteresis', type=float, default=ALERT_HYSTERESIS)
+    parser.add_argument('--widen-step', type=float, default=ALERT_WIDEN_STEP)
+    parser.add_argument('--cooldown', type=float, default=ALERT_COOLDOWN)
+    parser.add_argument('--cycles', action='store_true', help='также обновлять граф циклов')
+    args = parser.parse_args()
+
+    if not args.store and not args.synthetic:
+        parser.error('нужен --store или --synthetic')
+
+    symbols = {key: dict(config) for key, config in SYMBOLS.items()}
+    selected = args.symbols.split(',') if args.symbols else None
+    venues = args.venues.split(',') if args.venues else None
+
+    bot = ArbitrageBot()
+    bot.notional = args.notional
+    tracker = AlertTracker(args.threshold, args.hysteresis, args.widen_step, args.cooldown)
+
+    if args.synthetic:
+        ticks = synthetic_ticks(bot, selected or list(symbols), args.synthetic, args.interval, args.seed)
+    else:
+        ticks = store_ticks(args.store, _parse_time(args.start, 0.0), _parse_time(args.end, float('inf')),
+                            selected, venues)
+
+    print_report(replay(bot, tracker, ticks, symbols, cycles=args.cycles), symbols)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# Стоимость инкрементального обновления графа циклов на тик против полного пересчета.
+# Часть котировок идет с перекосом (появляются настоящие циклы), часть пар пропадает на тик
+# (сбой биржи): сверка с Bellman-Ford проверяет и обнаружение, и удаление устаревших ребер.
+# Запуск из корня репозитория: python -m benchmarks.bench_cycles [--venues 8 --assets 60 --ticks 200]
+import argparse
+import math
+import random
+import sys
+import time
+
+from cycles import ArbitrageGraph
+
+
+def make_market(venues: int, assets: int, seed: int):
+    # Каждый актив торгуется к USDT и к BTC на каждой бирже
+    rng = random.Random(seed)
+    fair = {'USDT': 1.0, 'BTC': 60000.0}
+    for i in range(assets):
+        fair[f'A{i}'] = rng.uniform(0.01, 1000)
+
+    pairs = []
+    for v in range(venues):
+        for asset in fair:
+            if asset in ('USDT', 'BTC'):
+                continue
+            pairs.append((f'V{v}', asset, 'USDT'))
+            pairs.append((f'V{v}', asset, 'BTC'))
+        pairs.append((f'V{v}', 'BTC', 'USDT'))
+    return fair, pairs, rng
+
+
+def quote(fair, base, quote_asset, rng, noise, skew_rate=0.0, skew=0.0):
+    mid = fair[base] / fair[quote_asset] * (1 + rng.gauss(0, noise))
+    if rng.random() < skew_rate:
+        mid *= 1 + rng.choice((-1, 1)) * skew
+    return mid * (1 - 0.0005), mid * (1 + 0.0005)
+
+
+def bellman_ford_has_cycle(graph: ArbitrageGraph) -> bool:
+    dist = {node: 0.0 for node in graph.edges}
+    for _ in range(len(dist)):
+        changed = False
+        for u, out in graph.edges.items():
+            for v, w in out.items():
+                if dist[u] + w < dist[v] - 1e-12:
+                    dist[v] = dist[u] + w
+                    changed = True
+        if not changed:
+            return False
+    return True
+
+
+def cycle_edges_present(graph: ArbitrageGraph, cycles) -> bool:
+    # Каждое ребро найденного цикла есть в графе (нет циклов по удаленным ценам)
+    return all(b in graph.edges.get(a, {}) for cycle in cycles for a, b in zip(cycle['path'], cycle['path'][1:]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--venues', type=int, default=8)
+    parser.add_argument('--assets', type=int, default=60)
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--changes', type=int, default=50, help='тикеров меняется за тик')
+    parser.add_argument('--noise', type=float, default=0.0003)
+    parser.add_argument('--skew-rate', type=float, default=0.01, help='доля котировок с перекосом')
+    parser.add_argument('--skew', type=float, default=0.01, help='величина перекоса (доля цены)')
+    parser.add_argument('--drops', type=int, default=5, help='пар пропадает за тик (сбой биржи)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    fair, pairs, rng = make_market(args.venues, args.assets, args.seed)
+    graph = ArbitrageGraph()
+    fee = 0.001
+
+    started = time.perf_counter()
+    for venue, base, quote_asset in pairs:
+        bid, ask = quote(fair, base, quote_asset, rng, args.noise)
+        graph.update_ticker(venue, base, quote_asset, bid, ask, fee)
+    graph.revalidate()
+    build = time.perf_counter() - started
+
+    tick_times = []
+    mismatches = checked = with_cycles = 0
+    for tick in range(args.ticks):
+        changed = rng.sample(pairs, min(args.changes, len(pairs)))
+        # Пропавшие пары возвращаются, когда снова попадут в changed
+        dropped = rng.sample(pairs, min(args.drops, len(pairs)))
+        started = time.perf_counter()
+        for venue, base, quote_asset in changed:
+            bid, ask = quote(fair, base, quote_asset, rng, args.noise, args.skew_rate, args.skew)
+            graph.update_ticker(venue, base, quote_asset, bid, ask, fee)
+        for venue, base, quote_asset in dropped:
+            graph.remove_ticker(venue, base, quote_asset)
+        cycles = graph.revalidate()
+        tick_times.append(time.perf_counter() - started)
+
+        # Сверка с полным Bellman-Ford на части тиков
+        if tick % 20 == 0:
+            checked += 1
+            expected = bellman_ford_has_cycle(graph)
+            with_cycles += expected
+            if bool(cycles) != expected or not cycle_edges_present(graph, cycles):
+                mismatches += 1
+
+    started = time.perf_counter()
+    bellman_ford_has_cycle(graph)
+    full = time.perf_counter() - started
+
+    # Рынок без перекосов: циклов нет, и инкрементальный граф должен это увидеть
+    for venue, base, quote_asset in pairs:
+        bid, ask = quote(fair, base, quote_asset, rng, args.noise)
+        graph.update_ticker(venue, base, quote_asset, bid, ask, fee)
+    clean = graph.revalidate()
+    clean_expected = bellman_ford_has_cycle(graph)
+    checked += 1
+    with_cycles += clean_expected
+    mismatches += bool(clean) != clean_expected or clean_expected
+
+    # Одна биржа продает актив на 3% дешевле: цикл есть; биржа пропала - цикла по ее цене нет
+    venue, base, quote_asset = pairs[0]
+    bid, ask = quote(fair, base, quote_asset, rng, 0.0)
+    graph.update_ticker(venue, base, quote_asset, bid * 0.97, ask * 0.97, fee)
+    stale = graph.revalidate()
+    graph.remove_ticker(venue, base, quote_asset)
+    removed = graph.revalidate()
+    checked += 2
+    with_cycles += 1
+    mismatches += not stale or bool(removed) or bellman_ford_has_cycle(graph)
+
+    tick_times.sort()
+    n_edges = sum(len(out) for out in graph.edges.values())
+    print(f"Узлов: {len(graph.edges)}, ребер: {n_edges}, пар: {len(pairs)}")
+    print(f"Построение графа: {build * 1000:.1f} мс")
+    print(f"Тик ({args.changes} тикеров): p50 {tick_times[len(tick_times) // 2] * 1000:.3f} мс, "
+          f"p99 {tick_times[math.ceil(len(tick_times) * 0.99) - 1] * 1000:.3f} мс")
+    print(f"На одно обновление тикера: {sum(tick_times) / (args.ticks * args.changes) * 1e6:.1f} мкс")
+    print(f"Полный пересчет Bellman-Ford: {full * 1000:.1f} мс")
+    print(f"Релаксаций всего: {graph.relaxations}")
+    print(f"Перекос одной цены: циклов {len(stale)}, после удаления пары: {len(removed)}")
+    print(f"Сверок с Bellman-Ford: {checked}, из них с циклом: {with_cycles}, расхождений: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
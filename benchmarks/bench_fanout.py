@@ -0,0 +1,93 @@
+# Раскладка уведомлений по чатам: индекс (символ, корзина порога) -> чаты против перебора всех
+# чатов на каждое событие. Чаты со случайными списками пар, порогами и периодами сводки,
+# снимки синтетические, без сети и Telegram.
+# Запуск из корня репозитория: python -m benchmarks.bench_fanout [--chats 1000,10000,50000]
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from subscriptions import Subscriptions, bucket_of
+
+POLL_INTERVAL = 60
+
+
+def make_subscriptions(n_chats: int, symbols: List[str], seed: int) -> Subscriptions:
+    rng = random.Random(seed)
+    subscriptions = Subscriptions(POLL_INTERVAL)
+    for chat_id in range(n_chats):
+        subscriptions.subscribe(chat_id)
+        subscriptions.set_threshold(chat_id, rng.choice((0.5, 0.5, 1.0, 2.0)))
+        subscriptions.set_interval(chat_id, rng.choice((60, 60, 300, 900)))
+        # Четверть чатов следит за всеми парами, остальные - за 1-5 парами
+        if rng.random() > 0.25:
+            subscriptions.set_watchlist(chat_id, rng.sample(symbols, rng.randint(1, 5)))
+    return subscriptions
+
+
+def make_snapshots(symbols: List[str], ticks: int, seed: int) -> List[Dict[str, Dict]]:
+    # Спред каждой пары - случайное блуждание: возможности открываются и закрываются
+    rng = random.Random(seed)
+    spread = {symbol: rng.uniform(-1, 1) for symbol in symbols}
+    snapshots = []
+    for _ in range(ticks):
+        for symbol in symbols:
+            spread[symbol] = max(-1.0, min(3.0, spread[symbol] + rng.gauss(0, 0.4)))
+        snapshots.append({symbol: {'opportunities': [{
+            'buy_exchange': 'Binance', 'sell_exchange': 'OKX', 'difference': value, 'net_percent': value
+        }]} for symbol, value in spread.items()})
+    return snapshots
+
+
+def scan_update(subscriptions: Subscriptions, snapshot: Dict[str, Dict], now: float) -> int:
+    # Перебор: на каждое событие проверяются все включенные чаты
+    matched = 0
+    for bucket, tracker in subscriptions.trackers.items():
+        for event in tracker.update(snapshot, now):
+            for chat_id, chat in subscriptions.chats.items():
+                if not chat['enabled'] or bucket_of(chat['threshold']) != bucket:
+                    continue
+                if chat['symbols'] and event['symbol'] not in chat['symbols']:
+                    continue
+                subscriptions._queue(chat_id, event)
+                matched += 1
+    return matched
+
+
+def run_case(n_chats: int, symbols: List[str], snapshots: List[Dict[str, Dict]], indexed: bool, seed: int) -> Dict:
+    subscriptions = make_subscriptions(n_chats, symbols, seed)
+    durations, delivered = [], 0
+    for i, snapshot in enumerate(snapshots):
+        now = float(i) * POLL_INTERVAL
+        started = time.process_time()
+        if indexed:
+            subscriptions.update(snapshot, now)
+        else:
+            scan_update(subscriptions, snapshot, now)
+        ready = subscriptions.deliveries(now)
+        durations.append(time.process_time() - started)
+        delivered += len(ready)
+    return {'ms': statistics.mean(durations) * 1000, 'deliveries': delivered / len(snapshots)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chats', default='1000,10000,50000', help='сетка числа чатов')
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--ticks', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    symbols = [f'S{i:03d}' for i in range(args.symbols)]
+    snapshots = make_snapshots(symbols, args.ticks, args.seed)
+    print(f"{'чатов':>7} {'сводок/тик':>11} {'перебор мс':>11} {'индекс мс':>10} {'ускорение':>10}")
+    for n_chats in (int(x) for x in args.chats.split(',')):
+        scan = run_case(n_chats, symbols, snapshots, False, args.seed)
+        index = run_case(n_chats, symbols, snapshots, True, args.seed)
+        print(f"{n_chats:>7} {index['deliveries']:>11.0f} {scan['ms']:>11.2f} {index['ms']:>10.2f} "
+              f"{scan['ms'] / index['ms']:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# Сквозной замер тика: опрос бирж (локальные заглушки) -> поиск возможностей -> уведомления и
+# форматирование для чатов. Сетка по числу символов и чатов, сравнение с сохраненной базой.
+# Чаты - подписки Subscriptions с разными порогами и списками пар, рассылка - та же, что в боте.
+# Запуск из корня репозитория:
+#   python -m benchmarks.bench_hot_path                   # замер и сверка с benchmarks/baseline.json
+#   python -m benchmarks.bench_hot_path --save-baseline   # перезаписать базу на этой машине
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+import aiohttp
+
+from benchmarks.fake_exchanges import make_symbols, spawn_servers
+from bot import POLL_INTERVAL, ArbitrageBot, fan_out_alerts
+from ratelimit import RateLimiter
+from subscriptions import Subscriptions
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Метрики, которые сравниваются с базой; рост больше допуска = регрессия
+CHECKED = ('p95_ms', 'cpu_ms', 'requests_per_tick')
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * q) - 1)]
+
+
+async def server_requests(session: aiohttp.ClientSession, urls: Dict[str, str]) -> int:
+    total = 0
+    for url in urls.values():
+        async with session.get(url + '/__stats') as resp:
+            total += (await resp.json())['requests']
+    return total
+
+
+def make_subscriptions(n_chats: int, symbols: Dict[str, Dict], seed: int = 1) -> Subscriptions:
+    # Половина чатов на пороге по умолчанию, остальные выше; четверть следит за всеми парами.
+    # Период сводки - тик опроса, чтобы каждый тик доходил до доставки
+    rng = random.Random(seed)
+    subscriptions = Subscriptions(POLL_INTERVAL)
+    for chat_id in range(n_chats):
+        subscriptions.subscribe(chat_id)
+        subscriptions.set_threshold(chat_id, rng.choice((0.5, 0.5, 1.0, 2.0)))
+        if rng.random() > 0.25:
+            subscriptions.set_watchlist(chat_id, rng.sample(list(symbols), min(len(symbols), rng.randint(1, 5))))
+    return subscriptions
+
+
+async def run_case(urls: Dict[str, str], n_symbols: int, n_chats: int, ticks: int, interactive: float) -> Dict:
+    symbols = make_symbols(n_symbols)
+    bot = ArbitrageBot(base_urls=urls)
+    await bot.init_session()
+    # Бюджеты бирж здесь не меряем: лимитер не должен растягивать тик
+    for adapter in bot.adapters.values():
+        adapter.limiter = RateLimiter(1e9, 1.0)
+    subscriptions = make_subscriptions(n_chats, symbols)
+    viewers = max(1, int(n_chats * interactive)) if interactive else 0
+    outbox = []
+
+    async def tick(now: float):
+        snapshot = await bot.refresh_snapshot(symbols)
+        # Рассылка: переходы по корзинам порогов, индекс чатов, очередь сводок и общий текст
+        # для одинаковых наборов событий - как publish_alerts
+        outbox.extend(fan_out_alerts(subscriptions, snapshot, symbols, now))
+        # Часть чатов открывает "все пары" и получает отформатированный снимок
+        for _ in range(viewers):
+            for symbol_key, entry in snapshot.items():
+                if entry['prices']:
+                    bot.format_telegram_message(symbols[symbol_key]['name'], entry['prices'], entry['opportunities'])
+
+    async with aiohttp.ClientSession() as stats_session:
+        try:
+            for i in range(2):
+                await tick(float(i) * POLL_INTERVAL)
+            requests_before = await server_requests(stats_session, urls)
+
+            latencies, cpu = [], 0.0
+            started = time.perf_counter()
+            for i in range(ticks):
+                wall, proc = time.perf_counter(), time.process_time()
+                await tick(float(i + 2) * POLL_INTERVAL)
+                cpu += time.process_time() - proc
+                latencies.append(time.perf_counter() - wall)
+            elapsed = time.perf_counter() - started
+            requests = await server_requests(stats_session, urls) - requests_before
+        finally:
+            await bot.close_session()
+
+    return {
+        'symbols': n_symbols,
+        'chats': n_chats,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'cpu_ms': cpu / ticks * 1000,
+        'requests_per_s': requests / elapsed,
+        'requests_per_tick': requests / ticks,
+        'deliveries': len(outbox) / ticks
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in CHECKED:
+            # Небольшой абсолютный запас, чтобы не ловить шум на крошечных значениях
+            limit = base[metric] * (1 + tolerance) + (0.5 if metric.endswith('_ms') else 0)
+            if result[metric] > limit:
+                regressions.append(f"{name}: {metric} {result[metric]:.2f} > {limit:.2f} (база {base[metric]:.2f})")
+    return regressions
+
+
+async def run(args) -> Dict[str, Dict]:
+    symbol_grid = [int(x) for x in args.symbols.split(',')]
+    chat_grid = [int(x) for x in args.chats.split(',')]
+    process, urls = spawn_servers(make_symbols(max(symbol_grid)), args.latency, args.jitter,
+                                  args.error_rate, args.seed)
+    results = {}
+    try:
+        print(f"{'символов':>9} {'чатов':>6} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8} "
+              f"{'CPU мс/тик':>11} {'запр/с':>8} {'запр/тик':>9}")
+        for n_symbols in symbol_grid:
+            for n_chats in chat_grid:
+                r = await run_case(urls, n_symbols, n_chats, args.ticks, args.interactive)
+                results[f's{n_symbols}_c{n_chats}'] = r
+                print(f"{n_symbols:>9} {n_chats:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+                      f"{r['cpu_ms']:>11.2f} {r['requests_per_s']:>8.0f} {r['requests_per_tick']:>9.1f}")
+    finally:
+        process.terminate()
+        process.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', default='4,50,200', help='сетка числа символов')
+    parser.add_argument('--chats', default='1,100,1000', help='сетка числа чатов')
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--interactive', type=float, default=0.1, help='доля чатов, открывающих снимок за тик')
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.005)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--tolerance', type=float, default=0.3, help='допустимый рост метрик относительно базы')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"База сохранена: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("Базы нет, сравнение пропущено (--save-baseline, чтобы создать)")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("❌ Регрессия:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("✅ В пределах базы")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# Разбор пакетного ответа биржи: прежний путь (stdlib json + новый dict на тикер) против
+# быстрого JSON и записи в заранее выделенную таблицу котировок. Новый путь замеряется целиком,
+# как в ArbitrageBot.get_prices: разбор в таблицу и копия каждой нужной строки в тик.
+# Запуск из корня репозитория: python -m benchmarks.bench_normalize [--tickers 3000 --wanted 200]
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from exchanges import GateioAdapter
+from tickers import JSON_BACKEND, loads
+
+
+def make_payload(count: int, seed: int) -> bytes:
+    # Формат Gate.io /api/v4/spot/tickers: все пары биржи одним списком, числа строками
+    rng = random.Random(seed)
+    tickers = []
+    for i in range(count):
+        last = rng.uniform(0.001, 50000)
+        tickers.append({
+            'currency_pair': f'A{i:04d}_USDT', 'last': f'{last:.8g}', 'lowest_ask': f'{last * 1.0002:.8g}',
+            'highest_bid': f'{last * 0.9998:.8g}', 'change_percentage': '-1.2', 'base_volume': f'{rng.uniform(1, 1e6):.4f}',
+            'quote_volume': f'{rng.uniform(1, 1e8):.4f}', 'high_24h': f'{last * 1.05:.8g}', 'low_24h': f'{last * 0.95:.8g}'
+        })
+    return json.dumps(tickers).encode()
+
+
+def legacy_parse(ticker: Dict) -> Dict:
+    # Прежний GateioAdapter.parse: новый dict на каждый тикер каждого ответа
+    return {
+        'exchange': 'Gate.io',
+        'symbol': ticker['currency_pair'],
+        'price': float(ticker['last']),
+        'volume': float(ticker['base_volume']),
+        'bid': float(ticker['highest_bid'] or 0),
+        'ask': float(ticker['lowest_ask'] or 0)
+    }
+
+
+def legacy_normalize(data: List[Dict], wanted: set) -> Dict:
+    # Прежний цикл ExchangeAdapter.get_prices
+    prices = {}
+    for ticker in data:
+        if ticker['currency_pair'] in wanted:
+            prices[ticker['currency_pair']] = legacy_parse(ticker)
+    return prices
+
+
+def table_normalize(adapter: GateioAdapter) -> Callable:
+    # Путь бота: строки таблицы переписывает следующий ответ, поэтому в тик идут их копии
+    def normalize(data: List[Dict], wanted: set) -> Dict:
+        return {symbol: row.copy() for symbol, row in adapter.parse_many(data, wanted).items()}
+    return normalize
+
+
+def best_of(func: Callable, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def peak_bytes(func: Callable) -> int:
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=3000, help='тикеров в ответе')
+    parser.add_argument('--wanted', type=int, default=200, help='из них нужных боту')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    body = make_payload(args.tickers, args.seed)
+    wanted = {f'A{i:04d}_USDT' for i in random.Random(args.seed).sample(range(args.tickers), args.wanted)}
+    adapter = GateioAdapter()
+
+    decoded = json.loads(body.decode())
+    adapter.table.reserve(adapter.name, wanted)
+
+    variants = [
+        ('json + dict на тикер', lambda: json.loads(body.decode()), legacy_normalize),
+        ('json + таблица + копии', lambda: json.loads(body.decode()), table_normalize(adapter)),
+        (f'{JSON_BACKEND} + таблица + копии', lambda: loads(body), table_normalize(adapter)),
+    ]
+    print(f"Ответ: {len(body) / 1024:.0f} КиБ, тикеров {args.tickers}, нужных {args.wanted}, JSON: {JSON_BACKEND}")
+    print(f"{'вариант':<27} {'разбор JSON':>12} {'нормализация':>13} {'всего':>9} {'пик памяти норм.':>17}")
+    baseline = None
+    for name, decode, normalize in variants:
+        decode_time = best_of(decode, args.repeats)
+        norm_time = best_of(lambda: normalize(decoded, wanted), args.repeats)
+        peak = peak_bytes(lambda: normalize(decoded, wanted))
+        total = decode_time + norm_time
+        baseline = baseline or total
+        print(f"{name:<27} {decode_time * 1e6:>9.0f} мкс {norm_time * 1e6:>9.0f} мкс {total * 1e6:>6.0f} мкс "
+              f"{peak / 1024:>12.1f} КиБ  x{baseline / total:.2f}")
+
+
+if __name__ == '__main__':
+    main()
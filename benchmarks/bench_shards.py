@@ -0,0 +1,137 @@
+# Масштабирование опроса по процессам: один процесс против N воркеров (shards.ShardPool)
+# на локальных заглушках бирж. Воркеры тикают без паузы, фронтенд склеивает снимки и считает
+# уведомления. "CPU шарда" - самый загруженный воркер за тик: на N свободных ядрах именно он
+# задает длительность тика, поэтому его отношение к CPU одного процесса - достижимое ускорение.
+# "Запр/тик" - запросы к заглушкам за тик: биржи со всем рынком в одном ответе опрашивает
+# фронтенд, поэтому с числом воркеров растут только пакеты по списку символов.
+# Запуск из корня репозитория: python -m benchmarks.bench_shards [--symbols 200,800 --workers 1,2,4]
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Dict, List
+
+import aiohttp
+
+from alerts import AlertTracker, format_alerts_messages
+from benchmarks.bench_hot_path import server_requests
+from benchmarks.fake_exchanges import make_symbols, spawn_servers
+from bot import ArbitrageBot
+from ratelimit import RateLimiter
+from shards import ShardPool
+
+WARMUP = 2
+
+
+def unlimited_engine(base_urls: Dict[str, str]) -> ArbitrageBot:
+    # Бюджеты бирж здесь не меряем: лимитер не должен растягивать тик
+    bot = ArbitrageBot(base_urls=base_urls)
+    for adapter in bot.adapters.values():
+        adapter.limiter = RateLimiter(1e9, 1.0)
+    return bot
+
+
+async def run_single(urls: Dict[str, str], n_symbols: int, ticks: int) -> Dict:
+    # Прежний режим: опрос, поиск и уведомления в одном процессе
+    symbols = make_symbols(n_symbols)
+    bot = unlimited_engine(urls)
+    await bot.init_session()
+    tracker = AlertTracker()
+    durations, cpu = [], 0.0
+    requests = 0
+    try:
+        for i in range(WARMUP + ticks):
+            if i == WARMUP:
+                requests = await server_requests(bot.session, urls)
+            wall, proc = time.perf_counter(), time.process_time()
+            snapshot = await bot.refresh_snapshot(symbols)
+            format_alerts_messages(tracker.update(snapshot, float(i) * 60), symbols)
+            if i >= WARMUP:
+                cpu += time.process_time() - proc
+                durations.append(time.perf_counter() - wall)
+        requests = await server_requests(bot.session, urls) - requests
+    finally:
+        await bot.close_session()
+    tick_cpu = cpu / ticks * 1000
+    return {'tick_ms': statistics.median(durations) * 1000, 'shard_cpu_ms': tick_cpu,
+            'total_cpu_ms': tick_cpu, 'front_cpu_ms': tick_cpu, 'requests': requests / ticks}
+
+
+async def run_sharded(urls: Dict[str, str], n_symbols: int, workers: int, ticks: int) -> Dict:
+    symbols = make_symbols(n_symbols)
+    pool = ShardPool(unlimited_engine, workers, 0, {'base_urls': urls, 'share_limits': False})
+    tracker = AlertTracker()
+    arrived: List[float] = []
+    shard_cpu: List[List[float]] = []
+    front = {'cpu': 0.0, 'requests': 0}
+    done = asyncio.Event()
+    stats_session = aiohttp.ClientSession()
+
+    async def on_snapshot(snapshot: Dict[str, Dict]):
+        format_alerts_messages(tracker.update(snapshot, float(len(arrived)) * 60), symbols)
+        arrived.append(time.perf_counter())
+        if len(arrived) == WARMUP:
+            front['cpu'] = time.process_time()
+            front['requests'] = await server_requests(stats_session, urls)
+        elif len(arrived) > WARMUP:
+            shard_cpu.append([piece['cpu'] for piece in pool.pieces.values()])
+        if len(arrived) == WARMUP + ticks:
+            front['cpu'] = time.process_time() - front['cpu']
+            front['requests'] = await server_requests(stats_session, urls) - front['requests']
+            done.set()
+
+    pool.on_snapshot = on_snapshot
+    # Фронтенд сам опрашивает биржи со всем рынком в ответе - тоже на заглушках
+    pool.start(unlimited_engine(urls), symbols)
+    try:
+        await asyncio.wait_for(done.wait(), timeout=600)
+    finally:
+        await pool.stop()
+        await pool.engine.close_session()
+        await stats_session.close()
+    gaps = [b - a for a, b in zip(arrived[WARMUP - 1:], arrived[WARMUP:])]
+    return {
+        'tick_ms': statistics.median(gaps) * 1000,
+        'shard_cpu_ms': statistics.mean(max(row) for row in shard_cpu) * 1000,
+        'total_cpu_ms': statistics.mean(sum(row) for row in shard_cpu) * 1000,
+        'front_cpu_ms': front['cpu'] / ticks * 1000,
+        'requests': front['requests'] / ticks
+    }
+
+
+async def run(args):
+    symbol_grid = [int(x) for x in args.symbols.split(',')]
+    worker_grid = [int(x) for x in args.workers.split(',')]
+    process, urls = spawn_servers(make_symbols(max(symbol_grid)), args.latency, args.jitter)
+    try:
+        print(f"Ядер: {os.cpu_count()}")
+        print(f"{'символов':>9} {'воркеров':>9} {'тик мс':>8} {'CPU шарда':>10} {'CPU всего':>10} "
+              f"{'CPU фронта':>11} {'запр/тик':>9} {'ускорение':>10}")
+        for n_symbols in symbol_grid:
+            single = await run_single(urls, n_symbols, args.ticks)
+            rows = [('1 процесс', single)]
+            for workers in worker_grid:
+                rows.append((str(workers), await run_sharded(urls, n_symbols, workers, args.ticks)))
+            for label, r in rows:
+                print(f"{n_symbols:>9} {label:>9} {r['tick_ms']:>8.1f} {r['shard_cpu_ms']:>10.1f} "
+                      f"{r['total_cpu_ms']:>10.1f} {r['front_cpu_ms']:>11.1f} {r['requests']:>9.1f} "
+                      f"{single['shard_cpu_ms'] / r['shard_cpu_ms']:>9.2f}x")
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', default='200,800', help='сетка числа символов')
+    parser.add_argument('--workers', default='1,2,4', help='сетка числа воркеров')
+    parser.add_argument('--ticks', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.005)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# Сверка векторного расчета спредов (arbmatrix.top_opportunities, режим 'last') с исходным
+# попарным циклом calculate_arbitrage на случайных наборах цен: весь список и срез top-K,
+# включая порядок при равных спредах и символы с разным числом бирж.
+# Запуск из корня репозитория: python -m benchmarks.check_arbmatrix [--fixtures 3000]
+import argparse
+import random
+import sys
+from typing import Dict, List
+
+from arbmatrix import MODE_LAST, top_opportunities
+
+VENUES = ['Binance', 'Gate.io', 'Bybit', 'KuCoin', 'OKX', 'Aster', 'MEXC', 'Uniswap V3']
+
+
+def calculate_arbitrage(prices: List[Dict]) -> List[Dict]:
+    # Исходный цикл из ArbitrageBot до векторизации - эталон
+    opportunities = []
+
+    for i, price1 in enumerate(prices):
+        for price2 in prices[i+1:]:
+            if price1 and price2:
+                diff_percent = ((price2['price'] - price1['price']) / price1['price']) * 100
+
+                opportunities.append({
+                    'buy_exchange': price1['exchange'],
+                    'sell_exchange': price2['exchange'],
+                    'buy_price': price1['price'],
+                    'sell_price': price2['price'],
+                    'difference': abs(diff_percent),
+                    'profit_direction': 'BUY' if diff_percent > 0 else 'SELL'
+                })
+
+    return sorted(opportunities, key=lambda x: x['difference'], reverse=True)
+
+
+def make_prices(rng: random.Random) -> List[Dict]:
+    # От 1 до 8 бирж; в части наборов цены огрублены, чтобы спреды совпадали и проверялся порядок равных
+    venues = rng.sample(VENUES, rng.randint(1, len(VENUES)))
+    mid = rng.uniform(0.01, 50000)
+    coarse = rng.random() < 0.3
+    prices = []
+    for venue in venues:
+        price = mid * (1 + rng.gauss(0, 0.01))
+        if coarse:
+            price = round(price, 1) or 0.1
+        spread = price * rng.uniform(0, 0.002)
+        prices.append({'exchange': venue, 'price': price, 'bid': price - spread, 'ask': price + spread})
+    return prices
+
+
+def check(args) -> List[str]:
+    rng = random.Random(args.seed)
+    fixtures = [make_prices(rng) for _ in range(args.fixtures)]
+    expected = [calculate_arbitrage(prices) for prices in fixtures]
+    failures = []
+    for top_k in (None, args.top_k):
+        # Все наборы одним вызовом: символы с разным числом бирж в одной матрице
+        actual = top_opportunities(fixtures, mode=MODE_LAST, top_k=top_k)
+        mismatches = [i for i, (want, got) in enumerate(zip(expected, actual)) if want[:top_k] != got]
+        print(f"top_k={top_k}: наборов {len(fixtures)}, расхождений {len(mismatches)}")
+        for i in mismatches[:3]:
+            failures.append(f"top_k={top_k}, набор {i}: {fixtures[i]}\n"
+                            f"    ожидалось {expected[i][:top_k]}\n    получено  {actual[i]}")
+        if len(mismatches) > 3:
+            failures.append(f"top_k={top_k}: и еще {len(mismatches) - 3} расхождений")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', type=int, default=3000)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    failures = check(args)
+    if failures:
+        print("❌ Векторный расчет расходится с попарным циклом:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    print("✅ Векторный расчет совпадает с попарным циклом")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# Проверка адаптивного лимитера на заглушке биржи со своим лимитом запросов:
+# 429 с Retry-After (пауза соблюдается, скорость снижается, автомат не открывается),
+# порядок приоритетов в очереди, 418 (бан IP у Binance - долгая пауза) и очередь своего лимитера
+# дольше бюджета тика (не опоздание биржи).
+# Запуск из корня репозитория: python -m benchmarks.check_ratelimit
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List
+
+import aiohttp
+
+from benchmarks.fake_exchanges import make_symbols, start_servers
+from bot import ArbitrageBot
+from breaker import CLOSED
+from ratelimit import BACKOFF_MAX, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimiter
+
+VENUE = 'okx'
+# Допуск на разницу часов клиента и сервера в одном процессе и на планировщик event loop
+CLOCK_SLACK = 0.05
+
+
+async def stub_log(session: aiohttp.ClientSession, url: str) -> List:
+    async with session.get(url + '/__stats') as resp:
+        return (await resp.json())['log']
+
+
+async def with_stub(options: Dict, scenario) -> List[str]:
+    symbols = make_symbols(20)
+    runners, urls = await start_servers(symbols, overrides={VENUE: options})
+    bot = ArbitrageBot(base_urls=urls)
+    await bot.init_session()
+    try:
+        async with aiohttp.ClientSession() as control:
+            return await scenario(bot, [config[VENUE] for config in symbols.values()],
+                                  lambda: stub_log(control, urls[VENUE]))
+    finally:
+        await bot.close_session()
+        for runner in runners:
+            await runner.cleanup()
+
+
+async def throttled(bot: ArbitrageBot, names: List[str], log) -> List[str]:
+    # Наш лимитер разрешает 20 запросов/с, биржа - 5: первые же 429 должны остановить поток
+    # на Retry-After и снизить скорость, а не открыть автомат
+    adapter = bot.adapters[VENUE]
+    adapter.limiter = RateLimiter(20, 1.0)
+    failures = []
+    books = await asyncio.gather(*(adapter.get_depth(names[i % len(names)]) for i in range(40)))
+    entries = await log()
+    rejected = [t for t, status, _ in entries if status == 429]
+    print(f"429: запросов {len(entries)}, отклонено {len(rejected)}, стаканов {sum(b is not None for b in books)}, "
+          f"скорость лимитера {adapter.limiter.rate:.1f}/{adapter.limiter.max_rate:.1f} в с")
+    if not rejected:
+        failures.append("заглушка ни разу не ответила 429 - сценарий ничего не проверил")
+        return failures
+    # После первого 429 следующий запрос - не раньше чем через Retry-After (1 с); отправленные
+    # до ответа 429 запросы уже были в пути
+    first = rejected[0]
+    early = [t for t, status, _ in entries if first + 0.2 < t < first + 1.0 - CLOCK_SLACK]
+    if early:
+        failures.append(f"за паузу Retry-After ушло {len(early)} запросов")
+    if adapter.limiter.rate >= adapter.limiter.max_rate:
+        failures.append("скорость лимитера не снизилась после 429")
+    if adapter.breaker.state != CLOSED:
+        failures.append(f"429 открыли автомат: {adapter.breaker.state}")
+    return failures
+
+
+async def priorities(bot: ArbitrageBot, names: List[str], log) -> List[str]:
+    # Пока лимитер стоит на паузе, в очередь встают сначала фоновые, потом интерактивные запросы:
+    # после паузы интерактивные должны уйти первыми
+    adapter = bot.adapters[VENUE]
+    adapter.limiter = RateLimiter(2, 1.0)
+    adapter.limiter.on_response(429, retry_after=0.5)
+    background = [asyncio.create_task(adapter.get_depth(name, PRIORITY_BACKGROUND)) for name in names[:4]]
+    await asyncio.sleep(0.05)
+    interactive = [asyncio.create_task(adapter.get_depth(name, PRIORITY_INTERACTIVE)) for name in names[4:8]]
+    await asyncio.gather(*background, *interactive)
+    order = [query.split('=', 1)[1].split('&')[0] for _, _, query in await log()]
+    print(f"Порядок отправки: {' '.join(order)}")
+    if set(order[:4]) != set(names[4:8]):
+        return [f"интерактивные запросы ушли не первыми: {order}"]
+    return []
+
+
+async def banned(bot: ArbitrageBot, names: List[str], log) -> List[str]:
+    # 418 - бан IP: пауза не короче BACKOFF_MAX, даже если Retry-After меньше; автомат не трогаем
+    adapter = bot.adapters[VENUE]
+    await adapter.get_depth(names[0])
+    await adapter.get_depth(names[1])
+    failures = []
+    pause = adapter.limiter.blocked_until - time.monotonic()
+    print(f"418: пауза лимитера {pause:.0f} с")
+    if pause < BACKOFF_MAX - 1:
+        failures.append(f"после 418 пауза {pause:.1f} с, ожидалось не меньше {BACKOFF_MAX:.0f}")
+    try:
+        await asyncio.wait_for(adapter.limiter.acquire(), 0.5)
+        failures.append("во время бана лимитер выдал токен")
+    except asyncio.TimeoutError:
+        pass
+    if adapter.breaker.state != CLOSED:
+        failures.append(f"418 открыл автомат: {adapter.breaker.state}")
+    return failures
+
+
+async def queued(bot: ArbitrageBot, names: List[str], log) -> List[str]:
+    # 100 стаканов разом и пакет цен за ними: большая часть ждет своего лимитера дольше бюджета тика.
+    # Такие запросы отменяются, но биржа ответила на все отправленные - автомат закрыт.
+    # Без данных отмечается только опоздавший пакет цен: недождавшийся стакан цены биржи не отменяет
+    bot.latency_budget = 1.0
+    books = asyncio.gather(*(bot.get_book(VENUE, names[i % len(names)]) for i in range(100)))
+    await asyncio.sleep(0)
+    prices = await bot.get_prices(VENUE, names)
+    books = await books
+    adapter = bot.adapters[VENUE]
+    print(f"Очередь: стаканов {sum(b is not None for b in books)} из {len(books)}, цен {len(prices)}, "
+          f"отметка {bot.stale.get(VENUE)}, автомат {adapter.breaker.state}")
+    failures = []
+    if adapter.breaker.state != CLOSED:
+        failures.append(f"ожидание в своей очереди открыло автомат: {adapter.breaker.state}")
+    if not prices and bot.stale.get(VENUE) != 'queued':
+        failures.append(f"пакет цен не отмечен как ждущий в очереди: {bot.stale.get(VENUE)}")
+    if prices and bot.stale.get(VENUE):
+        failures.append(f"цены получены, но биржа отмечена без данных: {bot.stale.get(VENUE)}")
+    return failures
+
+
+async def check() -> List[str]:
+    failures = []
+    failures += await with_stub({'throttle_rate': 5, 'retry_after': 1}, throttled)
+    failures += await with_stub({'throttle_rate': 100}, priorities)
+    failures += await with_stub({'throttle_rate': 1, 'throttle_status': 418, 'retry_after': 5}, banned)
+    failures += await with_stub({}, queued)
+    return failures
+
+
+def main():
+    argparse.ArgumentParser().parse_args()
+    failures = asyncio.run(check())
+    if failures:
+        print("❌ Лимитер:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    print("✅ 429/418, Retry-After, приоритеты и очередь лимитера обрабатываются")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# Проверка потокового режима на локальных заглушках: подключение и подписка всех символов,
+# обрыв всех соединений, переподключение с повторной подпиской и дозаполнение пропуска через REST.
+# Запуск из корня репозитория: python -m benchmarks.check_streams [--symbols 20]
+import argparse
+import asyncio
+import sys
+import time
+from typing import Callable, Dict, List
+
+import aiohttp
+
+from benchmarks.fake_exchanges import FakeMarket, make_symbols, start_servers
+from benchmarks.fake_streams import STREAM_VENUES, start_stream_server
+from bot import ArbitrageBot
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        await asyncio.sleep(0.05)
+    return condition()
+
+
+def all_quoted(bot: ArbitrageBot, symbols: Dict[str, Dict], since: float) -> bool:
+    # По каждому символу каждой биржи есть котировка из потока, полученная после since
+    for key, stream in bot.streams.items():
+        if not stream.connected:
+            return False
+        for config in symbols.values():
+            quote = stream.book.get(config[key])
+            if quote is None or quote['ts'] < since:
+                return False
+    return True
+
+
+async def check(args) -> List[str]:
+    symbols = make_symbols(args.symbols)
+    market = FakeMarket(symbols, args.seed)
+    runners, rest_urls = await start_servers(symbols)
+    ws_runner, ws_base, ws_urls = await start_stream_server(market, args.interval)
+    bot = ArbitrageBot(base_urls=rest_urls)
+    failures = []
+    fills: Dict[str, int] = {key: 0 for key in STREAM_VENUES}
+
+    async def counted_fill(stream):
+        await bot.fill_stream_gap(stream)
+        fills[stream.key] += 1
+
+    try:
+        async with aiohttp.ClientSession() as control:
+            async def stats() -> Dict:
+                async with control.get(ws_base + '/__stats') as resp:
+                    return await resp.json()
+
+            await bot.start_streams(symbols, ws_urls, bullet_url=ws_base + '/api/v1/bullet-public')
+            for stream in bot.streams.values():
+                stream.on_connect = counted_fill
+
+            started = time.monotonic()
+            if not await wait_until(lambda: all_quoted(bot, symbols, started), args.timeout):
+                failures.append("не все символы получили котировки после подключения")
+            if not await wait_until(lambda: all(fills.values()), args.timeout):
+                failures.append(f"дозаполнение после подключения не выполнено: {fills}")
+            print(f"Подключено: {sorted(bot.streams)}, дозаполнений: {sum(fills.values())}")
+
+            before = dict(fills)
+            async with control.post(ws_base + '/__kill') as resp:
+                closed = (await resp.json())['closed']
+            killed = time.monotonic()
+            print(f"Оборвано соединений: {closed}")
+
+            if not await wait_until(lambda: all(s.reconnects >= 1 for s in bot.streams.values()), args.timeout):
+                failures.append("не все потоки заметили обрыв")
+            if not await wait_until(lambda: all_quoted(bot, symbols, killed), args.timeout):
+                failures.append("после переподключения не все символы снова получают котировки")
+            if not await wait_until(lambda: all(fills[k] > before[k] for k in fills), args.timeout):
+                failures.append(f"после переподключения нет дозаполнения через REST: {fills}")
+
+            current = await stats()
+            for key in STREAM_VENUES:
+                if current['connections'][key] < 2:
+                    failures.append(f"{key}: нет повторного подключения")
+                expected = sorted(config[key] for config in symbols.values())
+                if current['subscribed'][key] != expected:
+                    failures.append(f"{key}: после переподключения подписано "
+                                    f"{len(current['subscribed'][key])} из {len(expected)} символов")
+            print(f"Подключений по биржам: {current['connections']}")
+    finally:
+        await bot.close_session()
+        await ws_runner.cleanup()
+        for runner in runners:
+            await runner.cleanup()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.1, help='период рассылки котировок заглушкой (сек)')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    failures = asyncio.run(check(args))
+    if failures:
+        print("❌ Потоки:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    print("✅ Переподключение, переподписка и дозаполнение работают")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,427 @@
+# Локальные заглушки бирж для бенчмарков: тот же формат ответов, что у настоящих API,
+# настраиваемые задержка, разброс, доля ошибок и собственный лимит запросов (429/418 с Retry-After).
+# Каждая биржа - свой порт (свой хост для лимитов).
+# Отдельный запуск: python -m benchmarks.fake_exchanges [--symbols 50 --latency 0.05 --jitter 0.02]
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import math
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+# Порядок и написание символов как в SYMBOLS бота
+VENUE_FORMATS = {
+    'binance': '{base}USDT',
+    'gateio': '{base}_USDT',
+    'bybit': '{base}USDT',
+    'kucoin': '{base}-USDT',
+    'okx': '{base}-USDT',
+    'aster': '{lower}usdt',
+    'mexc': '{base}USDT',
+}
+UNISWAP_EVERY = 4  # пул Uniswap есть у каждого UNISWAP_EVERY-го символа
+USDT_ADDRESS = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+BOOK_LEVELS = 20
+# Пулы Uniswap V3 заглушки: уровень комиссии -> глубина в текущем диапазоне (USDT)
+POOL_DEPTHS = {500: 2_000_000, 3000: 500_000}
+TOKEN_DECIMALS = 18
+USDT_DECIMALS = 6
+
+
+def make_symbols(count: int) -> Dict[str, Dict]:
+    # Конфигурация в формате SYMBOLS для count синтетических символов
+    symbols = {}
+    for i in range(count):
+        base = ['BTC', 'ETH', 'BNB', 'SOL'][i] if i < 4 else f'A{i:03d}'
+        config = {'name': f'{base}/USDT'}
+        for key, fmt in VENUE_FORMATS.items():
+            config[key] = fmt.format(base=base, lower=base.lower())
+        if i % UNISWAP_EVERY == 0:
+            config['uniswap'] = (f'0x{i + 1:040x}', USDT_ADDRESS)
+        symbols[base] = config
+    return symbols
+
+
+class FakeMarket:
+    # Справедливая цена на символ; каждая биржа отдает ее с шумом и изредка с перекосом,
+    # чтобы часть спредов проходила порог комиссий и бот запрашивал стаканы
+    def __init__(self, symbols: Dict[str, Dict], seed: int = 1, noise: float = 0.0005, skew: float = 0.01):
+        self.rng = random.Random(seed)
+        self.noise = noise
+        self.skew = skew
+        self.fair = {base: 10 ** self.rng.uniform(-1, 4.5) for base in symbols}
+        # {биржа: {написание символа: base}}
+        self.names = {key: {cfg[key]: base for base, cfg in symbols.items() if key in cfg} for key in VENUE_FORMATS}
+        self.pools = {cfg['uniswap'][0].lower(): base for base, cfg in symbols.items() if 'uniswap' in cfg}
+
+    def quote(self, base: str) -> Tuple[float, float, float]:
+        mid = self.fair[base] * (1 + self.rng.gauss(0, self.noise))
+        if self.rng.random() < 0.02:
+            mid *= 1 + self.rng.choice((-1, 1)) * self.skew
+        half = mid * 0.0001
+        return mid - half, mid + half, mid
+
+    def book(self, base: str) -> Tuple[List[List[str]], List[List[str]]]:
+        bid, ask, _ = self.quote(base)
+        step = bid * 0.0001
+        bids = [[f'{bid - i * step:.8g}', f'{self.rng.uniform(0.1, 5):.4f}'] for i in range(BOOK_LEVELS)]
+        asks = [[f'{ask + i * step:.8g}', f'{self.rng.uniform(0.1, 5):.4f}'] for i in range(BOOK_LEVELS)]
+        return bids, asks
+
+
+# ---------- формат ответов по биржам ----------
+def binance_ticker(symbol: str, bid: float, ask: float, last: float) -> Dict:
+    return {'symbol': symbol, 'lastPrice': f'{last:.8g}', 'volume': '1000',
+            'bidPrice': f'{bid:.8g}', 'askPrice': f'{ask:.8g}'}
+
+
+def _uint(value: int) -> bytes:
+    return value.to_bytes(32, 'big')
+
+
+def unpack_aggregate3(args: bytes) -> List[Tuple[str, bytes]]:
+    # Аргументы aggregate3((address,bool,bytes)[]) без селектора -> [(target, callData)]
+    def word(pos: int) -> int:
+        return int.from_bytes(args[pos:pos + 32], 'big')
+    array = word(0)
+    heads = array + 32
+    calls = []
+    for i in range(word(array)):
+        item = heads + word(heads + 32 * i)
+        start = item + word(item + 64)
+        calls.append(('0x' + args[item + 12:item + 32].hex(), args[start + 32:start + 32 + word(start)]))
+    return calls
+
+
+def pack_results(results: List[Optional[bytes]]) -> bytes:
+    # (bool success, bytes returnData)[]; None - вызов откатился
+    items = []
+    for data in results:
+        padded = (data or b'') + b'\0' * (-len(data or b'') % 32)
+        items.append(_uint(data is not None) + _uint(64) + _uint(len(data or b'')) + padded)
+    heads, position = [], 32 * len(items)
+    for item in items:
+        heads.append(_uint(position))
+        position += len(item)
+    return _uint(32) + _uint(len(items)) + b''.join(heads) + b''.join(items)
+
+
+def make_app(key: str, market: FakeMarket, latency: float = 0.0, jitter: float = 0.0,
+             error_rate: float = 0.0, seed: int = 1, throttle_rate: float = 0.0, throttle_status: int = 429,
+             retry_after: Optional[int] = 1) -> web.Application:
+    # throttle_rate > 0 - лимит биржи: больше throttle_rate запросов за скользящую секунду получают
+    # throttle_status (429, у Binance еще 418 - бан IP) с Retry-After; журнал ответов - в /__stats
+    rng = random.Random(seed)
+    names = market.names.get(key, {})
+    pools = market.pools
+    stats = {'requests': 0, 'errors': 0, 'throttled': 0, 'log': []}
+    window = collections.deque()
+
+    @web.middleware
+    async def fault_injection(request: web.Request, handler):
+        if request.path == '/__stats':
+            return web.json_response(stats)
+        stats['requests'] += 1
+        delay = latency + rng.uniform(-jitter, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < error_rate:
+            stats['errors'] += 1
+            return web.Response(status=503, text='fake outage')
+        if throttle_rate:
+            now = time.monotonic()
+            while window and now - window[0] >= 1.0:
+                window.popleft()
+            if len(window) >= throttle_rate:
+                stats['throttled'] += 1
+                stats['log'].append([now, throttle_status, request.query_string])
+                headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+                return web.Response(status=throttle_status, headers=headers, text='rate limited')
+            window.append(now)
+            stats['log'].append([now, 200, request.query_string])
+        return await handler(request)
+
+    app = web.Application(middlewares=[fault_injection])
+
+    def tickers(wanted: Optional[List[str]] = None) -> List[Tuple[str, float, float, float]]:
+        return [(name, *market.quote(names[name])) for name in (wanted or names) if name in names]
+
+    def book(name: str):
+        return market.book(names[name]) if name in names else ([], [])
+
+    # ---------- BINANCE / MEXC ----------
+    async def binance_24hr(request: web.Request):
+        if 'symbol' in request.query:
+            data = [binance_ticker(*t) for t in tickers([request.query['symbol']])]
+            return web.json_response(data[0] if data else {'code': -1121, 'msg': 'Invalid symbol.'},
+                                     status=200 if data else 400)
+        wanted = json.loads(request.query['symbols']) if 'symbols' in request.query else None
+        if wanted and any(name not in names for name in wanted):
+            # Как у Binance: один неизвестный символ отклоняет весь пакет
+            return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+        return web.json_response([binance_ticker(*t) for t in tickers(wanted)],
+                                 headers={'X-MBX-USED-WEIGHT-1M': '10'})
+
+    async def binance_depth(request: web.Request):
+        bids, asks = book(request.query['symbol'])
+        return web.json_response({'bids': bids, 'asks': asks})
+
+    # ---------- GATE.IO ----------
+    async def gate_tickers(request: web.Request):
+        wanted = [request.query['currency_pair']] if 'currency_pair' in request.query else None
+        return web.json_response([
+            {'currency_pair': n, 'last': f'{last:.8g}', 'base_volume': '1000',
+             'highest_bid': f'{bid:.8g}', 'lowest_ask': f'{ask:.8g}'}
+            for n, bid, ask, last in tickers(wanted)
+        ])
+
+    async def gate_book(request: web.Request):
+        bids, asks = book(request.query['currency_pair'])
+        return web.json_response({'bids': bids, 'asks': asks})
+
+    # ---------- BYBIT ----------
+    async def bybit_tickers(request: web.Request):
+        wanted = [request.query['symbol']] if 'symbol' in request.query else None
+        return web.json_response({'retCode': 0, 'result': {'list': [
+            {'symbol': n, 'lastPrice': f'{last:.8g}', 'volume24h': '1000',
+             'bid1Price': f'{bid:.8g}', 'ask1Price': f'{ask:.8g}'}
+            for n, bid, ask, last in tickers(wanted)
+        ]}})
+
+    async def bybit_book(request: web.Request):
+        bids, asks = book(request.query['symbol'])
+        return web.json_response({'retCode': 0, 'result': {'s': request.query['symbol'], 'b': bids, 'a': asks}})
+
+    # ---------- KUCOIN ----------
+    def kucoin_ticker(n, bid, ask, last):
+        return {'symbol': n, 'last': f'{last:.8g}', 'vol': '1000', 'buy': f'{bid:.8g}', 'sell': f'{ask:.8g}'}
+
+    async def kucoin_all(request: web.Request):
+        return web.json_response({'code': '200000', 'data': {'ticker': [kucoin_ticker(*t) for t in tickers()]}})
+
+    async def kucoin_stats(request: web.Request):
+        data = [kucoin_ticker(*t) for t in tickers([request.query['symbol']])]
+        return web.json_response({'code': '200000', 'data': data[0] if data else {'last': None}})
+
+    async def kucoin_book(request: web.Request):
+        bids, asks = book(request.query['symbol'])
+        return web.json_response({'code': '200000', 'data': {'bids': bids, 'asks': asks}})
+
+    # ---------- OKX ----------
+    def okx_ticker(n, bid, ask, last):
+        return {'instId': n, 'last': f'{last:.8g}', 'vol24h': '1000', 'bidPx': f'{bid:.8g}', 'askPx': f'{ask:.8g}'}
+
+    async def okx_tickers(request: web.Request):
+        return web.json_response({'code': '0', 'data': [okx_ticker(*t) for t in tickers()]})
+
+    async def okx_ticker_one(request: web.Request):
+        return web.json_response({'code': '0', 'data': [okx_ticker(*t) for t in tickers([request.query['instId']])]})
+
+    async def okx_books(request: web.Request):
+        bids, asks = book(request.query['instId'])
+        return web.json_response({'code': '0', 'data': [{'bids': bids, 'asks': asks}]})
+
+    # ---------- HUOBI ----------
+    async def huobi_tickers(request: web.Request):
+        return web.json_response({'status': 'ok', 'data': [
+            {'symbol': n, 'close': last, 'vol': 1000.0, 'bid': bid, 'ask': ask}
+            for n, bid, ask, last in tickers()
+        ]})
+
+    async def huobi_merged(request: web.Request):
+        data = tickers([request.query['symbol']])
+        if not data:
+            return web.json_response({'status': 'error', 'err-msg': 'invalid symbol'})
+        _, bid, ask, last = data[0]
+        return web.json_response({'status': 'ok', 'tick': {'close': last, 'vol': 1000.0, 'bid': [bid, 1], 'ask': [ask, 1]}})
+
+    async def huobi_depth(request: web.Request):
+        bids, asks = book(request.query['symbol'])
+        return web.json_response({'status': 'ok', 'tick': {
+            'bids': [[float(p), float(q)] for p, q in bids], 'asks': [[float(p), float(q)] for p, q in asks]
+        }})
+
+    # ---------- СПИСКИ ИНСТРУМЕНТОВ ----------
+    async def binance_info(request: web.Request):
+        status = '1' if key == 'mexc' else 'TRADING'
+        return web.json_response({'symbols': [
+            {'symbol': n, 'status': status, 'baseAsset': base, 'quoteAsset': 'USDT', 'isSpotTradingAllowed': True}
+            for n, base in names.items()
+        ]})
+
+    async def gate_pairs(request: web.Request):
+        return web.json_response([{'id': n, 'base': base, 'quote': 'USDT', 'trade_status': 'tradable'}
+                                  for n, base in names.items()])
+
+    async def bybit_instruments(request: web.Request):
+        return web.json_response({'retCode': 0, 'result': {'list': [
+            {'symbol': n, 'baseCoin': base, 'quoteCoin': 'USDT', 'status': 'Trading'} for n, base in names.items()
+        ]}})
+
+    async def kucoin_symbols(request: web.Request):
+        return web.json_response({'code': '200000', 'data': [
+            {'symbol': n, 'baseCurrency': base, 'quoteCurrency': 'USDT', 'enableTrading': True}
+            for n, base in names.items()
+        ]})
+
+    async def okx_instruments(request: web.Request):
+        return web.json_response({'code': '0', 'data': [
+            {'instId': n, 'baseCcy': base, 'quoteCcy': 'USDT', 'state': 'live'} for n, base in names.items()
+        ]})
+
+    async def huobi_symbols(request: web.Request):
+        return web.json_response({'status': 'ok', 'data': [
+            {'symbol': n, 'base-currency': base.lower(), 'quote-currency': 'usdt', 'state': 'online'}
+            for n, base in names.items()
+        ]})
+
+    # ---------- UNISWAP V3 (Ethereum JSON-RPC) ----------
+    # Фабрика знает пулы 0.05% и 0.3% для каждого токена из pools против USDT
+    usdt = USDT_ADDRESS.lower()
+    pool_index, pool_info = {}, {}
+    for token, base in pools.items():
+        for fee in POOL_DEPTHS:
+            address = f'0x{0xaa << 152 | len(pool_info) + 1:040x}'
+            pool_index[(min(token, usdt), max(token, usdt), fee)] = address
+            pool_info[address] = (base, fee, int(token, 16) < int(usdt, 16))
+
+    def sqrt_price(base: str, mid: float, base_is_token0: bool) -> float:
+        # Корень цены token0 в сырых единицах token1, как sqrtPriceX96 пула
+        raw = mid * 10 ** USDT_DECIMALS / 10 ** TOKEN_DECIMALS
+        return math.sqrt(raw if base_is_token0 else 1 / raw)
+
+    def rpc_call(target: str, data: bytes) -> Optional[bytes]:
+        selector = data[:4].hex()
+        if selector == '42cbb15c':  # getBlockNumber()
+            return _uint(int(time.time() // 12))
+        if selector == '1698ee82':  # getPool(address,address,uint24)
+            a, b = '0x' + data[16:36].hex(), '0x' + data[48:68].hex()
+            address = pool_index.get((min(a, b), max(a, b), int.from_bytes(data[68:100], 'big')))
+            return _uint(int(address, 16) if address else 0)
+        if selector == '313ce567':  # decimals()
+            if target == usdt:
+                return _uint(USDT_DECIMALS)
+            return _uint(TOKEN_DECIMALS) if target in pools else None
+        if target not in pool_info:
+            return None
+        base, fee, base_is_token0 = pool_info[target]
+        if selector == '3850c7bd':  # slot0()
+            root = sqrt_price(base, market.quote(base)[2], base_is_token0)
+            return _uint(int(root * 2 ** 96)) + _uint(0) * 5 + _uint(1)
+        if selector == '1a686502':  # liquidity(): L = резерв quote / корень цены base в quote
+            root = sqrt_price(base, market.fair[base], True)
+            return _uint(int(POOL_DEPTHS[fee] * 10 ** USDT_DECIMALS / root))
+        return None
+
+    async def eth_rpc(request: web.Request):
+        body = await request.json()
+        if body.get('method') != 'eth_call':
+            return web.json_response({'jsonrpc': '2.0', 'id': body.get('id'),
+                                      'error': {'code': -32601, 'message': 'method not found'}})
+        data = bytes.fromhex(body['params'][0]['data'][2:])
+        results = [rpc_call(target, calldata) for target, calldata in unpack_aggregate3(data[4:])]
+        return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'result': '0x' + pack_results(results).hex()})
+
+    routes = {
+        'binance': [('GET', '/api/v3/ticker/24hr', binance_24hr), ('GET', '/api/v3/depth', binance_depth),
+                    ('GET', '/api/v3/exchangeInfo', binance_info)],
+        'mexc': [('GET', '/api/v3/ticker/24hr', binance_24hr), ('GET', '/api/v3/depth', binance_depth),
+                 ('GET', '/api/v3/exchangeInfo', binance_info)],
+        'gateio': [('GET', '/api/v4/spot/tickers', gate_tickers), ('GET', '/api/v4/spot/order_book', gate_book),
+                   ('GET', '/api/v4/spot/currency_pairs', gate_pairs)],
+        'bybit': [('GET', '/v5/market/tickers', bybit_tickers), ('GET', '/v5/market/orderbook', bybit_book),
+                  ('GET', '/v5/market/instruments-info', bybit_instruments)],
+        'kucoin': [('GET', '/api/v1/market/allTickers', kucoin_all), ('GET', '/api/v1/market/stats', kucoin_stats),
+                   ('GET', '/api/v1/market/orderbook/level2_20', kucoin_book), ('GET', '/api/v2/symbols', kucoin_symbols)],
+        'okx': [('GET', '/api/v5/market/tickers', okx_tickers), ('GET', '/api/v5/market/ticker', okx_ticker_one),
+                ('GET', '/api/v5/market/books', okx_books), ('GET', '/api/v5/public/instruments', okx_instruments)],
+        'aster': [('GET', '/market/tickers', huobi_tickers), ('GET', '/market/detail/merged', huobi_merged),
+                  ('GET', '/market/depth', huobi_depth), ('GET', '/v1/common/symbols', huobi_symbols)],
+        'uniswap': [('POST', '/', eth_rpc)],
+    }
+    for method, path, handler in routes[key]:
+        app.router.add_route(method, path, handler)
+    return app
+
+
+async def start_servers(symbols: Dict[str, Dict], latency: float = 0.0, jitter: float = 0.0,
+                        error_rate: float = 0.0, seed: int = 1, host: str = '127.0.0.1',
+                        overrides: Optional[Dict[str, Dict]] = None) -> Tuple[List[web.AppRunner], Dict[str, str]]:
+    # Поднимает по серверу на биржу на свободных портах; возвращает раннеры и base_urls для ArbitrageBot.
+    # overrides задает отдельной бирже свои latency/jitter/error_rate: {'aster': {'latency': 10}}
+    market = FakeMarket(symbols, seed)
+    runners, urls = [], {}
+    for i, key in enumerate(list(VENUE_FORMATS) + ['uniswap']):
+        options = {'latency': latency, 'jitter': jitter, 'error_rate': error_rate, 'seed': seed + i}
+        options.update((overrides or {}).get(key, {}))
+        runner = web.AppRunner(make_app(key, market, **options), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        runners.append(runner)
+        urls[key] = f'http://{host}:{port}'
+    return runners, urls
+
+
+def _serve(symbols: Dict[str, Dict], latency: float, jitter: float, error_rate: float, seed: int,
+           overrides: Optional[Dict[str, Dict]], ready: multiprocessing.Queue):
+    async def run():
+        runners, urls = await start_servers(symbols, latency, jitter, error_rate, seed, overrides=overrides)
+        ready.put(urls)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def spawn_servers(symbols: Dict[str, Dict], latency: float = 0.0, jitter: float = 0.0,
+                  error_rate: float = 0.0, seed: int = 1,
+                  overrides: Optional[Dict[str, Dict]] = None) -> Tuple[multiprocessing.Process, Dict[str, str]]:
+    # Заглушки в отдельном процессе, чтобы их CPU не попадал в замер бота
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_serve, args=(symbols, latency, jitter, error_rate, seed, overrides, ready), daemon=True
+    )
+    process.start()
+    return process, ready.get(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа (сек)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='разброс задержки (± сек)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='доля ответов 503')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    async def run():
+        runners, urls = await start_servers(make_symbols(args.symbols), args.latency, args.jitter,
+                                            args.error_rate, args.seed)
+        for key, url in urls.items():
+            print(f"{key:8} {url}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# Локальная заглушка WebSocket-потоков бирж: тот же протокол подписки и формат сообщений,
+# что разбирают классы streams.py. Один сервер на все биржи: /ws/<биржа>, для KuCoin - еще
+# REST-выдача адреса (bullet). /__kill рвет все соединения, /__stats - счетчики подключений и подписки.
+# Отдельный запуск: python -m benchmarks.fake_streams [--symbols 50 --interval 0.1]
+import argparse
+import asyncio
+import json
+from typing import Dict, List, Tuple
+
+from aiohttp import WSMsgType, web
+
+from benchmarks.fake_exchanges import FakeMarket, make_symbols
+
+STREAM_VENUES = ('binance', 'gateio', 'bybit', 'kucoin', 'okx', 'mexc')
+
+
+def subscribed_symbols(key: str, data) -> List[str]:
+    # Символы из сообщения подписки клиента; пинги и прочее - пустой список
+    if not isinstance(data, dict):
+        return []
+    if key == 'binance' and data.get('method') == 'SUBSCRIBE':
+        return [param.split('@')[0].upper() for param in data['params']]
+    if key == 'gateio' and data.get('event') == 'subscribe':
+        return list(data['payload'])
+    if key == 'bybit' and data.get('op') == 'subscribe':
+        return [arg.split('.')[-1] for arg in data['args']]
+    if key == 'kucoin' and data.get('type') == 'subscribe':
+        return data['topic'].split(':', 1)[1].split(',')
+    if key == 'okx' and data.get('op') == 'subscribe':
+        return [arg['instId'] for arg in data['args']]
+    if key == 'mexc' and data.get('method') == 'SUBSCRIPTION':
+        return [param.split('@')[-1] for param in data['params']]
+    return []
+
+
+def stream_message(key: str, symbol: str, bid: float, ask: float, last: float) -> Dict:
+    if key == 'binance':
+        return {'u': 1, 's': symbol, 'b': f'{bid:.8g}', 'B': '1', 'a': f'{ask:.8g}', 'A': '1'}
+    if key == 'gateio':
+        return {'channel': 'spot.book_ticker', 'event': 'update',
+                'result': {'s': symbol, 'b': f'{bid:.8g}', 'a': f'{ask:.8g}'}}
+    if key == 'bybit':
+        # Каждый раз снимок: дельты клиент тоже умеет, но заглушке хватает снимков
+        return {'topic': f'orderbook.50.{symbol}', 'type': 'snapshot',
+                'data': {'s': symbol, 'b': [[f'{bid:.8g}', '1']], 'a': [[f'{ask:.8g}', '1']]}}
+    if key == 'kucoin':
+        return {'type': 'message', 'topic': f'/market/ticker:{symbol}',
+                'data': {'price': f'{last:.8g}', 'bestBid': f'{bid:.8g}', 'bestAsk': f'{ask:.8g}'}}
+    if key == 'okx':
+        return {'arg': {'channel': 'tickers', 'instId': symbol}, 'data': [
+            {'instId': symbol, 'last': f'{last:.8g}', 'vol24h': '1000', 'bidPx': f'{bid:.8g}', 'askPx': f'{ask:.8g}'}
+        ]}
+    return {'c': f'spot@public.bookTicker.v3.api@{symbol}', 's': symbol,
+            'd': {'b': f'{bid:.8g}', 'a': f'{ask:.8g}'}}
+
+
+def make_stream_app(market: FakeMarket, interval: float = 0.1) -> web.Application:
+    connections = set()
+    # Подписки последнего соединения каждой биржи: по ним проверяется переподписка
+    stats = {'connections': {key: 0 for key in STREAM_VENUES}, 'subscribed': {key: set() for key in STREAM_VENUES}}
+
+    async def push(key: str, ws: web.WebSocketResponse, subscribed: set):
+        names = market.names[key]
+        while True:
+            await asyncio.sleep(interval)
+            for symbol in list(subscribed):
+                if symbol in names:
+                    await ws.send_json(stream_message(key, symbol, *market.quote(names[symbol])))
+
+    async def ws_handler(request: web.Request):
+        key = request.match_info['key']
+        if key not in STREAM_VENUES:
+            raise web.HTTPNotFound()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        stats['connections'][key] += 1
+        subscribed = stats['subscribed'][key] = set()
+        connections.add(ws)
+        pusher = asyncio.create_task(push(key, ws, subscribed))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    data = json.loads(msg.data)
+                except ValueError:
+                    continue  # текстовый 'ping' OKX
+                subscribed.update(subscribed_symbols(key, data))
+        finally:
+            pusher.cancel()
+            connections.discard(ws)
+        return ws
+
+    async def kucoin_bullet(request: web.Request):
+        return web.json_response({'code': '200000', 'data': {'token': 'fake', 'instanceServers': [
+            {'endpoint': f'ws://{request.host}/ws/kucoin', 'pingInterval': 18000}
+        ]}})
+
+    async def kill(request: web.Request):
+        # Обрыв всех соединений, как при рестарте шлюза биржи
+        closed = len(connections)
+        for ws in list(connections):
+            await ws.close()
+        return web.json_response({'closed': closed})
+
+    async def get_stats(request: web.Request):
+        return web.json_response({'connections': stats['connections'],
+                                  'subscribed': {key: sorted(s) for key, s in stats['subscribed'].items()}})
+
+    app = web.Application()
+    app.router.add_get('/ws/{key}', ws_handler)
+    app.router.add_post('/api/v1/bullet-public', kucoin_bullet)
+    app.router.add_post('/__kill', kill)
+    app.router.add_get('/__stats', get_stats)
+
+    async def close_connections(app: web.Application):
+        for ws in list(connections):
+            await ws.close()
+    app.on_shutdown.append(close_connections)
+    return app
+
+
+async def start_stream_server(market: FakeMarket, interval: float = 0.1,
+                              host: str = '127.0.0.1') -> Tuple[web.AppRunner, str, Dict[str, str]]:
+    # Возвращает раннер, базовый адрес (для /__kill, /__stats и bullet KuCoin) и url потоков для start_streams
+    runner = web.AppRunner(make_stream_app(market, interval), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f'http://{host}:{port}'
+    # KuCoin без прямого url: адрес выдает bullet, как у настоящей биржи
+    urls = {key: f'ws://{host}:{port}/ws/{key}' for key in STREAM_VENUES if key != 'kucoin'}
+    return runner, base, urls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--interval', type=float, default=0.1, help='период рассылки котировок (сек)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    async def run():
+        runner, base, urls = await start_stream_server(FakeMarket(make_symbols(args.symbols), args.seed), args.interval)
+        print(f"bullet   {base}/api/v1/bullet-public")
+        for key, url in urls.items():
+            print(f"{key:8} {url}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
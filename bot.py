@@ -1,276 +1,462 @@
 import asyncio
 import aiohttp
+import math
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import os
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
+from alerts import CLOSED, AlertSender, format_alerts_messages
+from arbmatrix import MODE_EXECUTABLE, top_opportunities
+from breaker import HALF_OPEN
+from cycles import ArbitrageGraph
+from discovery import INSTRUMENTS_TTL, discover_symbols
+from exchanges import ADAPTER_CLASSES, ExchangeAdapter, create_connector
+from metrics import ALERT_PRICE_AGE, LATE_VENUES, PRICE_AGE, TICK_DURATION, TICK_ERRORS, start_metrics_server
+from orderbook import OrderBook, net_profit, top_of_book
+from ratelimit import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from shards import ShardPool
+from streams import STREAM_CLASSES, KucoinStream, TickerStream
+from subscriptions import Subscriptions
+from tickers import TickerTable
+from tickstore import TickRecorder
 
 class ArbitrageBot:
-    def __init__(self):
+    def __init__(self, base_urls: Optional[Dict[str, str]] = None):
         self.session: Optional[aiohttp.ClientSession] = None
-        self.monitoring = {}
+        # Реестр адаптеров бирж: {'binance': BinanceAdapter, ...}
+        base_urls = base_urls or {}
+        self.adapters: Dict[str, ExchangeAdapter] = {
+            cls.key: cls(base_urls.get(cls.key)) for cls in ADAPTER_CLASSES
+        }
+        self.venue_keys = {adapter.name: key for key, adapter in self.adapters.items()}
+        # Общая таблица котировок: строка на (биржа, символ) переписывается на месте каждый тик
+        self.tickers = TickerTable()
+        for adapter in self.adapters.values():
+            adapter.table = self.tickers
+        # Общий снимок цен: {symbol_key: {'prices': [...], 'opportunities': [...]}}
+        self.snapshot: Dict[str, Dict] = {}
+        self.snapshot_time: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+        # WebSocket-потоки котировок: {'binance': BinanceStream, ...}
+        self.streams: Dict[str, TickerStream] = {}
+        # Объем сделки (USDT), для которого считается чистая прибыль по стаканам
+        self.notional = 1000.0
+        # Не больше стольких REST-запросов стакана на биржу за тик: число запросов не растет с числом пар
+        self.depth_per_venue = 5
+        # Граф (биржа, актив) для треугольного и многошагового арбитража
+        self.graph = ArbitrageGraph()
+        # Пары в графе: {(биржа, symbol_key): (base, quote)}; пропавшие из опроса удаляются
+        self.graph_tickers: Dict = {}
+        self.cycles: List[Dict] = []
+        # Запись всех тиков на диск для бэктестов (включается через TICK_STORE)
+        self.recorder: Optional[TickRecorder] = None
+        # Когда получена каждая цена: {(биржа, символ биржи): time.monotonic()}
+        self.price_times: Dict = {}
+        # Бюджет ожидания одной биржи за тик (сек): опоздавшие не задерживают остальных
+        self.latency_budget = 3.0
+        # Биржи без свежих данных в последнем опросе: {'aster': 'late' | 'queued' | 'open' | 'error'}
+        self.stale: Dict[str, str] = {}
+        # Опрос вынесен в процессы-воркеры: снимок приходит от них, сам движок бирж не опрашивает
+        self.shards: Optional[ShardPool] = None
+        # Воркер шарда: котировки бирж, отдающих весь рынок одним ответом, опрошенные фронтендом
+        # за этот тик: {'okx': {'prices': {символ: Ticker}, 'received': monotonic, 'stale': причина}}
+        self.shared: Dict[str, Dict] = {}
         
     async def init_session(self):
         if not self.session:
-            self.session = aiohttp.ClientSession()
+            self.session = aiohttp.ClientSession(connector=create_connector())
+            for adapter in self.adapters.values():
+                adapter.session = self.session
     
     async def close_session(self):
+        await self.stop_streams()
+        if self.recorder:
+            await self.recorder.close()
+            self.recorder = None
         if self.session:
             await self.session.close()
     
-    # ========== BINANCE ==========
-    async def get_binance_price(self, symbol: str) -> Optional[Dict]:
-        try:
-            url = f"https://api.binance.com/api/v3/ticker/24hr?symbol={symbol}"
-            async with self.session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return {
-                        'exchange': 'Binance',
-                        'symbol': symbol,
-                        'price': float(data['lastPrice']),
-                        'volume': float(data['volume']),
-                        'bid': float(data['bidPrice']),
-                        'ask': float(data['askPrice'])
-                    }
-        except Exception as e:
-            print(f"Ошибка Binance {symbol}: {e}")
-        return None
+    # ========== ПОТОКОВЫЙ РЕЖИМ ==========
+    async def start_streams(self, symbols: Dict[str, Dict], urls: Optional[Dict[str, str]] = None,
+                            bullet_url: Optional[str] = None):
+        # urls подменяют адреса потоков, bullet_url - REST-выдачу адреса KuCoin (для локальных заглушек)
+        await self.init_session()
+        urls = urls or {}
+        
+        for stream_cls in STREAM_CLASSES:
+            venue_symbols = [cfg[stream_cls.key] for cfg in symbols.values() if stream_cls.key in cfg]
+            if not venue_symbols or stream_cls.key in self.streams:
+                continue
+            stream = stream_cls(venue_symbols, url=urls.get(stream_cls.key))
+            if bullet_url and isinstance(stream, KucoinStream):
+                stream.bullet_url = bullet_url
+            stream.on_connect = self.fill_stream_gap
+            self.streams[stream_cls.key] = stream
+            stream.start(self.session)
     
-    # ========== GATE.IO ==========
-    async def get_gateio_price(self, symbol: str) -> Optional[Dict]:
-        try:
-            url = f"https://api.gateio.ws/api/v4/spot/tickers?currency_pair={symbol}"
-            async with self.session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    if data:
-                        ticker = data[0]
-                        return {
-                            'exchange': 'Gate.io',
-                            'symbol': symbol,
-                            'price': float(ticker['last']),
-                            'volume': float(ticker['base_volume']),
-                            'bid': float(ticker['highest_bid']),
-                            'ask': float(ticker['lowest_ask'])
-                        }
-        except Exception as e:
-            print(f"Ошибка Gate.io {symbol}: {e}")
-        return None
+    async def stop_streams(self):
+        for stream in self.streams.values():
+            await stream.stop()
+        self.streams = {}
     
-    # ========== BYBIT ==========
-    async def get_bybit_price(self, symbol: str) -> Optional[Dict]:
-        try:
-            url = f"https://api.bybit.com/v5/market/tickers?category=spot&symbol={symbol}"
-            async with self.session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    if data['retCode'] == 0 and data['result']['list']:
-                        ticker = data['result']['list'][0]
-                        return {
-                            'exchange': 'Bybit',
-                            'symbol': symbol,
-                            'price': float(ticker['lastPrice']),
-                            'volume': float(ticker['volume24h']),
-                            'bid': float(ticker['bid1Price']),
-                            'ask': float(ticker['ask1Price'])
-                        }
-        except Exception as e:
-            print(f"Ошибка Bybit {symbol}: {e}")
-        return None
+    async def fill_stream_gap(self, stream: TickerStream):
+        # После (пере)подключения добираем пропущенное через REST
+        since = time.monotonic()
+        prices = await self.adapters[stream.key].get_prices(stream.symbols)
+        for symbol, price in prices.items():
+            stream.seed(symbol, price, since)
     
-    # ========== KUCOIN ==========
-    async def get_kucoin_price(self, symbol: str) -> Optional[Dict]:
-        try:
-            url = f"https://api.kucoin.com/api/v1/market/orderbook/level1?symbol={symbol}"
-            async with self.session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    if data['code'] == '200000':
-                        ticker = data['data']
-                        return {
-                            'exchange': 'KuCoin',
-                            'symbol': symbol,
-                            'price': float(ticker['price']),
-                            'volume': 0,
-                            'bid': float(ticker['bestBid']),
-                            'ask': float(ticker['bestAsk'])
-                        }
-        except Exception as e:
-            print(f"Ошибка KuCoin {symbol}: {e}")
-        return None
+    # ========== ДОСТУПНОСТЬ БИРЖ ==========
+    def venue_available(self, key: str, probe_symbols: List) -> bool:
+        # Открытый автомат - биржу пропускаем; когда пауза прошла, проверяем ее одним запросом в фоне
+        breaker = self.adapters[key].breaker
+        if breaker.allow():
+            return True
+        if breaker.start_probe():
+            asyncio.create_task(self.probe_venue(key, probe_symbols[:1]))
+        return False
     
-    # ========== OKX ==========
-    async def get_okx_price(self, symbol: str) -> Optional[Dict]:
-        try:
-            url = f"https://www.okx.com/api/v5/market/ticker?instId={symbol}"
-            async with self.session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    if data['code'] == '0' and data['data']:
-                        ticker = data['data'][0]
-                        return {
-                            'exchange': 'OKX',
-                            'symbol': symbol,
-                            'price': float(ticker['last']),
-                            'volume': float(ticker['vol24h']),
-                            'bid': float(ticker['bidPx']),
-                            'ask': float(ticker['askPx'])
-                        }
-        except Exception as e:
-            print(f"Ошибка OKX {symbol}: {e}")
-        return None
+    async def probe_venue(self, key: str, symbols: List):
+        adapter = self.adapters[key]
+        await adapter.get_prices(symbols)
+        if adapter.breaker.state == HALF_OPEN:
+            # Ответ без исхода для автомата (например, 429) тоже считаем неудачной пробой
+            adapter.breaker.record_failure()
     
-    # ========== ASTER (HUOBI) ==========
-    async def get_aster_price(self, symbol: str) -> Optional[Dict]:
+    async def within_budget(self, key: str, coro, dispatched: asyncio.Future) -> Tuple[Any, Optional[str]]:
+        # Запрос к бирже не дольше latency_budget от отправки; опоздание - неудача для автомата.
+        # Ожидание в очереди своего лимитера и слотов - не вина биржи: оно ограничено тем же бюджетом,
+        # но автомат не трогает. Возвращает (результат, причина отсутствия): отметить биржу без данных
+        # решает вызывающий - опоздавший стакан не значит, что у биржи нет цен
+        task = asyncio.ensure_future(coro)
         try:
-            url = f"https://api.huobi.pro/market/detail/merged?symbol={symbol}"
-            async with self.session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    if data['status'] == 'ok':
-                        tick = data['tick']
-                        return {
-                            'exchange': 'Aster/Huobi',
-                            'symbol': symbol,
-                            'price': float(tick['close']),
-                            'volume': float(tick['vol']),
-                            'bid': float(tick['bid'][0]) if tick.get('bid') else 0,
-                            'ask': float(tick['ask'][0]) if tick.get('ask') else 0
-                        }
-        except Exception as e:
-            print(f"Ошибка Aster/Huobi {symbol}: {e}")
-        return None
+            done, _ = await asyncio.wait([task, dispatched], timeout=self.latency_budget,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                return None, 'queued'
+            return await asyncio.wait_for(task, self.latency_budget), None
+        except asyncio.TimeoutError:
+            self.adapters[key].breaker.record_failure()
+            return None, 'late'
+        finally:
+            task.cancel()
     
-    # ========== MEXC ==========
-    async def get_mexc_price(self, symbol: str) -> Optional[Dict]:
-        try:
-            url = f"https://api.mexc.com/api/v3/ticker/24hr?symbol={symbol}"
-            async with self.session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return {
-                        'exchange': 'MEXC',
-                        'symbol': symbol,
-                        'price': float(data['lastPrice']),
-                        'volume': float(data['volume']),
-                        'bid': float(data['bidPrice']),
-                        'ask': float(data['askPrice'])
-                    }
-        except Exception as e:
-            print(f"Ошибка MEXC {symbol}: {e}")
-        return None
+    def stream_book(self, key: str, symbol: str) -> Optional[OrderBook]:
+        stream = self.streams.get(key)
+        return stream.get_book(symbol) if stream else None
     
-    # ========== UNISWAP V3 ==========
-    async def get_uniswap_price(self, token0: str, token1: str) -> Optional[Dict]:
-        try:
-            query = """
-            {
-              pools(
-                first: 1,
-                orderBy: totalValueLockedUSD,
-                orderDirection: desc,
-                where: {
-                  token0: "%s",
-                  token1: "%s"
-                }
-              ) {
-                token0Price
-                volumeUSD
-              }
-            }
-            """ % (token0.lower(), token1.lower())
-            
-            url = "https://api.thegraph.com/subgraphs/name/uniswap/uniswap-v3"
-            async with self.session.post(url, json={'query': query}, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    if data.get('data', {}).get('pools'):
-                        pool = data['data']['pools'][0]
-                        return {
-                            'exchange': 'Uniswap V3',
-                            'symbol': f'{token0[:6]}/{token1[:6]}',
-                            'price': float(pool['token0Price']),
-                            'volume': float(pool['volumeUSD']),
-                            'bid': 0,
-                            'ask': 0
-                        }
-        except Exception as e:
-            print(f"Ошибка Uniswap: {e}")
-        return None
+    async def get_book(self, key: str, symbol: str, priority: int = PRIORITY_BACKGROUND) -> Optional[OrderBook]:
+        # Локальный стакан из потока глубины, иначе REST-снимок
+        book = self.stream_book(key, symbol)
+        if book:
+            return book
+        if not self.adapters[key].breaker.allow():
+            return None
+        # Опоздавший стакан - только возможность без стакана (depth=False), цены биржи в тике остаются
+        dispatched = asyncio.get_running_loop().create_future()
+        book, _ = await self.within_budget(key, self.adapters[key].get_depth(symbol, priority, dispatched), dispatched)
+        return book
     
-    def calculate_arbitrage(self, prices: List[Dict]) -> List[Dict]:
-        opportunities = []
+    async def get_prices(self, key: str, symbols: List, priority: int = PRIORITY_BACKGROUND) -> Dict:
+        # Котировки из потока, недостающие символы одним пакетным REST-запросом
+        prices = {}
+        stream = self.streams.get(key)
+        if stream:
+            for symbol in symbols:
+                quote = stream.get_quote(symbol)
+                if quote:
+                    prices[symbol] = quote
+                    self.price_times[(key, symbol)] = stream.book[symbol]['ts']
+        missing = [s for s in symbols if s not in prices]
+        shared = self.shared.get(key)
+        if missing and shared is not None:
+            # Запрос уже сделал фронтенд шардов, один на все воркеры
+            if shared['stale']:
+                self.stale[key] = shared['stale']
+            for symbol in missing:
+                row = shared['prices'].get(symbol)
+                if row is not None:
+                    self.price_times[(key, symbol)] = shared['received']
+                    prices[symbol] = row
+            return prices
+        if missing:
+            if not self.venue_available(key, missing):
+                self.stale[key] = 'open'
+                return prices
+            dispatched = asyncio.get_running_loop().create_future()
+            fetched, reason = await self.within_budget(
+                key, self.adapters[key].get_prices(missing, priority, dispatched), dispatched
+            )
+            if reason:
+                if reason == 'late':
+                    LATE_VENUES.inc(self.adapters[key].name)
+                self.stale[key] = reason
+                return prices
+            if not fetched:
+                self.stale[key] = 'error'
+            received = time.monotonic()
+            # Строки таблицы котировок переписывают следующий опрос, проба и дозаполнение потока:
+            # в тик и снимок идут копии, чтобы цены не менялись под посчитанными по ним возможностями
+            for symbol, row in fetched.items():
+                self.price_times[(key, symbol)] = received
+                prices[symbol] = row.copy()
+        return prices
+    
+    async def monitor_all(self, symbols: Dict[str, Dict], priority: int = PRIORITY_BACKGROUND) -> Dict[str, List[Dict]]:
+        # Один запрос на биржу за тик, результат раздается по всем символам.
+        # Биржи без ответа в пределах бюджета попадают в self.stale, тик считается без них.
+        self.stale = {}
+        keys = []
+        tasks = []
+        for key in self.adapters:
+            venue_symbols = list(dict.fromkeys(cfg[key] for cfg in symbols.values() if key in cfg))
+            if venue_symbols:
+                keys.append(key)
+                tasks.append(self.get_prices(key, venue_symbols, priority))
         
-        for i, price1 in enumerate(prices):
-            for price2 in prices[i+1:]:
-                if price1 and price2:
-                    diff_percent = ((price2['price'] - price1['price']) / price1['price']) * 100
-                    
-                    opportunities.append({
-                        'buy_exchange': price1['exchange'],
-                        'sell_exchange': price2['exchange'],
-                        'buy_price': price1['price'],
-                        'sell_price': price2['price'],
-                        'difference': abs(diff_percent),
-                        'profit_direction': 'BUY' if diff_percent > 0 else 'SELL'
-                    })
+        results = dict(zip(keys, await asyncio.gather(*tasks)))
         
-        return sorted(opportunities, key=lambda x: x['difference'], reverse=True)
+        return {
+            symbol_key: [
+                results[key][symbol_config[key]]
+                for key in self.adapters
+                if key in symbol_config and symbol_config[key] in results.get(key, {})
+            ]
+            for symbol_key, symbol_config in symbols.items()
+        }
     
-    async def monitor_symbol(self, symbol_config: Dict):
-        tasks = []
+    # ========== ОБЩИЙ СНИМОК ЦЕН ==========
+    def snapshot_age(self) -> Optional[float]:
+        if self.snapshot_time is None:
+            return None
+        return time.monotonic() - self.snapshot_time
+    
+    async def _refresh(self, symbols: Dict[str, Dict], priority: int = PRIORITY_BACKGROUND):
+        results = await self.monitor_all(symbols, priority)
+        if self.recorder:
+            self.recorder.record(results)
+        
+        opportunities = await self.evaluate_opportunities(symbols, results, priority)
+        self.observe_price_age(symbols, results)
+        self.cycles = self.update_graph(symbols, results)
+        
+        stale = {
+            symbol_key: {self.adapters[key].name: reason for key, reason in self.stale.items() if key in config}
+            for symbol_key, config in symbols.items()
+        }
+        self.snapshot = self.build_snapshot(results, opportunities, stale)
+        self.snapshot_time = time.monotonic()
+    
+    def observe_price_age(self, symbols: Dict[str, Dict], results: Dict[str, List[Dict]]):
+        # Возраст каждой цены на момент, когда по ней принято решение
+        decided = time.monotonic()
+        for symbol_key, prices in results.items():
+            for price in prices:
+                key = self.venue_keys[price['exchange']]
+                received = self.price_times.get((key, symbols[symbol_key][key]))
+                if received is not None:
+                    PRICE_AGE.set(decided - received, price['exchange'], symbol_key)
+    
+    def build_snapshot(self, results: Dict[str, List[Dict]], opportunities: Dict[str, List[Dict]],
+                       stale: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Dict]:
+        stale = stale or {}
+        return {
+            key: {'prices': prices, 'opportunities': opportunities.get(key, []), 'stale': stale.get(key, {})}
+            for key, prices in results.items()
+        }
+    
+    async def evaluate_opportunities(self, symbols: Dict[str, Dict], results: Dict[str, List[Dict]],
+                                     priority: int = PRIORITY_BACKGROUND) -> Dict[str, List[Dict]]:
+        candidates = self.find_candidates(symbols, results)
+        books = await self.fetch_books(candidates, priority)
+        return self.score_candidates(results, candidates, books)
+    
+    def find_candidates(self, symbols: Dict[str, Dict], results: Dict[str, List[Dict]]) -> List:
+        # Спреды ask/bid по всем символам считаются одним векторным проходом
+        keys = [key for key, prices in results.items() if len(prices) >= 2]
+        executable = top_opportunities([results[key] for key in keys], mode=MODE_EXECUTABLE)
         
-        if 'binance' in symbol_config:
-            tasks.append(self.get_binance_price(symbol_config['binance']))
-        if 'gateio' in symbol_config:
-            tasks.append(self.get_gateio_price(symbol_config['gateio']))
-        if 'bybit' in symbol_config:
-            tasks.append(self.get_bybit_price(symbol_config['bybit']))
-        if 'kucoin' in symbol_config:
-            tasks.append(self.get_kucoin_price(symbol_config['kucoin']))
-        if 'okx' in symbol_config:
-            tasks.append(self.get_okx_price(symbol_config['okx']))
-        if 'aster' in symbol_config:
-            tasks.append(self.get_aster_price(symbol_config['aster']))
-        if 'mexc' in symbol_config:
-            tasks.append(self.get_mexc_price(symbol_config['mexc']))
-        if 'uniswap' in symbol_config:
-            token0, token1 = symbol_config['uniswap']
-            tasks.append(self.get_uniswap_price(token0, token1))
+        # Стаканы нужны только там, где валовый спред перекрывает комиссии
+        candidates = []
+        for symbol_key, opps in zip(keys, executable):
+            symbol_config = symbols.get(symbol_key, {})
+            for opp in opps:
+                buy_key, sell_key = self.venue_keys[opp['buy_exchange']], self.venue_keys[opp['sell_exchange']]
+                fees = (self.adapters[buy_key].taker_fee + self.adapters[sell_key].taker_fee) * 100
+                if opp['difference'] > fees:
+                    candidates.append((
+                        symbol_key, opp,
+                        (buy_key, symbol_config.get(buy_key, symbol_key)),
+                        (sell_key, symbol_config.get(sell_key, symbol_key))
+                    ))
+        return candidates
+    
+    async def fetch_books(self, candidates: List, priority: int = PRIORITY_BACKGROUND) -> Dict:
+        # Стаканы берутся для кандидатов с наибольшим валовым спредом, пока у обеих бирж сделки есть
+        # запас depth_per_venue; остальные считаются по лучшей цене (depth=False).
+        # Стаканы из потоков глубины запросов не стоят и в лимит не входят
+        needed, requests = set(), {}
+        for _, opp, buy, sell in sorted(candidates, key=lambda c: c[1]['difference'], reverse=True):
+            legs = [leg for leg in (buy, sell) if leg not in needed and not self.stream_book(*leg)]
+            if all(requests.get(key, 0) < self.depth_per_venue for key, _ in legs):
+                for key, _ in legs:
+                    requests[key] = requests.get(key, 0) + 1
+                needed.update((buy, sell))
+        needed = list(needed)
+        return dict(zip(needed, await asyncio.gather(*(self.get_book(k, s, priority) for k, s in needed))))
+    
+    def score_candidates(self, results: Dict[str, List[Dict]], candidates: List, books: Dict) -> Dict[str, List[Dict]]:
+        # Чистая прибыль по стаканам; без стакана - по лучшей цене с одними комиссиями
+        opportunities: Dict[str, List[Dict]] = {key: [] for key, prices in results.items() if len(prices) >= 2}
+        for symbol_key, opp, buy, sell in candidates:
+            buy_book, sell_book = books.get(buy), books.get(sell)
+            result = net_profit(
+                buy_book or top_of_book(0, opp['buy_price']),
+                sell_book or top_of_book(opp['sell_price'], 0),
+                self.notional,
+                self.adapters[buy[0]].taker_fee,
+                self.adapters[sell[0]].taker_fee
+            )
+            if result:
+                opp.update(result, depth=buy_book is not None and sell_book is not None)
+                opportunities[symbol_key].append(opp)
         
-        prices = await asyncio.gather(*tasks)
-        prices = [p for p in prices if p is not None]
+        for opps in opportunities.values():
+            opps.sort(key=lambda x: x['net_percent'], reverse=True)
+        return opportunities
+    
+    def update_graph(self, symbols: Dict[str, Dict], results: Dict[str, List[Dict]]) -> List[Dict]:
+        # Граф пересчитывается только по изменившимся тикерам
+        current = {}
+        for symbol_key, prices in results.items():
+            base, quote = symbols[symbol_key]['name'].split('/')
+            for price in prices:
+                fee = self.adapters[self.venue_keys[price['exchange']]].taker_fee
+                self.graph.update_ticker(price['exchange'], base, quote, price['bid'], price['ask'], fee)
+                current[(price['exchange'], symbol_key)] = (base, quote)
+        # Биржа без цены в этом тике (ошибка, автомат, опоздание) или убранная пара - не источник циклов
+        for (venue, symbol_key), (base, quote) in self.graph_tickers.items():
+            if (venue, symbol_key) not in current:
+                self.graph.remove_ticker(venue, base, quote)
+        self.graph_tickers = current
+        return self.graph.revalidate()
+    
+    async def refresh_snapshot(self, symbols: Dict[str, Dict]) -> Dict[str, Dict]:
+        # Один опрос бирж на тик, независимо от числа подписанных чатов
+        if self.shards:
+            return self.snapshot
+        async with self._refresh_lock:
+            await self._refresh(symbols)
+        return self.snapshot
+    
+    async def get_snapshot(self, symbols: Dict[str, Dict], max_age: float,
+                           priority: int = PRIORITY_BACKGROUND) -> Dict[str, Dict]:
+        age = self.snapshot_age()
+        if age is not None and age <= max_age:
+            return self.snapshot
+        if self.shards:
+            # Снимок собирают воркеры, сам движок бирж не опрашивает: устаревший снимок не показываем.
+            # Пустой ответ - воркер отстал или упал, а склейка ждет все шарды
+            return {}
         
-        return prices
+        async with self._refresh_lock:
+            # Пока ждали блокировку, снимок мог обновить другой запрос
+            age = self.snapshot_age()
+            if age is None or age > max_age:
+                await self._refresh(symbols, priority)
+        return self.snapshot
     
-    def format_telegram_message(self, symbol: str, prices: List[Dict], opportunities: List[Dict], threshold: float = 0.5) -> str:
+    def format_telegram_message(self, symbol: str, prices: List[Dict], opportunities: List[Dict], threshold: float = 0.5,
+                                stale: Optional[Dict[str, str]] = None) -> str:
         msg = f"🔄 <b>{symbol}</b>\n"
         msg += f"⏰ {datetime.now().strftime('%H:%M:%S')}\n\n"
         
         msg += "💰 <b>ЦЕНЫ НА БИРЖАХ:</b>\n"
         for price in sorted(prices, key=lambda x: x['price']):
             msg += f"├ <code>{price['exchange']:12}</code> ${price['price']:.4f}\n"
+        if stale:
+            reasons = {'late': 'не успела', 'queued': 'в очереди запросов', 'open': 'временно отключена',
+                       'error': 'ошибка'}
+            msg += "⚠️ Без данных: " + ', '.join(f"{name} ({reasons.get(r, r)})" for name, r in stale.items()) + "\n"
         
-        # Фильтруем возможности по порогу
-        filtered = [o for o in opportunities if o['difference'] >= threshold]
+        # Фильтруем возможности по порогу чистой прибыли (после комиссий и проскальзывания)
+        filtered = [o for o in opportunities if o.get('net_percent', o['difference']) >= threshold]
         
         if filtered:
             msg += f"\n🔥 <b>АРБИТРАЖ &gt; {threshold}%:</b>\n"
             for i, opp in enumerate(filtered[:3], 1):
-                msg += f"\n{i}. <b>{opp['difference']:.2f}%</b> разница\n"
-                msg += f"├ Купить:  {opp['buy_exchange']} @ ${opp['buy_price']:.4f}\n"
-                msg += f"└ Продать: {opp['sell_exchange']} @ ${opp['sell_price']:.4f}\n"
+                if 'net_percent' in opp:
+                    depth = '' if opp['depth'] else ' (без стакана)'
+                    msg += f"\n{i}. <b>{opp['net_percent']:.2f}%</b> чистыми, спред {opp['difference']:.2f}%\n"
+                    msg += f"├ Объем: ${opp['notional']:.0f}, прибыль ${opp['net_profit']:.2f}{depth}\n"
+                    msg += f"├ Купить:  {opp['buy_exchange']} @ ${opp['buy_avg']:.4f}\n"
+                    msg += f"└ Продать: {opp['sell_exchange']} @ ${opp['sell_avg']:.4f}\n"
+                else:
+                    msg += f"\n{i}. <b>{opp['difference']:.2f}%</b> разница\n"
+                    msg += f"├ Купить:  {opp['buy_exchange']} @ ${opp['buy_price']:.4f}\n"
+                    msg += f"└ Продать: {opp['sell_exchange']} @ ${opp['sell_price']:.4f}\n"
         else:
             msg += f"\n✅ Нет арбитража &gt; {threshold}%\n"
         
         return msg
+    
+    def format_cycles_message(self, cycles: List[Dict], limit: int = 3) -> str:
+        msg = "🔺 <b>ЦИКЛЫ АРБИТРАЖА:</b>\n"
+        for i, cycle in enumerate(cycles[:limit], 1):
+            path = ' → '.join(f"{asset}@{venue}" for venue, asset in cycle['path'])
+            msg += f"\n{i}. <b>{cycle['profit_percent']:.2f}%</b>\n└ {path}\n"
+        return msg
 
 # Глобальный экземпляр бота
 arbitrage_bot = ArbitrageBot()
 
-# Конфигурация символов
+# Очередь отправки уведомлений; bot подставляется при старте приложения
+alert_sender = AlertSender()
+
+# Период опроса бирж центральным движком (сек)
+POLL_INTERVAL = 60
+
+# STREAM_MODE=1 включает WebSocket-котировки вместо REST-опроса
+STREAM_MODE = os.getenv('STREAM_MODE', '0') == '1'
+
+# Каталог для записи тиков; пусто = не записывать
+TICK_STORE = os.getenv('TICK_STORE', '')
+
+# Порт HTTP-эндпоинта метрик (/metrics); Render передает порт web-сервиса в PORT, 0 = выключено
+METRICS_PORT = int(os.getenv('METRICS_PORT') or os.getenv('PORT') or 0)
+
+# SHARD_WORKERS=N выносит опрос бирж и поиск возможностей в N процессов; этот процесс - только Telegram
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', '0'))
+
+# Ethereum JSON-RPC для цен Uniswap V3 (пусто = публичный узел) и файл кэша адресов пулов
+ETH_RPC_URL = os.getenv('ETH_RPC_URL', '')
+UNISWAP_POOL_CACHE = os.getenv('UNISWAP_POOL_CACHE', 'uniswap_pools.json')
+
+# Файл SQLite с подписками чатов (порог, период сводки, список пар)
+SUBSCRIPTIONS_DB = os.getenv('SUBSCRIPTIONS_DB', 'subscriptions.db')
+
+# Подписки чатов; база открывается при старте приложения. Сводка не чаще одного тика опроса
+subscriptions = Subscriptions(POLL_INTERVAL)
+
+# SYMBOL_DISCOVERY=1 строит список пар из списков инструментов бирж (пары хотя бы на двух биржах)
+SYMBOL_DISCOVERY = os.getenv('SYMBOL_DISCOVERY', '0') == '1'
+
+# Кэш списков инструментов бирж на диске и ограничение числа пар в мониторинге (0 = без ограничения)
+INSTRUMENTS_CACHE = os.getenv('INSTRUMENTS_CACHE', 'instruments.json')
+SYMBOLS_LIMIT = int(os.getenv('SYMBOLS_LIMIT', '300'))
+
+# Пар на одной странице меню (по две кнопки в ряд)
+MENU_PAGE_SIZE = 12
+
+# "Все монеты" при большом списке присылает только столько пар с лучшей прибылью
+CHECK_ALL_LIMIT = 10
+
+# Ответ кнопок, когда воркеры опроса не прислали снимок за период опроса (режим SHARD_WORKERS)
+NO_FRESH_DATA = "⏳ Нет свежих данных: опрос бирж отстает, попробуйте позже"
+
+# Конфигурация символов; при SYMBOL_DISCOVERY дополняется найденными парами
 SYMBOLS = {
     'BTC': {
         'name': 'BTC/USDT',
@@ -316,26 +502,90 @@ SYMBOLS = {
     }
 }
 
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# Ручной список: основа и приоритет при поиске пар
+MANUAL_SYMBOLS = dict(SYMBOLS)
+
+def configure_engine(engine: ArbitrageBot) -> ArbitrageBot:
+    uniswap = engine.adapters['uniswap']
+    if ETH_RPC_URL:
+        uniswap.base_url = ETH_RPC_URL
+    uniswap.load_pools(UNISWAP_POOL_CACHE)
+    return engine
+
+def create_engine(base_urls: Optional[Dict[str, str]] = None) -> ArbitrageBot:
+    # Движок опроса для процесса-воркера, с теми же настройками окружения
+    return configure_engine(ArbitrageBot(base_urls))
+
+async def refresh_symbols():
+    symbols = await discover_symbols(arbitrage_bot.adapters, MANUAL_SYMBOLS, INSTRUMENTS_CACHE, limit=SYMBOLS_LIMIT)
+    # Подменяем на месте под блокировкой снимка: опрос не увидит список наполовину
+    async with arbitrage_bot._refresh_lock:
+        SYMBOLS.clear()
+        SYMBOLS.update(symbols)
+    if arbitrage_bot.shards:
+        arbitrage_bot.shards.set_symbols(SYMBOLS)
+
+async def discovery_job(context: ContextTypes.DEFAULT_TYPE):
+    await arbitrage_bot.init_session()
+    await refresh_symbols()
+
+def build_menu(page: int = 0) -> InlineKeyboardMarkup:
+    # Постраничный выбор пары: сотни пар не помещаются в одну клавиатуру
+    keys = list(SYMBOLS)
+    pages = max(1, math.ceil(len(keys) / MENU_PAGE_SIZE))
+    page = page % pages
+    chunk = keys[page * MENU_PAGE_SIZE:(page + 1) * MENU_PAGE_SIZE]
     keyboard = [
-        [InlineKeyboardButton("📊 BTC/USDT", callback_data='check_BTC')],
-        [InlineKeyboardButton("📊 ETH/USDT", callback_data='check_ETH')],
-        [InlineKeyboardButton("📊 BNB/USDT", callback_data='check_BNB')],
-        [InlineKeyboardButton("📊 SOL/USDT", callback_data='check_SOL')],
+        [InlineKeyboardButton(f"📊 {SYMBOLS[key]['name']}", callback_data=f'check_{key}') for key in chunk[i:i + 2]]
+        for i in range(0, len(chunk), 2)
+    ]
+    if pages > 1:
+        keyboard.append([
+            InlineKeyboardButton("◀️", callback_data=f'page_{page - 1}'),
+            InlineKeyboardButton(f"{page + 1}/{pages}", callback_data='noop'),
+            InlineKeyboardButton("▶️", callback_data=f'page_{page + 1}')
+        ])
+    keyboard += [
         [InlineKeyboardButton("🔄 Все монеты", callback_data='check_ALL')],
         [InlineKeyboardButton("🔔 Авто-мониторинг", callback_data='auto_monitor')],
         [InlineKeyboardButton("⛔ Остановить мониторинг", callback_data='stop_monitor')]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
+    return InlineKeyboardMarkup(keyboard)
+
+def format_subscription(chat: Dict) -> str:
+    watch = ', '.join(sorted(chat['symbols'])) if chat['symbols'] else 'все пары'
+    status = "🔔 включен" if chat['enabled'] else "⛔ выключен (включается в меню /start)"
+    return (
+        f"Мониторинг: {status}\n"
+        f"Уведомления о чистой прибыли &gt; {chat['threshold']:.2f}%:\n"
+        "только когда возможность открылась, выросла или закрылась\n"
+        f"Пары: {watch}\n"
+        f"Сводка не чаще раза в {chat['interval']:.0f} с\n\n"
+        "Настройка: /watch BTC ETH (без пар - все), /threshold 1.0, /interval 300"
+    )
+
+def resolve_symbols(args: List[str]):
+    # Пары из аргументов команды: ключ SYMBOLS ('BTC') или название ('BTC/USDT'), через пробел или запятую
+    names = {config['name'].upper(): key for key, config in SYMBOLS.items()}
+    keys, unknown = [], []
+    for arg in ' '.join(args).replace(',', ' ').upper().split():
+        key = arg if arg in SYMBOLS else names.get(arg)
+        if key:
+            keys.append(key)
+        else:
+            unknown.append(arg)
+    return keys, unknown
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "🤖 <b>DEX-CEX Арбитражный бот</b>\n\n"
         "Отслеживаю разницу цен на:\n"
         "• Binance, Gate.io, Bybit\n"
         "• KuCoin, OKX, MEXC\n"
         "• Aster/Huobi, Uniswap V3\n\n"
+        f"Пар в мониторинге: {len(SYMBOLS)}\n\n"
         "Выберите действие:",
-        reply_markup=reply_markup,
+        reply_markup=build_menu(),
         parse_mode='HTML'
     )
 
@@ -345,45 +595,80 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await arbitrage_bot.init_session()
     
-    if query.data == 'check_ALL':
+    if query.data == 'noop':
+        return
+    
+    elif query.data.startswith('page_'):
+        await query.edit_message_reply_markup(reply_markup=build_menu(int(query.data.replace('page_', ''))))
+    
+    elif query.data == 'check_ALL':
         await query.edit_message_text("⏳ Проверяю все монеты...")
         
-        for symbol_key, symbol_config in SYMBOLS.items():
+        snapshot = await arbitrage_bot.get_snapshot(SYMBOLS, max_age=POLL_INTERVAL, priority=PRIORITY_INTERACTIVE)
+        if not snapshot:
+            keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data='back')]]
+            await query.edit_message_text(NO_FRESH_DATA, reply_markup=InlineKeyboardMarkup(keyboard))
+            return
+        
+        checked = [key for key in SYMBOLS if key in snapshot and len(snapshot[key]['prices']) >= 2]
+        shown = checked
+        if len(checked) > CHECK_ALL_LIMIT:
+            # Сотни пар по сообщению на каждую не шлем: только лучшие по чистой прибыли
+            def best(key):
+                opps = snapshot[key]['opportunities']
+                return opps[0].get('net_percent', opps[0]['difference']) if opps else -math.inf
+            shown = sorted(checked, key=best, reverse=True)[:CHECK_ALL_LIMIT]
+        
+        for symbol_key in shown:
             try:
-                prices = await arbitrage_bot.monitor_symbol(symbol_config)
-                if len(prices) >= 2:
-                    opportunities = arbitrage_bot.calculate_arbitrage(prices)
-                    msg = arbitrage_bot.format_telegram_message(
-                        symbol_config['name'], prices, opportunities
-                    )
-                    await context.bot.send_message(
-                        chat_id=query.message.chat_id,
-                        text=msg,
-                        parse_mode='HTML'
-                    )
-                await asyncio.sleep(1)
+                entry = snapshot[symbol_key]
+                msg = arbitrage_bot.format_telegram_message(
+                    SYMBOLS[symbol_key]['name'], entry['prices'], entry['opportunities'], stale=entry['stale']
+                )
+                await context.bot.send_message(
+                    chat_id=query.message.chat_id,
+                    text=msg,
+                    parse_mode='HTML'
+                )
             except Exception as e:
                 print(f"Ошибка {symbol_key}: {e}")
         
+        if arbitrage_bot.cycles:
+            await context.bot.send_message(
+                chat_id=query.message.chat_id,
+                text=arbitrage_bot.format_cycles_message(arbitrage_bot.cycles),
+                parse_mode='HTML'
+            )
+        
         keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data='back')]]
+        done = "✅ Проверка завершена!"
+        if len(shown) < len(checked):
+            done += f"\nПоказаны {len(shown)} лучших из {len(checked)} пар, остальные - в меню"
         await context.bot.send_message(
             chat_id=query.message.chat_id,
-            text="✅ Проверка завершена!",
+            text=done,
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
     
     elif query.data.startswith('check_'):
         symbol_key = query.data.replace('check_', '')
-        symbol_config = SYMBOLS[symbol_key]
+        symbol_config = SYMBOLS.get(symbol_key)
+        if not symbol_config:
+            # Кнопка из старого меню: пару убрали при обновлении списка
+            await query.edit_message_text("❌ Пара больше не отслеживается", reply_markup=build_menu())
+            return
         
         await query.edit_message_text(f"⏳ Проверяю {symbol_config['name']}...")
         
         try:
-            prices = await arbitrage_bot.monitor_symbol(symbol_config)
-            if len(prices) >= 2:
-                opportunities = arbitrage_bot.calculate_arbitrage(prices)
+            snapshot = await arbitrage_bot.get_snapshot(SYMBOLS, max_age=POLL_INTERVAL, priority=PRIORITY_INTERACTIVE)
+            entry = snapshot.get(symbol_key)
+            if not snapshot:
+                keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data='back')]]
+                await query.edit_message_text(NO_FRESH_DATA, reply_markup=InlineKeyboardMarkup(keyboard))
+            elif entry and len(entry['prices']) >= 2:
                 msg = arbitrage_bot.format_telegram_message(
-                    symbol_config['name'], prices, opportunities
+                    symbol_config['name'], entry['prices'], entry['opportunities'], stale=entry['stale']
                 )
                 
                 keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data='back')]]
@@ -401,79 +686,155 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     elif query.data == 'auto_monitor':
         chat_id = query.message.chat_id
-        if chat_id not in arbitrage_bot.monitoring or not arbitrage_bot.monitoring[chat_id]:
-            arbitrage_bot.monitoring[chat_id] = True
+        if not subscriptions.get(chat_id)['enabled']:
+            chat = subscriptions.subscribe(chat_id)
             await query.edit_message_text(
                 "🔔 <b>Авто-мониторинг включен!</b>\n\n"
-                "Буду отправлять уведомления о разнице &gt; 0.5%\n"
-                "Проверка каждые 60 секунд\n\n"
+                f"{format_subscription(chat)}\n\n"
                 "Для остановки нажмите 'Остановить мониторинг'",
                 parse_mode='HTML'
             )
-            
-            context.job_queue.run_repeating(
-                auto_monitor_job,
-                interval=60,
-                first=5,
-                chat_id=chat_id,
-                name=f'monitor_{chat_id}'
-            )
         else:
             await query.answer("Мониторинг уже запущен!")
     
     elif query.data == 'stop_monitor':
         chat_id = query.message.chat_id
-        arbitrage_bot.monitoring[chat_id] = False
-        
-        jobs = context.job_queue.get_jobs_by_name(f'monitor_{chat_id}')
-        for job in jobs:
-            job.schedule_removal()
+        subscriptions.unsubscribe(chat_id)
         
         await query.edit_message_text("⛔ Мониторинг остановлен")
     
     elif query.data == 'back':
-        keyboard = [
-            [InlineKeyboardButton("📊 BTC/USDT", callback_data='check_BTC')],
-            [InlineKeyboardButton("📊 ETH/USDT", callback_data='check_ETH')],
-            [InlineKeyboardButton("📊 BNB/USDT", callback_data='check_BNB')],
-            [InlineKeyboardButton("📊 SOL/USDT", callback_data='check_SOL')],
-            [InlineKeyboardButton("🔄 Все монеты", callback_data='check_ALL')],
-            [InlineKeyboardButton("🔔 Авто-мониторинг", callback_data='auto_monitor')],
-            [InlineKeyboardButton("⛔ Остановить мониторинг", callback_data='stop_monitor')]
-        ]
         await query.edit_message_text(
             "🤖 <b>DEX-CEX Арбитражный бот</b>\n\n"
             "Выберите действие:",
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=build_menu(),
             parse_mode='HTML'
         )
 
-async def auto_monitor_job(context: ContextTypes.DEFAULT_TYPE):
-    chat_id = context.job.chat_id
-    
-    if not arbitrage_bot.monitoring.get(chat_id, False):
+async def watch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    keys, unknown = resolve_symbols(context.args)
+    if unknown and not keys:
+        await update.message.reply_text(f"❌ Неизвестные пары: {', '.join(unknown)}")
+        return
+    chat = subscriptions.set_watchlist(chat_id, keys)
+    text = format_subscription(chat)
+    if unknown:
+        text = f"⚠️ Пропущены неизвестные пары: {', '.join(unknown)}\n\n" + text
+    await update.message.reply_text(text, parse_mode='HTML')
+
+async def threshold_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        threshold = float(context.args[0].replace(',', '.').rstrip('%'))
+        if not math.isfinite(threshold):
+            raise ValueError(threshold)
+    except (IndexError, ValueError):
+        await update.message.reply_text("❌ Укажите порог в процентах, например /threshold 1.0")
+        return
+    chat = subscriptions.set_threshold(update.effective_chat.id, threshold)
+    await update.message.reply_text(format_subscription(chat), parse_mode='HTML')
+
+async def interval_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        interval = float(context.args[0])
+        if not math.isfinite(interval):
+            raise ValueError(interval)
+    except (IndexError, ValueError):
+        await update.message.reply_text("❌ Укажите период сводки в секундах, например /interval 300")
+        return
+    chat = subscriptions.set_interval(update.effective_chat.id, interval)
+    await update.message.reply_text(format_subscription(chat), parse_mode='HTML')
+
+async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(format_subscription(subscriptions.get(update.effective_chat.id)), parse_mode='HTML')
+
+async def poll_job(context: ContextTypes.DEFAULT_TYPE):
+    # Центральный опрос бирж: O(символы × биржи) за тик. Без подписанных чатов опрос нужен только
+    # для записи тиков: иначе в записи для бэктестов были бы дыры между нажатиями кнопок
+    if not (subscriptions.active() or arbitrage_bot.recorder):
         return
     
+    started = time.perf_counter()
+    try:
+        await poll_tick()
+    finally:
+        TICK_DURATION.observe(time.perf_counter() - started)
+
+async def poll_tick():
     await arbitrage_bot.init_session()
     
-    for symbol_key, symbol_config in SYMBOLS.items():
-        try:
-            prices = await arbitrage_bot.monitor_symbol(symbol_config)
-            if len(prices) >= 2:
-                opportunities = arbitrage_bot.calculate_arbitrage(prices)
-                
-                # Отправляем только если есть разница > 0.5%
-                if any(o['difference'] >= 0.5 for o in opportunities):
-                    msg = arbitrage_bot.format_telegram_message(
-                        symbol_config['name'], prices, opportunities, threshold=0.5
-                    )
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=msg,
-                        parse_mode='HTML'
-                    )
-        except Exception as e:
-            print(f"Ошибка мониторинга {symbol_key}: {e}")
+    try:
+        snapshot = await arbitrage_bot.refresh_snapshot(SYMBOLS)
+    except Exception as e:
+        TICK_ERRORS.inc()
+        print(f"Ошибка опроса бирж: {e}")
+        return
+    
+    if subscriptions.active():
+        await publish_alerts(snapshot)
+
+async def on_shard_snapshot(snapshot: Dict[str, Dict]):
+    # Склеенный снимок от воркеров: запись тиков и уведомления, как после обычного опроса
+    if arbitrage_bot.recorder:
+        arbitrage_bot.recorder.record({key: entry['prices'] for key, entry in snapshot.items()})
+    if subscriptions.active():
+        await publish_alerts(snapshot)
+
+async def publish_alerts(snapshot: Dict[str, Dict]):
+    for chat_id, msg in fan_out_alerts(subscriptions, snapshot, SYMBOLS, time.monotonic()):
+        alert_sender.send(chat_id, msg)
+
+def fan_out_alerts(subs: Subscriptions, snapshot: Dict[str, Dict], symbols: Dict[str, Dict],
+                   now: float) -> List[Tuple[int, str]]:
+    # Уведомляем только о переходах: открылась / расширилась / закрылась
+    events = subs.update(snapshot, now)
+    
+    # Насколько устарела самая старая из двух цен сделки в момент уведомления
+    for event in events:
+        if event['type'] != CLOSED:
+            ages = [PRICE_AGE.get(event[side], event['symbol']) for side in ('buy_exchange', 'sell_exchange')]
+            ages = [age for age in ages if age is not None]
+            if ages:
+                ALERT_PRICE_AGE.observe(max(ages))
+    
+    # Чаты с одинаковым набором событий (одна корзина порога, сводка каждый тик) - один текст на всех
+    outbox = []
+    formatted: Dict[tuple, List[str]] = {}
+    for chat_id, chat_events in subs.deliveries(now):
+        key = tuple(map(id, chat_events))
+        if key not in formatted:
+            formatted[key] = format_alerts_messages(chat_events, symbols)
+        outbox.extend((chat_id, msg) for msg in formatted[key])
+    return outbox
+
+async def post_init(application: Application):
+    alert_sender.bot = application.bot
+    alert_sender.start()
+    subscriptions.open(SUBSCRIPTIONS_DB)
+    if TICK_STORE:
+        arbitrage_bot.recorder = TickRecorder(TICK_STORE)
+    configure_engine(arbitrage_bot)
+    if SYMBOL_DISCOVERY:
+        # До запуска потоков и воркеров: они берут уже найденные пары
+        await arbitrage_bot.init_session()
+        await refresh_symbols()
+    if SHARD_WORKERS:
+        shards = ShardPool(create_engine, SHARD_WORKERS, POLL_INTERVAL, {'streams': STREAM_MODE})
+        shards.on_snapshot = on_shard_snapshot
+        shards.start(arbitrage_bot, SYMBOLS)
+    elif STREAM_MODE:
+        await arbitrage_bot.start_streams(SYMBOLS)
+    if METRICS_PORT:
+        application.bot_data['metrics'] = await start_metrics_server(METRICS_PORT)
+
+async def post_shutdown(application: Application):
+    if arbitrage_bot.shards:
+        await arbitrage_bot.shards.stop()
+    if 'metrics' in application.bot_data:
+        await application.bot_data.pop('metrics').cleanup()
+    await alert_sender.stop()
+    subscriptions.close()
+    await arbitrage_bot.close_session()
 
 def main():
     # Получаем токен из переменной окружения
@@ -484,12 +845,30 @@ def main():
         return
     
     # Создаем приложение
-    application = Application.builder().token(TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     # Добавляем обработчики
     application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("watch", watch_command))
+    application.add_handler(CommandHandler("threshold", threshold_command))
+    application.add_handler(CommandHandler("interval", interval_command))
+    application.add_handler(CommandHandler("settings", settings_command))
     application.add_handler(CallbackQueryHandler(button_handler))
     
+    # Единый движок опроса цен для всех чатов; с воркерами тики приходят от них
+    if not SHARD_WORKERS:
+        application.job_queue.run_repeating(poll_job, interval=POLL_INTERVAL, first=1, name='poll')
+    if SYMBOL_DISCOVERY:
+        # Новые листинги и делистинги - раз в срок жизни кэша; потоки подхватят их после перезапуска
+        application.job_queue.run_repeating(discovery_job, interval=INSTRUMENTS_TTL, first=INSTRUMENTS_TTL,
+                                            name='discovery')
+    
     print("🚀 Бот запущен!")
     application.run_polling(allowed_updates=Update.ALL_TYPES)
 
@@ -0,0 +1,92 @@
+import time
+from collections import deque
+from typing import Optional
+
+from metrics import BREAKER_STATE, BREAKER_TRIPS
+
+# Автомат открывается после BREAKER_FAILURES неудач подряд (ошибка, таймаут или ответ
+# медленнее BREAKER_SLOW_CALL сек) и пропускает биржу BREAKER_OPEN_TIME сек; каждая
+# неудачная проба удваивает паузу до BREAKER_MAX_OPEN_TIME
+BREAKER_FAILURES = 3
+BREAKER_SLOW_CALL = 2.5
+BREAKER_OPEN_TIME = 15.0
+BREAKER_MAX_OPEN_TIME = 300.0
+
+# Окно задержек для p95 и минимум замеров, после которого ему можно верить
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 20
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+# Значение состояния для метрики: 0 - работает, 1 - проба, 2 - биржа пропускается
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    # closed -> (неудачи подряд) -> open -> (пауза прошла) -> half_open: одна фоновая проба,
+    # успех закрывает автомат, неудача снова открывает с удвоенной паузой
+    def __init__(self, name: str = '', failures: int = BREAKER_FAILURES, slow_call: float = BREAKER_SLOW_CALL,
+                 open_time: float = BREAKER_OPEN_TIME, max_open_time: float = BREAKER_MAX_OPEN_TIME):
+        self.name = name
+        self.max_failures = failures
+        self.slow_call = slow_call
+        self.base_open_time = open_time
+        self.max_open_time = max_open_time
+        self.state = CLOSED
+        self.failures = 0
+        self.open_time = open_time
+        self.opened_at = 0.0
+        self.trips = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def allow(self) -> bool:
+        return self.state == CLOSED
+
+    def start_probe(self, now: Optional[float] = None) -> bool:
+        # True ровно один раз за паузу: вызывающий запускает пробный запрос в фоне
+        now = time.monotonic() if now is None else now
+        if self.state == OPEN and now - self.opened_at >= self.open_time:
+            self._set_state(HALF_OPEN)
+            return True
+        return False
+
+    def record_success(self, latency: float, now: Optional[float] = None):
+        self.latencies.append(latency)
+        if latency > self.slow_call:
+            self.record_failure(now)
+            return
+        if self.state == OPEN:
+            return  # запоздавший ответ, отправленный до открытия; ждем пробы
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+        self.failures = 0
+        self.open_time = self.base_open_time
+
+    def record_failure(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        if self.state == HALF_OPEN:
+            self.open_time = min(self.open_time * 2, self.max_open_time)
+            self._open(now)
+        elif self.state == CLOSED:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                self._open(now)
+
+    def _open(self, now: float):
+        self._set_state(OPEN)
+        self.opened_at = now
+        self.failures = 0
+        self.trips += 1
+        BREAKER_TRIPS.inc(self.name)
+        print(f"⚡ {self.name}: биржа пропускается {self.open_time:.0f} с")
+
+    def _set_state(self, state: str):
+        self.state = state
+        BREAKER_STATE.set(STATE_VALUES[state], self.name)
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
@@ -0,0 +1,147 @@
+import math
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+# Узел графа: (биржа, актив); ребро: обмен актива u на актив v с весом -log(курс после комиссии)
+Node = Tuple[str, str]
+Edge = Tuple[Node, Node]
+
+# Допуск на погрешность float при сравнении потенциалов
+EPS = 1e-12
+
+
+class ArbitrageGraph:
+    # Поиск отрицательных циклов (треугольный и межбиржевой арбитраж) с инкрементальным обновлением.
+    # Держим потенциалы dist, допустимые для всех ребер, кроме "нарушающих" (violating):
+    # dist[v] <= dist[u] + w(u, v). Новый отрицательный цикл обязан пройти через измененное ребро,
+    # поэтому при изменении одного тикера достаточно локальной релаксации от его конца.
+    def __init__(self, transfer_fee: float = 0.0):
+        self.edges: Dict[Node, Dict[Node, float]] = {}
+        self.dist: Dict[Node, float] = {}
+        # Ребра, замыкающие отрицательный цикл: {ребро: цикл}
+        self.violating: Dict[Edge, Dict] = {}
+        # Актив -> биржи, где он есть; для ребер перевода между биржами
+        self.assets: Dict[str, Set[str]] = {}
+        self.transfer_weight = -math.log(1 - transfer_fee)
+        self.relaxations = 0
+
+    def _add_node(self, node: Node):
+        if node in self.edges:
+            return
+        self.edges[node] = {}
+        self.dist[node] = 0.0
+        venue, asset = node
+        others = self.assets.setdefault(asset, set())
+        others.add(venue)
+        for other in others:
+            if other != venue:
+                self.set_edge(node, (other, asset), self.transfer_weight)
+                self.set_edge((other, asset), node, self.transfer_weight)
+
+    def set_edge(self, u: Node, v: Node, weight: float) -> Optional[Dict]:
+        self._add_node(u)
+        self._add_node(v)
+        if self.edges[u].get(v) == weight:
+            return self.violating.get((u, v))
+        self.edges[u][v] = weight
+        self.violating.pop((u, v), None)
+        return self._check((u, v))
+
+    def remove_edge(self, u: Node, v: Node):
+        # Без ребра потенциалы остаются допустимыми; циклы через него уберет revalidate
+        if v in self.edges.get(u, {}):
+            del self.edges[u][v]
+            self.violating.pop((u, v), None)
+
+    def remove_ticker(self, venue: str, base: str, quote: str):
+        # Биржа перестала отдавать пару (сбой, открытый автомат, опоздание): ее цены больше не верны
+        self.remove_edge((venue, quote), (venue, base))
+        self.remove_edge((venue, base), (venue, quote))
+
+    def update_ticker(self, venue: str, base: str, quote: str, bid: float, ask: float,
+                      fee: float = 0.0) -> List[Dict]:
+        # Пара BASE/QUOTE дает два ребра: покупка базы по ask и продажа по bid
+        # Сторона без цены убирает свое ребро, а не оставляет прошлое значение
+        cycles = []
+        if ask and ask > 0:
+            cycle = self.set_edge((venue, quote), (venue, base), -math.log((1 - fee) / ask))
+            if cycle:
+                cycles.append(cycle)
+        else:
+            self.remove_edge((venue, quote), (venue, base))
+        if bid and bid > 0:
+            cycle = self.set_edge((venue, base), (venue, quote), -math.log(bid * (1 - fee)))
+            if cycle:
+                cycles.append(cycle)
+        else:
+            self.remove_edge((venue, base), (venue, quote))
+        return cycles
+
+    def _check(self, edge: Edge) -> Optional[Dict]:
+        u, v = edge
+        weight = self.edges[u][v]
+        if self.dist[u] + weight >= self.dist[v] - EPS:
+            return None
+
+        # Релаксация от v; старые значения сохраняем для отката
+        changed = {v: self.dist[v]}
+        parent = {v: u}
+        self.dist[v] = self.dist[u] + weight
+        queue = deque([v])
+        queued = {v}
+
+        while queue:
+            x = queue.popleft()
+            queued.discard(x)
+            dx = self.dist[x]
+            for y, wy in self.edges[x].items():
+                if (x, y) in self.violating or dx + wy >= self.dist[y] - EPS:
+                    continue
+                self.relaxations += 1
+                if y == u:
+                    # Дошли обратно до u: цикл u -> v -> ... -> x -> u отрицательный
+                    cycle = self._make_cycle(edge, x, parent)
+                    for node, old in changed.items():
+                        self.dist[node] = old
+                    self.violating[edge] = cycle
+                    return cycle
+                changed.setdefault(y, self.dist[y])
+                self.dist[y] = dx + wy
+                parent[y] = x
+                if y not in queued:
+                    queue.append(y)
+                    queued.add(y)
+        return None
+
+    def _make_cycle(self, edge: Edge, last: Node, parent: Dict[Node, Node]) -> Dict:
+        u, v = edge
+        chain = [last]
+        seen = {last}
+        while chain[-1] != v:
+            node = parent[chain[-1]]
+            if node in seen:
+                break
+            chain.append(node)
+            seen.add(node)
+        path = [u] + chain[::-1] + [u]
+
+        total = sum(self.edges[a][b] for a, b in zip(path, path[1:]))
+        return {
+            'path': path,
+            'profit_percent': (math.exp(-total) - 1) * 100
+        }
+
+    def revalidate(self) -> List[Dict]:
+        # Цикл могло разорвать изменение другого ребра: перепроверяем нарушающие ребра раз за тик
+        for edge in list(self.violating):
+            del self.violating[edge]
+            self._check(edge)
+        return self.active_cycles()
+
+    def active_cycles(self) -> List[Dict]:
+        unique = {}
+        for cycle in self.violating.values():
+            nodes = cycle['path'][:-1]
+            start = nodes.index(min(nodes))
+            unique.setdefault(tuple(nodes[start:] + nodes[:start]), cycle)
+        return sorted(unique.values(), key=lambda c: c['profit_percent'], reverse=True)
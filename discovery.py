@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from exchanges import ExchangeAdapter
+
+# Список пар биржи меняется редко: держим его на диске сутки, чтобы старт не качал его заново
+INSTRUMENTS_TTL = 24 * 3600
+# Пара попадает в мониторинг, если торгуется хотя бы на стольких биржах
+MIN_VENUES = 2
+# Котируемые валюты собираемых пар (как и в ручном списке - только USDT)
+DISCOVERY_QUOTES = ('USDT',)
+# Разные написания одного актива на биржах
+ASSET_ALIASES = {'XBT': 'BTC'}
+
+# (символ биржи, base, quote)
+Instrument = Tuple[str, str, str]
+
+
+def canonical(asset: str) -> str:
+    asset = asset.upper()
+    return ASSET_ALIASES.get(asset, asset)
+
+
+def symbol_key(base: str, quote: str) -> str:
+    # Ключ SYMBOLS: для USDT-пар просто base ('BTC'), как в ручном списке
+    return base if quote == 'USDT' else f'{base}_{quote}'
+
+
+# ========== КАНОНИЧЕСКИЙ ИНДЕКС ==========
+def build_index(instruments: Dict[str, List[Instrument]]) -> Dict[Tuple[str, str], Dict[str, str]]:
+    # {(BASE, QUOTE): {биржа: символ биржи}}
+    index: Dict[Tuple[str, str], Dict[str, str]] = {}
+    for venue, pairs in instruments.items():
+        for symbol, base, quote in pairs:
+            index.setdefault((canonical(base), canonical(quote)), {})[venue] = symbol
+    return index
+
+
+def build_symbols(index: Dict[Tuple[str, str], Dict[str, str]], manual: Optional[Dict[str, Dict]] = None,
+                  quotes: Tuple[str, ...] = DISCOVERY_QUOTES, min_venues: int = MIN_VENUES,
+                  limit: int = 0) -> Dict[str, Dict]:
+    # Конфигурация в формате SYMBOLS. Ручные записи идут первыми и побеждают найденные
+    # (адреса Uniswap, исправленные символы); дальше - пары с наибольшим числом бирж.
+    symbols = {key: dict(config) for key, config in (manual or {}).items()}
+    selected = [(pair, venues) for pair, venues in index.items()
+                if pair[1] in quotes and len(venues) >= min_venues]
+    selected.sort(key=lambda item: (-len(item[1]), item[0]))
+    for (base, quote), venues in selected:
+        key = symbol_key(base, quote)
+        if key not in symbols:
+            if limit and len(symbols) >= limit:
+                continue
+            symbols[key] = {'name': f'{base}/{quote}'}
+        config = symbols[key]
+        for venue, symbol in venues.items():
+            config.setdefault(venue, symbol)
+    return symbols
+
+
+# ========== КЭШ НА ДИСКЕ ==========
+def read_cache(path: str) -> Dict[str, Dict]:
+    # {биржа: {'fetched_at': unix-время, 'instruments': [[символ, base, quote], ...]}}
+    try:
+        with open(path) as f:
+            return json.load(f).get('venues', {})
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Ошибка чтения кэша пар {path}: {e}")
+        return {}
+
+
+def write_cache(path: str, venues: Dict[str, Dict]):
+    # Через временный файл: упавший посреди записи процесс не оставит битый кэш
+    tmp = path + '.tmp'
+    try:
+        with open(tmp, 'w') as f:
+            json.dump({'venues': venues}, f, separators=(',', ':'))
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Ошибка записи кэша пар {path}: {e}")
+
+
+async def load_instruments(adapters: Dict[str, ExchangeAdapter], path: str, ttl: float = INSTRUMENTS_TTL,
+                           now: Optional[float] = None) -> Dict[str, List[Instrument]]:
+    # Скачиваем только биржи с устаревшим кэшем; если биржа не ответила, остается ее старый список
+    now = time.time() if now is None else now
+    venues = read_cache(path)
+    expired = [key for key, adapter in adapters.items()
+               if adapter.instruments_request() and now - venues.get(key, {}).get('fetched_at', 0) >= ttl]
+    if expired:
+        fetched = await asyncio.gather(*(adapters[key].get_instruments() for key in expired))
+        updated = False
+        for key, instruments in zip(expired, fetched):
+            if instruments:
+                venues[key] = {'fetched_at': now, 'instruments': instruments}
+                updated = True
+            elif key in venues:
+                print(f"⚠️ {adapters[key].name}: список пар не загрузился, берем из кэша")
+        if updated:
+            write_cache(path, venues)
+    return {key: [tuple(i) for i in entry['instruments']] for key, entry in venues.items() if key in adapters}
+
+
+async def discover_symbols(adapters: Dict[str, ExchangeAdapter], manual: Dict[str, Dict], path: str,
+                           ttl: float = INSTRUMENTS_TTL, min_venues: int = MIN_VENUES,
+                           limit: int = 0) -> Dict[str, Dict]:
+    instruments = await load_instruments(adapters, path, ttl)
+    if not instruments:
+        print("⚠️ Списки пар бирж недоступны, используется ручной список")
+        return {key: dict(config) for key, config in manual.items()}
+    symbols = build_symbols(build_index(instruments), manual, min_venues=min_venues, limit=limit)
+    print(f"🔎 Пар в мониторинге: {len(symbols)} (бирж в индексе: {len(instruments)})")
+    return symbols
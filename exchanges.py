@@ -0,0 +1,807 @@
+import asyncio
+import json
+import time
+import aiohttp
+from typing import Dict, List, Optional, Tuple
+from breaker import CircuitBreaker
+from metrics import EXCHANGE_LATENCY, EXCHANGE_REQUESTS, HEDGED_REQUESTS
+from orderbook import BOOK_DEPTH, OrderBook
+from ratelimit import PRIORITY_BACKGROUND, RateLimiter
+from tickers import Ticker, TickerTable, loads
+from uniswap import (BLOCK_TIME, FEE_TIERS, MULTICALL3, PoolState, address_at, block_number_call, decimals_call,
+                     decode_aggregate3, encode_aggregate3, get_pool_call, liquidity_call, pair_key, read_pool_cache,
+                     slot0_call, word_at, write_pool_cache)
+
+# Время жизни DNS-кэша общего коннектора (сек)
+DNS_CACHE_TTL = 300
+
+
+class InvalidSymbol(Exception):
+    # Биржа отклонила запрос из-за неизвестного символа: биржа жива, решает вызывающий
+    pass
+
+
+class ExchangeAdapter:
+    # Один класс на биржу: адрес, лимит соединений, keep-alive и таймауты.
+    # Подклассы описывают только пути и разбор ответа, запросы делает базовый класс.
+    key = ''
+    name = ''
+    base_url = ''
+    symbol_field = 'symbol'
+    # Поля тикера в ответе биржи (по умолчанию - формат Binance)
+    price_field = 'lastPrice'
+    volume_field = 'volume'
+    bid_field = 'bidPrice'
+    ask_field = 'askPrice'
+    limit_per_host = 10
+    keepalive = True
+    connect_timeout = 2.0
+    read_timeout = 3.0
+    # Документированный бюджет биржи: rate_limit единиц веса за rate_window секунд
+    rate_limit = 10
+    rate_window = 1.0
+    ticker_weight = 1
+    tickers_weight = 1
+    depth_weight = 1
+    instruments_weight = 1
+    # Taker-комиссия спотового рынка (доля, без скидок за объем)
+    taker_fee = 0.001
+    # Опорные биржи: если ответа нет дольше p95, отправляем дублирующий GET
+    hedged = False
+    # Вес запроса всего рынка (market_request) для отката пакета с неизвестным символом
+    market_weight = 1
+    # Пакетный запрос тикеров отдает весь рынок, какой бы ни был список символов
+    market_wide_tickers = False
+
+    def __init__(self, base_url: Optional[str] = None):
+        if base_url:
+            self.base_url = base_url
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.timeout = aiohttp.ClientTimeout(
+            total=self.connect_timeout + self.read_timeout,
+            connect=self.connect_timeout,
+            sock_read=self.read_timeout
+        )
+        self.headers = {} if self.keepalive else {'Connection': 'close'}
+        self._slots = asyncio.Semaphore(self.limit_per_host)
+        # Строки котировок; бот подставляет общую таблицу для всех бирж
+        self.table = TickerTable()
+        self.limiter = RateLimiter(self.rate_limit, self.rate_window)
+        self.breaker = CircuitBreaker(self.name)
+        # Символы, которых биржа не знает (делистинг, устаревший список): в пакет не попадают
+        self.invalid_symbols: set = set()
+
+    async def request(self, method: str, path: str, weight: float = 1, priority: int = PRIORITY_BACKGROUND,
+                      dispatched: Optional[asyncio.Future] = None, **kwargs):
+        # dispatched завершается, когда запрос прошел лимитер и слот: от этого момента бот считает бюджет тика
+        delay = self.breaker.p95() if self.hedged and method == 'GET' else None
+        if delay is None:
+            return await self._request(method, path, weight, priority, dispatched, **kwargs)
+
+        # Хедж: первый запрос не ответил за p95 - шлем дубль и берем первый успешный ответ.
+        # p95 считается от отправки, поэтому и ждем от отправки: очередь лимитера и слотов не в счет,
+        # а при занятых слотах дубль не шлем - он встал бы в ту же очередь.
+        sent = asyncio.get_running_loop().create_future()
+        tasks = [asyncio.create_task(self._request(method, path, weight, priority, sent, **kwargs))]
+        try:
+            await asyncio.wait([tasks[0], sent], return_when=asyncio.FIRST_COMPLETED)
+            if sent.done() and dispatched is not None and not dispatched.done():
+                dispatched.set_result(None)
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or self._slots.locked():
+                return await tasks[0]
+            tasks.append(asyncio.create_task(self._request(method, path, weight, priority, **kwargs)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result() is not None:
+                        HEDGED_REQUESTS.inc(self.name, 'primary' if task is tasks[0] else 'hedge')
+                        return task.result()
+            # Оба неудачны: ведем себя как без хеджа
+            HEDGED_REQUESTS.inc(self.name, 'none')
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _request(self, method: str, path: str, weight: float = 1, priority: int = PRIORITY_BACKGROUND,
+                       dispatched: Optional[asyncio.Future] = None, **kwargs):
+        await self.limiter.acquire(weight, priority)
+        async with self._slots:
+            if dispatched is not None and not dispatched.done():
+                dispatched.set_result(None)
+            # Время считаем без ожидания лимитера и слота: только сам запрос
+            started = time.perf_counter()
+            try:
+                async with self.session.request(
+                    method, self.base_url + path,
+                    timeout=self.timeout, headers=self.headers, **kwargs
+                ) as resp:
+                    retry_after = resp.headers.get('Retry-After')
+                    self.limiter.on_response(
+                        resp.status,
+                        remaining=self.remaining_budget(resp.headers),
+                        retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+                    )
+                    if resp.status in (418, 429):
+                        # Биржа жива, скорость регулирует лимитер, а не автомат
+                        print(f"Лимит запросов {self.name}: HTTP {resp.status}")
+                        EXCHANGE_REQUESTS.inc(self.name, 'throttled')
+                        return None
+                    if resp.status != 200:
+                        if self.invalid_symbol(resp.status, await resp.read()):
+                            EXCHANGE_REQUESTS.inc(self.name, 'invalid_symbol')
+                            raise InvalidSymbol(f"{self.name}: HTTP {resp.status}, неизвестный символ")
+                        EXCHANGE_REQUESTS.inc(self.name, 'error')
+                        self.breaker.record_failure()
+                        return None
+                    data = loads(await resp.read())
+            except asyncio.TimeoutError:
+                EXCHANGE_REQUESTS.inc(self.name, 'timeout')
+                self.breaker.record_failure()
+                raise
+            except InvalidSymbol:
+                raise
+            except Exception:
+                EXCHANGE_REQUESTS.inc(self.name, 'error')
+                self.breaker.record_failure()
+                raise
+            finally:
+                latency = time.perf_counter() - started
+                EXCHANGE_LATENCY.observe(latency, self.name)
+            EXCHANGE_REQUESTS.inc(self.name, 'ok')
+            self.breaker.record_success(latency)
+            return data
+
+    def remaining_budget(self, headers) -> Optional[float]:
+        # Остаток бюджета из заголовков биржи, если она их отдает
+        return None
+
+    def invalid_symbol(self, status: int, body: bytes) -> bool:
+        # Ошибка ответа означает неизвестный символ, а не сбой биржи
+        return False
+
+    def market_request(self) -> Optional[Dict]:
+        # Тикеры всего рынка без списка символов; None - у биржи такого запроса нет
+        return None
+
+    # ---------- протокол биржи ----------
+    def ticker_request(self, symbol: str) -> Dict:
+        raise NotImplementedError
+
+    def tickers_request(self, symbols: List[str]) -> Dict:
+        raise NotImplementedError
+
+    def weight_of(self, symbols: List[str]) -> float:
+        return self.tickers_weight
+
+    def market_wide(self, symbols: List[str]) -> bool:
+        # Ответ пакета не зависит от списка: при шардировании его запрашивает один процесс на всех
+        return self.market_wide_tickers
+
+    def extract_one(self, data, symbol: str) -> List[Dict]:
+        return self.extract_many(data)
+
+    def extract_many(self, data) -> List[Dict]:
+        raise NotImplementedError
+
+    def instruments_request(self) -> Optional[Dict]:
+        # Список спотовых пар биржи; None - биржа его не отдает
+        return None
+
+    def extract_instruments(self, data) -> List[Tuple[str, str, str]]:
+        # [(символ биржи, base, quote)] только для пар, которые сейчас торгуются
+        raise NotImplementedError
+
+    def parse(self, ticker: Dict) -> Ticker:
+        return self.parse_many([ticker])[ticker[self.symbol_field]]
+
+    def parse_many(self, tickers: List[Dict], wanted: Optional[set] = None) -> Dict[str, Ticker]:
+        # Поля пишутся прямо в строки таблицы, без промежуточного dict на тикер.
+        # Горячий цикл пакетных ответов: имена полей и строки биржи - в локальных переменных.
+        rows = self.table.venue(self.name)
+        symbol_field, price_field = self.symbol_field, self.price_field
+        volume_field, bid_field, ask_field = self.volume_field, self.bid_field, self.ask_field
+        prices = {}
+        for ticker in tickers:
+            symbol = ticker[symbol_field]
+            if wanted is not None and symbol not in wanted:
+                continue
+            row = rows.get(symbol)
+            if row is None:
+                row = rows[symbol] = Ticker(self.name, symbol)
+            get = ticker.get
+            row.price = float(ticker[price_field])
+            row.volume = float(get(volume_field) or 0)
+            row.bid = float(get(bid_field) or 0)
+            row.ask = float(get(ask_field) or 0)
+            prices[symbol] = row
+        return prices
+
+    def depth_request(self, symbol: str, limit: int) -> Dict:
+        raise NotImplementedError
+
+    def extract_depth(self, data) -> Tuple[List, List]:
+        return data['bids'], data['asks']
+
+    # ---------- общие методы ----------
+    async def get_price(self, symbol: str, priority: int = PRIORITY_BACKGROUND) -> Optional[Ticker]:
+        try:
+            data = await self.request(
+                'GET', weight=self.ticker_weight, priority=priority, **self.ticker_request(symbol)
+            )
+            if data:
+                tickers = self.extract_one(data, symbol)
+                if tickers:
+                    return self.parse(tickers[0])
+        except Exception as e:
+            print(f"Ошибка {self.name} {symbol}: {e}")
+        return None
+
+    async def get_prices(self, symbols: List[str], priority: int = PRIORITY_BACKGROUND,
+                         dispatched: Optional[asyncio.Future] = None) -> Dict[str, Ticker]:
+        prices = {}
+        batch = [symbol for symbol in symbols if symbol not in self.invalid_symbols]
+        if not batch:
+            return prices
+        wanted = set(batch)
+        try:
+            try:
+                data = await self.request(
+                    'GET', weight=self.weight_of(batch), priority=priority, dispatched=dispatched,
+                    **self.tickers_request(batch)
+                )
+            except InvalidSymbol:
+                # Один неизвестный символ отклоняет весь пакет, а какой именно - биржа не говорит:
+                # берем весь рынок, а отсутствующие в нем символы исключаем из следующих пакетов
+                request = self.market_request()
+                if request is None:
+                    raise
+                data = await self.request('GET', weight=self.market_weight, priority=priority,
+                                          dispatched=dispatched, **request)
+                if data:
+                    prices = self.parse_many(self.extract_many(data), wanted)
+                    missing = wanted - prices.keys()
+                    if missing:
+                        self.invalid_symbols |= missing
+                        print(f"⚠️ {self.name}: нет символов {', '.join(sorted(missing))}, исключены из пакета")
+                return prices
+            if data:
+                prices = self.parse_many(self.extract_many(data), wanted)
+        except Exception as e:
+            print(f"Ошибка {self.name} (пакет): {e}")
+        return prices
+
+    async def get_instruments(self) -> Optional[List[Tuple[str, str, str]]]:
+        request = self.instruments_request()
+        if not request:
+            return None
+        try:
+            data = await self.request('GET', weight=self.instruments_weight, **request)
+            if data:
+                return self.extract_instruments(data)
+        except Exception as e:
+            print(f"Ошибка списка пар {self.name}: {e}")
+        return None
+
+    async def get_depth(self, symbol: str, priority: int = PRIORITY_BACKGROUND,
+                        dispatched: Optional[asyncio.Future] = None) -> Optional[OrderBook]:
+        try:
+            data = await self.request(
+                'GET', weight=self.depth_weight, priority=priority, dispatched=dispatched,
+                **self.depth_request(symbol, BOOK_DEPTH)
+            )
+            if data:
+                bids, asks = self.extract_depth(data)
+                book = OrderBook()
+                book.replace(((level[0], level[1]) for level in bids), ((level[0], level[1]) for level in asks))
+                return book
+        except Exception as e:
+            print(f"Ошибка стакана {self.name} {symbol}: {e}")
+        return None
+
+
+# ========== BINANCE ==========
+class BinanceAdapter(ExchangeAdapter):
+    key = 'binance'
+    name = 'Binance'
+    hedged = True
+    base_url = 'https://api.binance.com'
+    limit_per_host = 20
+    rate_limit = 6000
+    rate_window = 60.0
+    ticker_weight = 2
+    depth_weight = 5
+    instruments_weight = 20
+    market_weight = 80
+
+    def weight_of(self, symbols: List[str]) -> float:
+        # Вес ticker/24hr зависит от числа символов
+        if len(symbols) <= 20:
+            return 2
+        return 40 if len(symbols) <= 100 else 80
+
+    def remaining_budget(self, headers) -> Optional[float]:
+        used = headers.get('X-MBX-USED-WEIGHT-1M')
+        return self.rate_limit - float(used) if used else None
+
+    def invalid_symbol(self, status: int, body: bytes) -> bool:
+        # HTTP 400 {"code": -1121, "msg": "Invalid symbol."}
+        if status != 400:
+            return False
+        try:
+            return loads(body).get('code') == -1121
+        except (ValueError, AttributeError):
+            return False
+
+    def market_request(self) -> Optional[Dict]:
+        return {'path': '/api/v3/ticker/24hr'}
+
+    def ticker_request(self, symbol: str) -> Dict:
+        return {'path': '/api/v3/ticker/24hr', 'params': {'symbol': symbol}}
+
+    def market_wide(self, symbols: List[str]) -> bool:
+        # Больше 100 символов весят как весь рынок (80), а длинный список не влезает в URL
+        return len(symbols) > 100
+
+    def tickers_request(self, symbols: List[str]) -> Dict:
+        if self.market_wide(symbols):
+            return self.market_request()
+        return {'path': '/api/v3/ticker/24hr', 'params': {'symbols': json.dumps(symbols, separators=(',', ':'))}}
+
+    def depth_request(self, symbol: str, limit: int) -> Dict:
+        return {'path': '/api/v3/depth', 'params': {'symbol': symbol, 'limit': limit}}
+
+    def extract_many(self, data) -> List[Dict]:
+        return data if isinstance(data, list) else [data]
+
+    def instruments_request(self) -> Optional[Dict]:
+        return {'path': '/api/v3/exchangeInfo', 'params': {'permissions': 'SPOT'}}
+
+    def extract_instruments(self, data) -> List[Tuple[str, str, str]]:
+        return [(s['symbol'], s['baseAsset'], s['quoteAsset']) for s in data['symbols']
+                if s['status'] == 'TRADING' and s.get('isSpotTradingAllowed', True)]
+
+
+# ========== GATE.IO ==========
+class GateioAdapter(ExchangeAdapter):
+    key = 'gateio'
+    name = 'Gate.io'
+    base_url = 'https://api.gateio.ws'
+    symbol_field = 'currency_pair'
+    price_field = 'last'
+    volume_field = 'base_volume'
+    bid_field = 'highest_bid'
+    ask_field = 'lowest_ask'
+    rate_limit = 200
+    rate_window = 10.0
+    market_wide_tickers = True
+    taker_fee = 0.002
+
+    def remaining_budget(self, headers) -> Optional[float]:
+        remain = headers.get('X-Gate-RateLimit-Requests-Remain')
+        return float(remain) if remain else None
+
+    def ticker_request(self, symbol: str) -> Dict:
+        return {'path': '/api/v4/spot/tickers', 'params': {'currency_pair': symbol}}
+
+    def tickers_request(self, symbols: List[str]) -> Dict:
+        return {'path': '/api/v4/spot/tickers'}
+
+    def depth_request(self, symbol: str, limit: int) -> Dict:
+        return {'path': '/api/v4/spot/order_book', 'params': {'currency_pair': symbol, 'limit': limit}}
+
+    def extract_many(self, data) -> List[Dict]:
+        return data
+
+    def instruments_request(self) -> Optional[Dict]:
+        return {'path': '/api/v4/spot/currency_pairs'}
+
+    def extract_instruments(self, data) -> List[Tuple[str, str, str]]:
+        return [(p['id'], p['base'], p['quote']) for p in data if p.get('trade_status') == 'tradable']
+
+
+# ========== BYBIT ==========
+class BybitAdapter(ExchangeAdapter):
+    key = 'bybit'
+    name = 'Bybit'
+    hedged = True
+    base_url = 'https://api.bybit.com'
+    price_field = 'lastPrice'
+    volume_field = 'volume24h'
+    bid_field = 'bid1Price'
+    ask_field = 'ask1Price'
+    rate_limit = 600
+    rate_window = 5.0
+    market_wide_tickers = True
+
+    def remaining_budget(self, headers) -> Optional[float]:
+        remain = headers.get('X-Bapi-Limit-Status')
+        return float(remain) if remain else None
+
+    def ticker_request(self, symbol: str) -> Dict:
+        return {'path': '/v5/market/tickers', 'params': {'category': 'spot', 'symbol': symbol}}
+
+    def tickers_request(self, symbols: List[str]) -> Dict:
+        return {'path': '/v5/market/tickers', 'params': {'category': 'spot'}}
+
+    def depth_request(self, symbol: str, limit: int) -> Dict:
+        return {'path': '/v5/market/orderbook', 'params': {'category': 'spot', 'symbol': symbol, 'limit': limit}}
+
+    def extract_depth(self, data) -> Tuple[List, List]:
+        return data['result']['b'], data['result']['a']
+
+    def extract_many(self, data) -> List[Dict]:
+        return data['result']['list'] if data['retCode'] == 0 else []
+
+    def instruments_request(self) -> Optional[Dict]:
+        return {'path': '/v5/market/instruments-info', 'params': {'category': 'spot'}}
+
+    def extract_instruments(self, data) -> List[Tuple[str, str, str]]:
+        if data['retCode'] != 0:
+            return []
+        return [(i['symbol'], i['baseCoin'], i['quoteCoin']) for i in data['result']['list'] if i['status'] == 'Trading']
+
+
+# ========== KUCOIN ==========
+class KucoinAdapter(ExchangeAdapter):
+    key = 'kucoin'
+    name = 'KuCoin'
+    base_url = 'https://api.kucoin.com'
+    price_field = 'last'
+    volume_field = 'vol'
+    bid_field = 'buy'
+    ask_field = 'sell'
+    # Публичный пул KuCoin: 2000 единиц веса за 30 секунд
+    rate_limit = 2000
+    rate_window = 30.0
+    market_wide_tickers = True
+    ticker_weight = 15
+    tickers_weight = 15
+    depth_weight = 2
+    instruments_weight = 4
+
+    def remaining_budget(self, headers) -> Optional[float]:
+        remain = headers.get('gw-ratelimit-remaining')
+        return float(remain) if remain else None
+
+    def ticker_request(self, symbol: str) -> Dict:
+        # market/stats отдает те же поля, что и allTickers, включая объем
+        return {'path': '/api/v1/market/stats', 'params': {'symbol': symbol}}
+
+    def tickers_request(self, symbols: List[str]) -> Dict:
+        return {'path': '/api/v1/market/allTickers'}
+
+    def depth_request(self, symbol: str, limit: int) -> Dict:
+        return {'path': '/api/v1/market/orderbook/level2_20', 'params': {'symbol': symbol}}
+
+    def extract_depth(self, data) -> Tuple[List, List]:
+        return data['data']['bids'], data['data']['asks']
+
+    def extract_one(self, data, symbol: str) -> List[Dict]:
+        return [data['data']] if data['code'] == '200000' and data['data'].get('last') else []
+
+    def extract_many(self, data) -> List[Dict]:
+        return [t for t in data['data']['ticker'] if t['last']] if data['code'] == '200000' else []
+
+    def instruments_request(self) -> Optional[Dict]:
+        return {'path': '/api/v2/symbols'}
+
+    def extract_instruments(self, data) -> List[Tuple[str, str, str]]:
+        if data['code'] != '200000':
+            return []
+        return [(s['symbol'], s['baseCurrency'], s['quoteCurrency']) for s in data['data'] if s['enableTrading']]
+
+
+# ========== OKX ==========
+class OkxAdapter(ExchangeAdapter):
+    key = 'okx'
+    name = 'OKX'
+    hedged = True
+    base_url = 'https://www.okx.com'
+    symbol_field = 'instId'
+    price_field = 'last'
+    volume_field = 'vol24h'
+    bid_field = 'bidPx'
+    ask_field = 'askPx'
+    rate_limit = 20
+    rate_window = 2.0
+    market_wide_tickers = True
+
+    def ticker_request(self, symbol: str) -> Dict:
+        return {'path': '/api/v5/market/ticker', 'params': {'instId': symbol}}
+
+    def tickers_request(self, symbols: List[str]) -> Dict:
+        return {'path': '/api/v5/market/tickers', 'params': {'instType': 'SPOT'}}
+
+    def depth_request(self, symbol: str, limit: int) -> Dict:
+        return {'path': '/api/v5/market/books', 'params': {'instId': symbol, 'sz': limit}}
+
+    def extract_depth(self, data) -> Tuple[List, List]:
+        return data['data'][0]['bids'], data['data'][0]['asks']
+
+    def extract_many(self, data) -> List[Dict]:
+        return data['data'] if data['code'] == '0' else []
+
+    def instruments_request(self) -> Optional[Dict]:
+        return {'path': '/api/v5/public/instruments', 'params': {'instType': 'SPOT'}}
+
+    def extract_instruments(self, data) -> List[Tuple[str, str, str]]:
+        if data['code'] != '0':
+            return []
+        return [(i['instId'], i['baseCcy'], i['quoteCcy']) for i in data['data'] if i['state'] == 'live']
+
+
+# ========== ASTER (HUOBI) ==========
+class AsterAdapter(ExchangeAdapter):
+    key = 'aster'
+    name = 'Aster/Huobi'
+    base_url = 'https://api.huobi.pro'
+    price_field = 'close'
+    volume_field = 'vol'
+    bid_field = 'bid'
+    ask_field = 'ask'
+    connect_timeout = 3.0
+    read_timeout = 4.0
+    rate_limit = 100
+    rate_window = 10.0
+    market_wide_tickers = True
+    taker_fee = 0.002
+
+    def ticker_request(self, symbol: str) -> Dict:
+        return {'path': '/market/detail/merged', 'params': {'symbol': symbol}}
+
+    def tickers_request(self, symbols: List[str]) -> Dict:
+        return {'path': '/market/tickers'}
+
+    def depth_request(self, symbol: str, limit: int) -> Dict:
+        return {'path': '/market/depth', 'params': {'symbol': symbol, 'type': 'step0', 'depth': limit}}
+
+    def extract_depth(self, data) -> Tuple[List, List]:
+        return data['tick']['bids'], data['tick']['asks']
+
+    def extract_one(self, data, symbol: str) -> List[Dict]:
+        if data['status'] != 'ok':
+            return []
+        # merged отдает bid/ask как [цена, объем], приводим к виду market/tickers
+        tick = data['tick']
+        return [{
+            'symbol': symbol,
+            'close': tick['close'],
+            'vol': tick['vol'],
+            'bid': tick['bid'][0] if tick.get('bid') else 0,
+            'ask': tick['ask'][0] if tick.get('ask') else 0
+        }]
+
+    def extract_many(self, data) -> List[Dict]:
+        return data['data'] if data['status'] == 'ok' else []
+
+    def instruments_request(self) -> Optional[Dict]:
+        return {'path': '/v1/common/symbols'}
+
+    def extract_instruments(self, data) -> List[Tuple[str, str, str]]:
+        if data['status'] != 'ok':
+            return []
+        return [(s['symbol'], s['base-currency'], s['quote-currency']) for s in data['data'] if s['state'] == 'online']
+
+
+# ========== MEXC ==========
+class MexcAdapter(ExchangeAdapter):
+    key = 'mexc'
+    name = 'MEXC'
+    base_url = 'https://api.mexc.com'
+    rate_limit = 500
+    rate_window = 10.0
+    market_wide_tickers = True
+    tickers_weight = 40
+    instruments_weight = 10
+    taker_fee = 0.0005
+
+    def remaining_budget(self, headers) -> Optional[float]:
+        used = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('X-MEXC-USED-WEIGHT')
+        return self.rate_limit - float(used) if used else None
+
+    def ticker_request(self, symbol: str) -> Dict:
+        return {'path': '/api/v3/ticker/24hr', 'params': {'symbol': symbol}}
+
+    def tickers_request(self, symbols: List[str]) -> Dict:
+        return {'path': '/api/v3/ticker/24hr'}
+
+    def depth_request(self, symbol: str, limit: int) -> Dict:
+        return {'path': '/api/v3/depth', 'params': {'symbol': symbol, 'limit': limit}}
+
+    def extract_many(self, data) -> List[Dict]:
+        return data if isinstance(data, list) else [data]
+
+    def instruments_request(self) -> Optional[Dict]:
+        return {'path': '/api/v3/exchangeInfo'}
+
+    def extract_instruments(self, data) -> List[Tuple[str, str, str]]:
+        # Статус MEXC: '1' (или 'ENABLED' в старых ответах) - пара торгуется
+        return [(s['symbol'], s['baseAsset'], s['quoteAsset']) for s in data['symbols']
+                if str(s.get('status')) in ('1', 'ENABLED') and s.get('isSpotTradingAllowed', True)]
+
+
+# ========== UNISWAP V3 ==========
+class UniswapAdapter(ExchangeAdapter):
+    # Цены читаются прямо из контрактов через Ethereum JSON-RPC: один eth_call в Multicall3
+    # на slot0/liquidity всех пулов (все уровни комиссии) всех пар, не чаще раза за блок.
+    # Комиссия у каждого пула своя и уже заложена в bid/ask и стакан, поэтому taker_fee = 0.
+    key = 'uniswap'
+    name = 'Uniswap V3'
+    base_url = 'https://ethereum-rpc.publicnode.com'
+    limit_per_host = 4
+    connect_timeout = 3.0
+    read_timeout = 5.0
+    rate_limit = 5
+    taker_fee = 0.0
+
+    def __init__(self, base_url: Optional[str] = None):
+        super().__init__(base_url)
+        # Пулы пары {(token_base, token_quote): [(адрес, комиссия)]} и decimals токенов - не меняются
+        self.pools: Dict[Tuple[str, str], List[Tuple[str, int]]] = {}
+        self.decimals: Dict[str, int] = {}
+        # Файл, где пулы переживают перезапуск; None - только в памяти
+        self.pool_cache: Optional[str] = None
+        # Последнее прочитанное состояние пулов пары и когда оно прочитано
+        self.states: Dict[Tuple[str, str], List[PoolState]] = {}
+        self.block = 0
+        self.read_at: Optional[float] = None
+
+    def load_pools(self, path: str):
+        self.pool_cache = path
+        pools, decimals = read_pool_cache(path)
+        self.decimals.update(decimals)
+        for key, found in pools.items():
+            base, quote = key.split('/')
+            self.pools[(base, quote)] = [(address, fee) for address, fee in found]
+
+    def known_pools(self, pair) -> Optional[List[Tuple[str, int]]]:
+        return self.pools.get((pair[0].lower(), pair[1].lower()))
+
+    async def multicall(self, calls: List[Tuple[str, str]], priority: int,
+                        dispatched: Optional[asyncio.Future] = None) -> Optional[List[Optional[bytes]]]:
+        payload = {
+            'jsonrpc': '2.0', 'id': 1, 'method': 'eth_call',
+            'params': [{'to': MULTICALL3, 'data': encode_aggregate3(calls)}, 'latest']
+        }
+        data = await self.request('POST', '', priority=priority, dispatched=dispatched, json=payload)
+        if not data:
+            return None
+        if 'error' in data:
+            print(f"Ошибка {self.name}: {data['error'].get('message')}")
+            return None
+        return decode_aggregate3(data['result'])
+
+    async def discover_pools(self, pairs: List, priority: int, dispatched: Optional[asyncio.Future] = None):
+        # getPool по всем уровням комиссии и decimals новых токенов - одним пакетом
+        pairs = [(base.lower(), quote.lower()) for base, quote in pairs]
+        calls, owners = [], []
+        for pair in pairs:
+            for fee in FEE_TIERS:
+                calls.append(get_pool_call(pair[0], pair[1], fee))
+                owners.append((pair, fee))
+        for token in {token for pair in pairs for token in pair if token not in self.decimals}:
+            calls.append(decimals_call(token))
+            owners.append((token, None))
+        results = await self.multicall(calls, priority, dispatched)
+        if results is None:
+            return
+        found = {pair: [] for pair in pairs}
+        for (owner, fee), result in zip(owners, results):
+            if result is None:
+                continue
+            if fee is None:
+                self.decimals[owner] = word_at(result)
+            elif word_at(result):
+                found[owner].append((address_at(result), fee))
+        self.pools.update(found)
+        if self.pool_cache:
+            # Пары без пулов не сохраняем: пул могут создать позже
+            write_pool_cache(
+                self.pool_cache,
+                {pair_key(pair): pools for pair, pools in self.pools.items() if pools},
+                self.decimals
+            )
+
+    async def read_pools(self, pairs: List, priority: int, dispatched: Optional[asyncio.Future] = None):
+        # slot0 и liquidity всех пулов плюс номер блока - одним eth_call
+        calls, owners = [], []
+        for pair in pairs:
+            for address, fee in self.known_pools(pair):
+                calls += [slot0_call(address), liquidity_call(address)]
+                owners.append((pair, address, fee))
+        calls.append(block_number_call())
+        results = await self.multicall(calls, priority, dispatched)
+        if results is None:
+            return
+        if results[-1]:
+            self.block = word_at(results[-1])
+        states = {pair: [] for pair in pairs}
+        for i, (pair, address, fee) in enumerate(owners):
+            slot0, liquidity = results[2 * i], results[2 * i + 1]
+            state = self.pool_state(pair, address, fee, slot0, liquidity)
+            if state:
+                states[pair].append(state)
+        self.states.update(states)
+        self.read_at = time.monotonic()
+
+    def pool_state(self, pair, address: str, fee: int, slot0: Optional[bytes],
+                   liquidity: Optional[bytes]) -> Optional[PoolState]:
+        base, quote = pair[0].lower(), pair[1].lower()
+        if not slot0 or not liquidity or base not in self.decimals or quote not in self.decimals:
+            return None
+        sqrt_price, active = word_at(slot0), word_at(liquidity)
+        if not sqrt_price or not active:
+            return None
+        # token0 пула - токен с меньшим адресом
+        return PoolState(address, fee, sqrt_price, active, int(base, 16) < int(quote, 16),
+                         self.decimals[base], self.decimals[quote])
+
+    def parse(self, pair) -> Ticker:
+        # Лучшие цены по всем пулам пары с их комиссиями; price - цена самого глубокого пула
+        states = self.states[pair]
+        token0, token1 = pair
+        row = self.table.row(self.name, pair)
+        row.symbol = f'{token0[:6]}/{token1[:6]}'
+        row.price = max(states, key=PoolState.depth).price()
+        row.bid = max(state.price() * (1 - state.fee) for state in states)
+        row.ask = min(state.price() / (1 - state.fee) for state in states)
+        return row
+
+    async def get_price(self, pair, priority: int = PRIORITY_BACKGROUND) -> Optional[Ticker]:
+        return (await self.get_prices([pair], priority)).get(pair)
+
+    async def get_prices(self, pairs: List, priority: int = PRIORITY_BACKGROUND,
+                         dispatched: Optional[asyncio.Future] = None) -> Dict:
+        prices = {}
+        try:
+            unknown = [pair for pair in pairs if self.known_pools(pair) is None]
+            if unknown:
+                await self.discover_pools(unknown, priority, dispatched)
+            pooled = [pair for pair in pairs if self.known_pools(pair)]
+            fresh = self.read_at is not None and time.monotonic() - self.read_at < BLOCK_TIME
+            if pooled and not (fresh and all(pair in self.states for pair in pooled)):
+                await self.read_pools(pooled, priority, dispatched)
+            for pair in pooled:
+                if self.states.get(pair):
+                    prices[pair] = self.parse(pair)
+        except Exception as e:
+            print(f"Ошибка {self.name}: {e}")
+        return prices
+
+    async def get_depth(self, pair, priority: int = PRIORITY_BACKGROUND,
+                        dispatched: Optional[asyncio.Future] = None) -> Optional[OrderBook]:
+        # Стакан из кривых пулов по последнему прочитанному блоку, без запроса.
+        # Уровни всех пулов пары сливаются, как если бы сделка делилась между пулами.
+        states = self.states.get(pair)
+        if not states:
+            return None
+        bids, asks = {}, {}
+        for state in states:
+            for price, qty in state.levels('bid', BOOK_DEPTH):
+                bids[price] = bids.get(price, 0.0) + qty
+            for price, qty in state.levels('ask', BOOK_DEPTH):
+                asks[price] = asks.get(price, 0.0) + qty
+        book = OrderBook()
+        book.replace(bids.items(), asks.items())
+        return book
+
+
+# Порядок реестра задает порядок бирж в списке цен символа
+ADAPTER_CLASSES = [
+    BinanceAdapter, GateioAdapter, BybitAdapter, KucoinAdapter,
+    OkxAdapter, AsterAdapter, MexcAdapter, UniswapAdapter
+]
+
+
+def create_connector() -> aiohttp.TCPConnector:
+    # Общий коннектор: DNS-кэш и keep-alive; лимит на биржу держит сам адаптер
+    return aiohttp.TCPConnector(
+        limit=sum(cls.limit_per_host for cls in ADAPTER_CLASSES),
+        limit_per_host=max(cls.limit_per_host for cls in ADAPTER_CLASSES),
+        ttl_dns_cache=DNS_CACHE_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=30
+    )
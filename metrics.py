@@ -0,0 +1,217 @@
+import math
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+# Границы корзин гистограмм (сек): от быстрых ответов бирж до долгих тиков
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AGE_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[str, ...]
+
+
+class Metric:
+    # Метрика в формате Prometheus; значения по кортежу меток, без блокировок (один event loop)
+    kind = ''
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[Labels, object] = {}
+        # Значения на момент прошлой выгрузки приращений (take_delta)
+        self.sent: Dict[Labels, object] = {}
+
+    def _label_str(self, values: Labels, extra: str = '') -> str:
+        pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{self._label_str(k)} {_number(v)}' for k, v in self.values.items()]
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        return '\n'.join(lines + self.samples())
+
+    def take_delta(self) -> Dict[Labels, object]:
+        # Изменения с прошлого вызова: воркер шарда отправляет их фронтенду вместе со снимком
+        delta = {}
+        for labels, value in self.values.items():
+            change = self._diff(value, self.sent.get(labels))
+            if change is not None:
+                delta[labels] = change
+                self.sent[labels] = self._copy(value)
+        return delta
+
+    def _copy(self, value):
+        return value
+
+    def _diff(self, value, previous):
+        raise NotImplementedError
+
+    def merge(self, labels: Labels, change):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels: str, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def _diff(self, value, previous):
+        return (value - (previous or 0)) or None
+
+    def merge(self, labels: Labels, change):
+        self.inc(*labels, value=change)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, *labels: str):
+        self.values[labels] = value
+
+    def get(self, *labels: str) -> Optional[float]:
+        return self.values.get(labels)
+
+    def _diff(self, value, previous):
+        # Для gauge приращение - само новое значение
+        return value if value != previous else None
+
+    def merge(self, labels: Labels, change):
+        self.set(change, *labels)
+
+
+class Histogram(Metric):
+    # На наблюдение - один bisect и три сложения; накопительные суммы считаются только при выдаче
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: str):
+        state = self.values.get(labels)
+        if state is None:
+            # [счетчики корзин (+Inf последней), сумма, количество]
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _copy(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+    def _diff(self, value, previous):
+        if previous is None:
+            return self._copy(value)
+        if value[2] == previous[2]:
+            return None
+        return [[a - b for a, b in zip(value[0], previous[0])], value[1] - previous[1], value[2] - previous[2]]
+
+    def merge(self, labels: Labels, change):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        for i, n in enumerate(change[0]):
+            state[0][i] += n
+        state[1] += change[1]
+        state[2] += change[2]
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = '+Inf' if bound == math.inf else _number(bound)
+                bucket = self._label_str(labels, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{bucket} {cumulative}')
+            lines.append(f'{self.name}_sum{self._label_str(labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{self._label_str(labels)} {count}')
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ========== МЕТРИКИ БОТА ==========
+EXCHANGE_LATENCY = Histogram('arb_exchange_request_seconds', 'Время HTTP-запроса к бирже', ('venue',))
+EXCHANGE_REQUESTS = Counter('arb_exchange_requests_total', 'Запросы к биржам по исходу', ('venue', 'result'))
+PRICE_AGE = Gauge('arb_price_age_seconds', 'Возраст цены в момент расчета возможностей', ('venue', 'symbol'))
+ALERT_PRICE_AGE = Histogram('arb_alert_price_age_seconds', 'Возраст самой старой цены сделки при уведомлении',
+                            buckets=AGE_BUCKETS)
+TICK_DURATION = Histogram('arb_tick_seconds', 'Длительность тика опроса целиком')
+TICK_ERRORS = Counter('arb_tick_errors_total', 'Тики, завершившиеся ошибкой')
+TELEGRAM_LATENCY = Histogram('arb_telegram_send_seconds', 'Время вызова send_message')
+TELEGRAM_MESSAGES = Counter('arb_telegram_messages_total', 'Отправка в Telegram по исходу', ('result',))
+TELEGRAM_QUEUE = Gauge('arb_telegram_queue_size', 'Сообщений в очереди отправки')
+BREAKER_STATE = Gauge('arb_breaker_state', 'Автомат биржи: 0 - работает, 1 - проба, 2 - пропускается', ('venue',))
+BREAKER_TRIPS = Counter('arb_breaker_trips_total', 'Сколько раз автомат биржи открывался', ('venue',))
+HEDGED_REQUESTS = Counter('arb_hedged_requests_total', 'Дублирующие запросы после p95 по победителю',
+                          ('venue', 'winner'))
+LATE_VENUES = Counter('arb_late_venues_total', 'Биржа не уложилась в бюджет тика', ('venue',))
+
+REGISTRY: List[Metric] = [
+    EXCHANGE_LATENCY, EXCHANGE_REQUESTS, PRICE_AGE, ALERT_PRICE_AGE,
+    TICK_DURATION, TICK_ERRORS, TELEGRAM_LATENCY, TELEGRAM_MESSAGES, TELEGRAM_QUEUE,
+    BREAKER_STATE, BREAKER_TRIPS, HEDGED_REQUESTS, LATE_VENUES
+]
+
+STARTED = time.time()
+
+
+# ========== МЕТРИКИ ВОРКЕРОВ ==========
+# В режиме шардов запросы к биржам и возраст цен считаются в процессах-воркерах, а /metrics
+# отдает фронтенд: воркер каждый тик выгружает приращения, фронтенд прибавляет их к своим
+def take_deltas() -> Dict[str, Dict[Labels, object]]:
+    deltas = {}
+    for metric in REGISTRY:
+        delta = metric.take_delta()
+        if delta:
+            deltas[metric.name] = delta
+    return deltas
+
+
+def apply_deltas(deltas: Dict[str, Dict[Labels, object]]):
+    metrics = {metric.name: metric for metric in REGISTRY}
+    for name, delta in deltas.items():
+        metric = metrics.get(name)
+        if metric is None:
+            continue
+        for labels, change in delta.items():
+            metric.merge(labels, change)
+
+
+def render() -> str:
+    uptime = f'# TYPE arb_uptime_seconds gauge\narb_uptime_seconds {time.time() - STARTED:.0f}'
+    return '\n'.join([metric.render() for metric in REGISTRY] + [uptime]) + '\n'
+
+
+# ========== HTTP-ЭНДПОИНТ ==========
+async def start_metrics_server(port: int, host: str = '0.0.0.0') -> web.AppRunner:
+    # /metrics для Prometheus, / - проверка живости для хостинга (Render web service)
+    async def metrics_handler(request: web.Request):
+        return web.Response(text=render(), content_type='text/plain', charset='utf-8')
+
+    async def health_handler(request: web.Request):
+        return web.Response(text='ok')
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics_handler)
+    app.router.add_get('/', health_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"📈 Метрики: http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,121 @@
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Сколько уровней стакана держать на сторону
+BOOK_DEPTH = 20
+
+
+class OrderBook:
+    # Локальный стакан top-N: отсортированные ключи цен (bisect) + словарь цена -> объем.
+    # Поддерживает как полную замену снимком, так и инкрементальные обновления из потока.
+    def __init__(self, depth: int = BOOK_DEPTH):
+        self.depth = depth
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        # Биды храним с минусом, чтобы обе стороны шли от лучшей цены по возрастанию ключа
+        self._bid_keys: List[float] = []
+        self._ask_keys: List[float] = []
+        self.ts = 0.0
+
+    def replace(self, bids: Iterable, asks: Iterable):
+        self.bids, self.asks = {}, {}
+        self._bid_keys, self._ask_keys = [], []
+        for price, qty in bids:
+            self.apply('bid', price, qty)
+        for price, qty in asks:
+            self.apply('ask', price, qty)
+
+    def apply(self, side: str, price, qty):
+        price, qty = float(price), float(qty)
+        if side == 'bid':
+            levels, keys, key = self.bids, self._bid_keys, -price
+        else:
+            levels, keys, key = self.asks, self._ask_keys, price
+
+        if qty <= 0:
+            if levels.pop(price, None) is not None:
+                del keys[bisect_left(keys, key)]
+        else:
+            if price not in levels:
+                insort(keys, key)
+            levels[price] = qty
+            if len(keys) > self.depth:
+                worst = keys.pop()
+                del levels[-worst if side == 'bid' else worst]
+        self.ts = time.monotonic()
+
+    def best_bid(self) -> Optional[float]:
+        return -self._bid_keys[0] if self._bid_keys else None
+
+    def best_ask(self) -> Optional[float]:
+        return self._ask_keys[0] if self._ask_keys else None
+
+    def levels(self, side: str) -> List[Tuple[float, float]]:
+        if side == 'bid':
+            return [(-k, self.bids[-k]) for k in self._bid_keys]
+        return [(k, self.asks[k]) for k in self._ask_keys]
+
+    def buy_with_quote(self, notional: float) -> Tuple[float, float]:
+        # Проходим по аскам на сумму notional: (куплено базы, потрачено котируемой)
+        qty = spent = 0.0
+        for price in self._ask_keys:
+            size = self.asks[price]
+            cost = price * size
+            if spent + cost >= notional:
+                qty += (notional - spent) / price
+                return qty, notional
+            qty += size
+            spent += cost
+        return qty, spent
+
+    def sell_base(self, qty: float) -> Tuple[float, float]:
+        # Проходим по бидам объемом qty: (получено котируемой, продано базы)
+        received = sold = 0.0
+        for key in self._bid_keys:
+            price = -key
+            size = self.bids[price]
+            if sold + size >= qty:
+                received += (qty - sold) * price
+                return received, qty
+            received += size * price
+            sold += size
+        return received, sold
+
+
+def net_profit(buy_book: OrderBook, sell_book: OrderBook, notional: float,
+               buy_fee: float, sell_fee: float) -> Optional[Dict]:
+    # Купить на notional по аскам одной биржи и продать по бидам другой с учетом taker-комиссий.
+    # Если глубины не хватает, сделка урезается до доступного объема (filled < 1).
+    bought, spent = buy_book.buy_with_quote(notional)
+    if bought <= 0:
+        return None
+    qty = bought * (1 - buy_fee)
+
+    received, sold = sell_book.sell_base(qty)
+    if sold <= 0:
+        return None
+    if sold < qty:
+        spent *= sold / qty
+        bought *= sold / qty
+    received *= (1 - sell_fee)
+
+    profit = received - spent
+    return {
+        'net_profit': profit,
+        'net_percent': profit / spent * 100,
+        'notional': spent,
+        'filled': spent / notional,
+        'buy_avg': spent / bought,
+        'sell_avg': received / (1 - sell_fee) / sold
+    }
+
+
+def top_of_book(bid: float, ask: float) -> OrderBook:
+    # Запасной вариант без стакана: один уровень без ограничения объема
+    book = OrderBook(depth=1)
+    if bid:
+        book.apply('bid', bid, float('inf'))
+    if ask:
+        book.apply('ask', ask, float('inf'))
+    return book
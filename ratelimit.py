@@ -0,0 +1,99 @@
+import asyncio
+import heapq
+import time
+from typing import List, Optional, Tuple
+
+# Приоритеты запросов: нажатия кнопок обслуживаются раньше фонового опроса
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Пауза после 429 без Retry-After (сек), удваивается при повторах; 418 = бан IP у Binance
+BACKOFF_MIN = 1.0
+BACKOFF_MAX = 120.0
+# Мультипликативное снижение скорости на 429 и аддитивное восстановление на 200 (AIMD)
+RATE_DECREASE = 0.5
+RATE_RECOVERY = 0.05
+RATE_FLOOR = 0.1
+
+
+class RateLimiter:
+    # Token bucket на бюджет биржи (вес или число запросов за окно) с очередью по приоритету
+    def __init__(self, limit: float, window: float):
+        self.capacity = float(limit)
+        self.max_rate = limit / window
+        self.rate = self.max_rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.backoff = BACKOFF_MIN
+        self.throttled = 0
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._seq = 0
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _try_take(self, weight: float) -> bool:
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return False
+        self._refill(now)
+        if self.tokens >= weight:
+            self.tokens -= weight
+            return True
+        return False
+
+    async def acquire(self, weight: float = 1, priority: int = PRIORITY_BACKGROUND):
+        weight = min(weight, self.capacity)
+        if not self._waiters and self._try_take(weight):
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiters, (priority, self._seq, weight, future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self._waiters:
+            _, _, weight, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+
+            self._refill(now)
+            if self.tokens >= weight:
+                self.tokens -= weight
+                heapq.heappop(self._waiters)
+                future.set_result(None)
+            else:
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+
+    def on_response(self, status: int, remaining: Optional[float] = None, retry_after: Optional[float] = None):
+        now = time.monotonic()
+        self._refill(now)
+
+        if status in (418, 429):
+            self.throttled += 1
+            pause = retry_after if retry_after is not None else self.backoff
+            if status == 418:
+                pause = max(pause, BACKOFF_MAX)
+            self.blocked_until = max(self.blocked_until, now + pause)
+            self.backoff = min(self.backoff * 2, BACKOFF_MAX)
+            self.rate = max(self.rate * RATE_DECREASE, self.max_rate * RATE_FLOOR)
+            self.tokens = 0.0
+            return
+
+        self.backoff = BACKOFF_MIN
+        self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_RECOVERY)
+        # Биржа знает точный остаток бюджета лучше нашего счетчика
+        if remaining is not None:
+            self.tokens = min(self.tokens, max(remaining, 0.0))
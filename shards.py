@@ -0,0 +1,269 @@
+import asyncio
+import multiprocessing
+import time
+from typing import Callable, Dict, List, Optional
+
+from metrics import TICK_DURATION, apply_deltas, take_deltas
+from ratelimit import RateLimiter
+
+# Шардирование опроса: каждый воркер - отдельный процесс со своим event loop, сессией и адаптерами,
+# опрашивает свою часть символов и считает по ней возможности и циклы. Снимки уходят по pipe
+# во фронтенд, который склеивает их и занимается Telegram.
+# Тики задает фронтенд. Биржи, у которых пакетный запрос отдает весь рынок, он опрашивает сам,
+# один раз за тик, и рассылает воркерам котировки их символов: иначе каждый воркер повторял бы
+# тот же запрос всего рынка. Метрики запросов и возраста цен воркеры присылают приращениями
+# вместе со снимком, чтобы /metrics фронтенда видел весь опрос.
+# Все пары котируются в USDT, а ребра перевода USDT между биржами есть в графе каждого шарда,
+# поэтому отрицательный цикл через несколько активов всегда содержит отрицательный участок
+# по одному активу, который находит шард этого актива.
+
+# Воркеры стартуют через spawn: fork процесса с потоками и работающим event loop небезопасен
+CONTEXT = multiprocessing.get_context('spawn')
+
+
+def partition(symbols: Dict[str, Dict], workers: int) -> List[Dict[str, Dict]]:
+    # Через один по порядку SYMBOLS: ручные и самые ликвидные пары расходятся по разным шардам
+    keys = list(symbols)
+    return [{key: symbols[key] for key in keys[shard::workers]} for shard in range(workers)]
+
+
+def share_limits(engine, parts: int):
+    # Все процессы ходят к биржам с одного IP: каждому - своя доля бюджета, но не меньше одного запроса
+    for adapter in engine.adapters.values():
+        heaviest = max(adapter.ticker_weight, adapter.tickers_weight, adapter.depth_weight, adapter.market_weight)
+        adapter.limiter = RateLimiter(max(adapter.rate_limit / parts, heaviest), adapter.rate_window)
+
+
+# ========== ВОРКЕР ==========
+def run_worker(factory: Callable, shard: int, workers: int, symbols: Dict[str, Dict], conn, options: Dict):
+    # Точка входа процесса; factory(base_urls) создает движок (ArbitrageBot с настройками окружения)
+    try:
+        asyncio.run(_worker(factory, shard, workers, symbols, conn, options))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker(factory: Callable, shard: int, workers: int, symbols: Dict[str, Dict], conn, options: Dict):
+    engine = factory(options.get('base_urls'))
+    await engine.init_session()
+    if options.get('share_limits', True):
+        share_limits(engine, workers + 1)
+    # Предел REST-стаканов на биржу за тик - на весь опрос, а не на каждый шард
+    engine.depth_per_venue = max(1, engine.depth_per_venue // workers)
+    if options.get('streams'):
+        await engine.start_streams(symbols)
+    loop = asyncio.get_running_loop()
+    messages: asyncio.Queue = asyncio.Queue()
+
+    def receive():
+        try:
+            messages.put_nowait(conn.recv())
+        except (EOFError, OSError):
+            loop.remove_reader(conn.fileno())
+            messages.put_nowait(None)
+
+    loop.add_reader(conn.fileno(), receive)
+    try:
+        while True:
+            # От фронтенда: ('symbols', набор) - обновление списка пар, ('tick', задание) или None - стоп.
+            # Из накопившихся тиков считаем последний: отставший воркер не копит очередь
+            pending = [await messages.get()]
+            while not messages.empty():
+                pending.append(messages.get_nowait())
+            job = None
+            for message in pending:
+                if message is None:
+                    return
+                kind, data = message
+                if kind == 'symbols':
+                    symbols = data
+                else:
+                    job = data
+            if job is None:
+                continue
+            started, cpu = time.time(), time.process_time()
+            engine.shared = job['shared']
+            snapshot = await engine.refresh_snapshot(symbols)
+            conn.send({
+                'shard': shard, 'tick': job['tick'], 'snapshot': snapshot, 'cycles': engine.cycles,
+                'cpu': time.process_time() - cpu, 'duration': time.time() - started, 'metrics': take_deltas()
+            })
+    except (BrokenPipeError, EOFError):
+        pass
+    finally:
+        await engine.close_session()
+
+
+# ========== ФРОНТЕНД ==========
+class ShardPool:
+    # Раз в interval рассылает воркерам тик с общими котировками и собирает их снимки: как только
+    # все шарды прислали очередной тик, склеенный снимок пишется в engine (для кнопок)
+    # и передается в on_snapshot (уведомления). interval=0 - следующий тик сразу после склейки (замеры)
+    def __init__(self, factory: Callable, workers: int, interval: float, options: Optional[Dict] = None):
+        self.factory = factory
+        self.workers = workers
+        self.interval = interval
+        self.options = options or {}
+        self.symbols: Dict[str, Dict] = {}
+        self.parts: List[Dict[str, Dict]] = []
+        self.processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+        self.conns: Dict[int, object] = {}
+        self.pieces: Dict[int, Dict] = {}
+        self.tick = -1
+        # Начало каждого разосланного тика: {тик: time.monotonic()}
+        self.started: Dict[int, float] = {}
+        self.merged = asyncio.Event()
+        self.stopping = False
+        self.engine = None
+        self.clock: Optional[asyncio.Task] = None
+        self.on_snapshot: Optional[Callable] = None
+
+    def start(self, engine, symbols: Dict[str, Dict]):
+        self.engine = engine
+        engine.shards = self
+        if self.options.get('share_limits', True):
+            share_limits(engine, self.workers + 1)
+        self.symbols = symbols
+        self.parts = partition(symbols, self.workers)
+        for shard in range(self.workers):
+            self._spawn(shard)
+        self.clock = asyncio.create_task(self._run())
+        print(f"🧩 Опрос разделен на {self.workers} воркеров")
+
+    def _spawn(self, shard: int):
+        if self.stopping:
+            return
+        conn, child = CONTEXT.Pipe()
+        process = CONTEXT.Process(
+            target=run_worker,
+            args=(self.factory, shard, self.workers, self.parts[shard], child, self.options),
+            daemon=True, name=f'shard-{shard}'
+        )
+        process.start()
+        child.close()
+        self.processes[shard] = process
+        self.conns[shard] = conn
+        asyncio.get_running_loop().add_reader(conn.fileno(), self._receive, shard)
+
+    def set_symbols(self, symbols: Dict[str, Dict]):
+        self.symbols = symbols
+        self.parts = partition(symbols, self.workers)
+        for shard, conn in self.conns.items():
+            conn.send(('symbols', self.parts[shard]))
+
+    async def stop(self):
+        self.stopping = True
+        if self.clock:
+            self.clock.cancel()
+            await asyncio.gather(self.clock, return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        for conn in self.conns.values():
+            loop.remove_reader(conn.fileno())
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process in self.processes.values():
+            await loop.run_in_executor(None, process.join, 10)
+            if process.is_alive():
+                process.terminate()
+        for conn in self.conns.values():
+            conn.close()
+        self.processes, self.conns = {}, {}
+
+    async def _run(self):
+        await self.engine.init_session()
+        tick = 0
+        while not self.stopping:
+            if self.interval:
+                # Тики выровнены по часам, как и без шардов
+                tick = int(time.time() // self.interval)
+            else:
+                tick += 1
+            self.started[tick] = time.monotonic()
+            self.merged.clear()
+            try:
+                shared = await self._fetch_shared()
+            except Exception as e:
+                print(f"Ошибка общего опроса бирж: {e}")
+                shared = {}
+            for shard, conn in list(self.conns.items()):
+                try:
+                    conn.send(('tick', {'tick': tick, 'shared': self._slice(shared, self.parts[shard])}))
+                except OSError:
+                    pass  # упавший воркер перезапустит _receive
+            if self.interval:
+                await asyncio.sleep((tick + 1) * self.interval - time.time())
+            else:
+                await self.merged.wait()
+
+    async def _fetch_shared(self) -> Dict[str, Dict]:
+        # Один запрос на биржу со всем рынком в ответе. В потоковом режиме REST только добирает
+        # пропуски потока воркера, поэтому там опрос остается в воркерах
+        if self.options.get('streams'):
+            return {}
+        engine = self.engine
+        engine.stale = {}
+        keys, tasks = [], []
+        for key, adapter in engine.adapters.items():
+            venue_symbols = list(dict.fromkeys(cfg[key] for cfg in self.symbols.values() if key in cfg))
+            if venue_symbols and adapter.market_wide(venue_symbols):
+                keys.append(key)
+                tasks.append(engine.get_prices(key, venue_symbols))
+        results = await asyncio.gather(*tasks)
+        received = time.monotonic()
+        return {
+            key: {'prices': prices, 'received': received, 'stale': engine.stale.get(key)}
+            for key, prices in zip(keys, results)
+        }
+
+    def _slice(self, shared: Dict[str, Dict], symbols: Dict[str, Dict]) -> Dict[str, Dict]:
+        # Воркеру - только котировки его символов
+        part = {}
+        for key, venue in shared.items():
+            wanted = {cfg[key] for cfg in symbols.values() if key in cfg}
+            prices = {symbol: row for symbol, row in venue['prices'].items() if symbol in wanted}
+            part[key] = {'prices': prices, 'received': venue['received'], 'stale': venue['stale']}
+        return part
+
+    def _receive(self, shard: int):
+        conn = self.conns[shard]
+        try:
+            piece = conn.recv()
+        except (EOFError, OSError):
+            # Воркер упал: перезапускаем с паузой, пока его символы ждут нового снимка
+            loop = asyncio.get_running_loop()
+            loop.remove_reader(conn.fileno())
+            conn.close()
+            del self.conns[shard]
+            self.pieces.pop(shard, None)
+            print(f"⚠️ Воркер {shard} завершился, перезапуск")
+            loop.call_later(self.interval or 1.0, self._spawn, shard)
+            return
+        apply_deltas(piece.pop('metrics'))
+        self.pieces[shard] = piece
+        self._merge()
+
+    def _merge(self):
+        if len(self.pieces) < self.workers:
+            return
+        tick = min(piece['tick'] for piece in self.pieces.values())
+        if tick <= self.tick:
+            return
+        self.tick = tick
+        # Длительность тика - от рассылки (вместе с общим опросом) до последнего шарда
+        started = self.started.pop(tick, None)
+        if started is not None:
+            TICK_DURATION.observe(time.monotonic() - started)
+        self.started = {t: s for t, s in self.started.items() if t > tick}
+        snapshot, cycles = {}, []
+        for piece in self.pieces.values():
+            snapshot.update(piece['snapshot'])
+            cycles.extend(piece['cycles'])
+        cycles.sort(key=lambda c: c['profit_percent'], reverse=True)
+        self.engine.snapshot = snapshot
+        self.engine.snapshot_time = time.monotonic()
+        self.engine.cycles = cycles
+        self.merged.set()
+        if self.on_snapshot:
+            asyncio.create_task(self.on_snapshot(snapshot))
@@ -0,0 +1,343 @@
+import asyncio
+import time
+import aiohttp
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from orderbook import OrderBook
+from tickers import loads
+
+# Пауза между переподключениями (сек): 1, 2, 4, ... до STREAM_MAX_BACKOFF
+STREAM_MIN_BACKOFF = 1
+STREAM_MAX_BACKOFF = 60
+
+
+class TickerStream:
+    # Один постоянный WebSocket на биржу, мультиплексированный по всем символам.
+    # Держит в памяти таблицу лучших bid/ask: {symbol: {'bid', 'ask', 'price', 'ts', ...}}
+    key = ''
+    exchange = ''
+    url = ''
+    ping_interval: Optional[float] = None
+    batch_size = 50
+
+    def __init__(self, symbols: List[str], url: Optional[str] = None):
+        self.symbols = list(dict.fromkeys(symbols))
+        if url:
+            self.url = url
+        self.book: Dict[str, Dict] = {}
+        # Локальные стаканы для бирж, у которых подписка идет на поток глубины
+        self.books: Dict[str, OrderBook] = {}
+        self.connected = False
+        self.reconnects = 0
+        # Вызывается после каждого (пере)подключения, чтобы заполнить пропуск через REST
+        self.on_connect: Optional[Callable[['TickerStream'], Awaitable]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- протокол биржи ----------
+    def subscribe_messages(self) -> List:
+        raise NotImplementedError
+
+    def parse(self, data) -> Optional[Tuple[str, Dict]]:
+        # Возвращает (symbol, {'bid', 'ask'[, 'price', 'volume']}) или None для служебных сообщений
+        raise NotImplementedError
+
+    def ping_message(self):
+        return None
+
+    async def connect_url(self, session: aiohttp.ClientSession) -> str:
+        return self.url
+
+    def batches(self) -> List[List[str]]:
+        return [self.symbols[i:i + self.batch_size] for i in range(0, len(self.symbols), self.batch_size)]
+
+    # ---------- таблица котировок ----------
+    def update(self, symbol: str, fields: Dict):
+        quote = self.book.get(symbol)
+        if quote is None:
+            quote = self.book[symbol] = {
+                'exchange': self.exchange,
+                'symbol': symbol,
+                'price': 0.0,
+                'volume': 0,
+                'bid': 0.0,
+                'ask': 0.0
+            }
+        quote.update(fields)
+        if 'price' not in fields and quote['bid'] and quote['ask']:
+            quote['price'] = (quote['bid'] + quote['ask']) / 2
+        quote['ts'] = time.monotonic()
+
+    def seed(self, symbol: str, price: Dict, since: float):
+        # Данные REST не должны затирать более свежие данные потока
+        quote = self.book.get(symbol)
+        if quote is not None and quote['ts'] > since:
+            if not quote['volume'] and price.get('volume'):
+                quote['volume'] = price['volume']
+            return
+        self.update(symbol, {k: price[k] for k in ('price', 'volume', 'bid', 'ask')})
+
+    def get_book(self, symbol: str) -> Optional[OrderBook]:
+        if not self.connected:
+            return None
+        return self.books.get(symbol)
+
+    def get_quote(self, symbol: str) -> Optional[Dict]:
+        if not self.connected:
+            return None
+        quote = self.book.get(symbol)
+        if quote is None or not quote['bid'] or not quote['ask']:
+            return None
+        return {k: v for k, v in quote.items() if k != 'ts'}
+
+    # ---------- жизненный цикл ----------
+    def start(self, session: aiohttp.ClientSession):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(session))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+
+    async def _pinger(self, ws: aiohttp.ClientWebSocketResponse):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            msg = self.ping_message()
+            if isinstance(msg, str):
+                await ws.send_str(msg)
+            else:
+                await ws.send_json(msg)
+
+    async def run(self, session: aiohttp.ClientSession):
+        backoff = STREAM_MIN_BACKOFF
+        while True:
+            pinger = None
+            try:
+                url = await self.connect_url(session)
+                async with session.ws_connect(url, heartbeat=30, timeout=10) as ws:
+                    for msg in self.subscribe_messages():
+                        await ws.send_json(msg)
+                    self.connected = True
+                    backoff = STREAM_MIN_BACKOFF
+                    if self.on_connect:
+                        asyncio.create_task(self.on_connect(self))
+                    if self.ping_interval and self.ping_message() is not None:
+                        pinger = asyncio.create_task(self._pinger(ws))
+
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._handle(msg.data)
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ошибка потока {self.exchange}: {e}")
+            finally:
+                self.connected = False
+                if pinger:
+                    pinger.cancel()
+
+            self.reconnects += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, STREAM_MAX_BACKOFF)
+
+    def _handle(self, raw: str):
+        try:
+            data = loads(raw)
+        except ValueError:
+            return  # 'pong' и прочие не-JSON ответы
+        try:
+            parsed = self.parse(data)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            print(f"Ошибка разбора {self.exchange}: {e}")
+            return
+        if parsed:
+            symbol, fields = parsed
+            self.update(symbol, fields)
+
+
+# ========== BINANCE ==========
+class BinanceStream(TickerStream):
+    key = 'binance'
+    exchange = 'Binance'
+    url = 'wss://stream.binance.com:9443/ws'
+    batch_size = 200
+
+    def subscribe_messages(self) -> List:
+        return [
+            {'method': 'SUBSCRIBE', 'params': [f'{s.lower()}@bookTicker' for s in batch], 'id': i}
+            for i, batch in enumerate(self.batches(), 1)
+        ]
+
+    def parse(self, data) -> Optional[Tuple[str, Dict]]:
+        if 's' not in data or 'b' not in data:
+            return None
+        return data['s'], {'bid': float(data['b']), 'ask': float(data['a'])}
+
+
+# ========== GATE.IO ==========
+class GateioStream(TickerStream):
+    key = 'gateio'
+    exchange = 'Gate.io'
+    url = 'wss://api.gateio.ws/ws/v4/'
+    ping_interval = 20
+    batch_size = 100
+
+    def subscribe_messages(self) -> List:
+        return [
+            {'time': int(time.time()), 'channel': 'spot.book_ticker', 'event': 'subscribe', 'payload': batch}
+            for batch in self.batches()
+        ]
+
+    def ping_message(self):
+        return {'time': int(time.time()), 'channel': 'spot.ping'}
+
+    def parse(self, data) -> Optional[Tuple[str, Dict]]:
+        if data.get('channel') != 'spot.book_ticker' or data.get('event') != 'update':
+            return None
+        result = data['result']
+        return result['s'], {'bid': float(result['b']), 'ask': float(result['a'])}
+
+
+# ========== BYBIT ==========
+class BybitStream(TickerStream):
+    key = 'bybit'
+    exchange = 'Bybit'
+    url = 'wss://stream.bybit.com/v5/public/spot'
+    ping_interval = 20
+    batch_size = 10  # лимит Bybit на число args в одной подписке
+    depth = 50
+
+    def subscribe_messages(self) -> List:
+        return [
+            {'op': 'subscribe', 'args': [f'orderbook.{self.depth}.{s}' for s in batch]}
+            for batch in self.batches()
+        ]
+
+    def ping_message(self):
+        return {'op': 'ping'}
+
+    def parse(self, data) -> Optional[Tuple[str, Dict]]:
+        # Снимок стакана, затем дельты; лучшие цены берем из локального стакана
+        if not data.get('topic', '').startswith('orderbook.'):
+            return None
+        update = data['data']
+        symbol = update['s']
+        book = self.books.get(symbol)
+        if data.get('type') == 'snapshot' or book is None:
+            book = self.books[symbol] = OrderBook(self.depth)
+            book.replace(update['b'], update['a'])
+        else:
+            for price, qty in update['b']:
+                book.apply('bid', price, qty)
+            for price, qty in update['a']:
+                book.apply('ask', price, qty)
+
+        fields = {}
+        if book.best_bid() is not None:
+            fields['bid'] = book.best_bid()
+        if book.best_ask() is not None:
+            fields['ask'] = book.best_ask()
+        return symbol, fields
+
+
+# ========== KUCOIN ==========
+class KucoinStream(TickerStream):
+    key = 'kucoin'
+    exchange = 'KuCoin'
+    bullet_url = 'https://api.kucoin.com/api/v1/bullet-public'
+    ping_interval = 18
+    batch_size = 100  # лимит KuCoin на число символов в одном topic
+
+    def __init__(self, symbols: List[str], url: Optional[str] = None, bullet_url: Optional[str] = None):
+        super().__init__(symbols, url)
+        if bullet_url:
+            self.bullet_url = bullet_url
+
+    async def connect_url(self, session: aiohttp.ClientSession) -> str:
+        # KuCoin выдает адрес и токен для WebSocket через REST
+        if self.url:
+            return self.url
+        async with session.post(self.bullet_url, timeout=10) as resp:
+            data = await resp.json()
+        server = data['data']['instanceServers'][0]
+        self.ping_interval = server['pingInterval'] / 1000 * 0.9
+        return f"{server['endpoint']}?token={data['data']['token']}&connectId={int(time.time() * 1000)}"
+
+    def subscribe_messages(self) -> List:
+        return [
+            {'id': str(i), 'type': 'subscribe', 'topic': '/market/ticker:' + ','.join(batch), 'response': True}
+            for i, batch in enumerate(self.batches(), 1)
+        ]
+
+    def ping_message(self):
+        return {'id': str(int(time.time() * 1000)), 'type': 'ping'}
+
+    def parse(self, data) -> Optional[Tuple[str, Dict]]:
+        if data.get('type') != 'message' or not data.get('topic', '').startswith('/market/ticker:'):
+            return None
+        ticker = data['data']
+        return data['topic'].split(':', 1)[1], {
+            'price': float(ticker['price']),
+            'bid': float(ticker['bestBid']),
+            'ask': float(ticker['bestAsk'])
+        }
+
+
+# ========== OKX ==========
+class OkxStream(TickerStream):
+    key = 'okx'
+    exchange = 'OKX'
+    url = 'wss://ws.okx.com:8443/ws/v5/public'
+    ping_interval = 25
+
+    def subscribe_messages(self) -> List:
+        return [
+            {'op': 'subscribe', 'args': [{'channel': 'tickers', 'instId': s} for s in batch]}
+            for batch in self.batches()
+        ]
+
+    def ping_message(self):
+        return 'ping'
+
+    def parse(self, data) -> Optional[Tuple[str, Dict]]:
+        if data.get('arg', {}).get('channel') != 'tickers' or not data.get('data'):
+            return None
+        ticker = data['data'][0]
+        return ticker['instId'], {
+            'price': float(ticker['last']),
+            'volume': float(ticker['vol24h']),
+            'bid': float(ticker['bidPx']),
+            'ask': float(ticker['askPx'])
+        }
+
+
+# ========== MEXC ==========
+class MexcStream(TickerStream):
+    key = 'mexc'
+    exchange = 'MEXC'
+    url = 'wss://wbs.mexc.com/ws'
+    ping_interval = 20
+    batch_size = 30  # лимит MEXC на число подписок в одном запросе
+
+    def subscribe_messages(self) -> List:
+        return [
+            {'method': 'SUBSCRIPTION', 'params': [f'spot@public.bookTicker.v3.api@{s}' for s in batch]}
+            for batch in self.batches()
+        ]
+
+    def ping_message(self):
+        return {'method': 'PING'}
+
+    def parse(self, data) -> Optional[Tuple[str, Dict]]:
+        if not data.get('c', '').startswith('spot@public.bookTicker') or 'd' not in data:
+            return None
+        return data['s'], {'bid': float(data['d']['b']), 'ask': float(data['d']['a'])}
+
+
+STREAM_CLASSES = [BinanceStream, GateioStream, BybitStream, KucoinStream, OkxStream, MexcStream]
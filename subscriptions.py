@@ -0,0 +1,220 @@
+import heapq
+import math
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from alerts import ALERT_THRESHOLD, AlertTracker
+
+# Порог чата округляется до корзины с шагом THRESHOLD_STEP (%): у каждой занятой корзины свой
+# AlertTracker, а индекс (символ, корзина) -> чаты дает получателей события без перебора всех чатов
+THRESHOLD_STEP = 0.25
+MAX_THRESHOLD = 10.0
+# Период сводки по умолчанию и верхняя граница (сек); нижняя - период опроса бирж
+DEFAULT_INTERVAL = 60
+MAX_INTERVAL = 24 * 3600
+# Ключ индекса для чатов без списка пар: следят за всеми
+ALL_SYMBOLS = '*'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    chat_id INTEGER PRIMARY KEY,
+    enabled INTEGER NOT NULL,
+    threshold REAL NOT NULL,
+    interval REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watchlist (
+    chat_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    PRIMARY KEY (chat_id, symbol)
+);
+"""
+
+
+def bucket_of(threshold: float) -> int:
+    # nan/inf не округляются: такой порог считаем порогом по умолчанию
+    if not math.isfinite(threshold):
+        threshold = ALERT_THRESHOLD
+    return min(max(round(threshold / THRESHOLD_STEP), 1), round(MAX_THRESHOLD / THRESHOLD_STEP))
+
+
+class Subscriptions:
+    # Подписки чатов в SQLite: включен ли мониторинг, порог, период сводки и список пар.
+    # В памяти - копия таблиц, инвертированный индекс и очередь сводок по времени.
+    # Запись в базу только при изменении настроек чата, поэтому синхронный sqlite3 не мешает циклу.
+    def __init__(self, min_interval: float = DEFAULT_INTERVAL):
+        self.min_interval = min_interval
+        self.db: Optional[sqlite3.Connection] = None
+        # {chat_id: {'enabled', 'threshold', 'interval', 'symbols': set()}}; пустой список = все пары
+        self.chats: Dict[int, Dict] = {}
+        # {(символ | ALL_SYMBOLS, корзина): {chat_id}} - только включенные чаты
+        self.index: Dict[Tuple[str, int], Set[int]] = {}
+        # Включенных чатов в корзине; трекер корзины живет, пока она не пуста
+        self.bucket_chats: Dict[int, int] = {}
+        self.trackers: Dict[int, AlertTracker] = {}
+        # События чата до его очередной сводки и куча (время сводки, chat_id) по чатам с событиями
+        self.pending: Dict[int, List[Dict]] = {}
+        self.due: List[Tuple[float, int]] = []
+        self.last_sent: Dict[int, float] = {}
+
+    def open(self, path: str):
+        try:
+            self.db = sqlite3.connect(path)
+            with self.db:
+                self.db.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            # Без базы бот работает, но подписки не переживут перезапуск
+            print(f"Ошибка базы подписок {path}: {e}")
+            self.db = sqlite3.connect(':memory:')
+            self.db.executescript(SCHEMA)
+        watchlists: Dict[int, Set[str]] = {}
+        for chat_id, symbol in self.db.execute('SELECT chat_id, symbol FROM watchlist'):
+            watchlists.setdefault(chat_id, set()).add(symbol)
+        for chat_id, enabled, threshold, interval in self.db.execute(
+                'SELECT chat_id, enabled, threshold, interval FROM chats'):
+            # Строки с inf, записанные до проверки ввода, приводятся к допустимым значениям (nan база не хранит)
+            chat = {'enabled': bool(enabled), 'threshold': bucket_of(threshold) * THRESHOLD_STEP,
+                    'interval': self._interval(interval),
+                    'symbols': watchlists.get(chat_id, set())}
+            self.chats[chat_id] = chat
+            self._index(chat_id, chat)
+        print(f"🔔 Подписок: {len(self.chats)}, включено: {sum(self.bucket_chats.values())}")
+
+    def close(self):
+        if self.db:
+            self.db.close()
+            self.db = None
+
+    def active(self) -> bool:
+        return bool(self.bucket_chats)
+
+    # ========== НАСТРОЙКИ ЧАТА ==========
+    def get(self, chat_id: int) -> Dict:
+        return self.chats.get(chat_id) or self._default()
+
+    def subscribe(self, chat_id: int) -> Dict:
+        return self._change(chat_id, enabled=True)
+
+    def unsubscribe(self, chat_id: int) -> Dict:
+        self.pending.pop(chat_id, None)
+        return self._change(chat_id, enabled=False)
+
+    def set_threshold(self, chat_id: int, threshold: float) -> Dict:
+        return self._change(chat_id, threshold=bucket_of(threshold) * THRESHOLD_STEP)
+
+    def set_interval(self, chat_id: int, interval: float) -> Dict:
+        return self._change(chat_id, interval=self._interval(interval))
+
+    def set_watchlist(self, chat_id: int, symbols: Iterable[str]) -> Dict:
+        return self._change(chat_id, symbols=set(symbols))
+
+    def _interval(self, interval: float) -> float:
+        # nan сломал бы кучу сводок (сравнения с ним всегда ложны), inf - никогда не наступающий срок
+        if not math.isfinite(interval):
+            return self._default()['interval']
+        return min(max(interval, self.min_interval), MAX_INTERVAL)
+
+    def _default(self) -> Dict:
+        return {'enabled': False, 'threshold': ALERT_THRESHOLD,
+                'interval': max(DEFAULT_INTERVAL, self.min_interval), 'symbols': set()}
+
+    def _change(self, chat_id: int, **changes) -> Dict:
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = self._default()
+        self._unindex(chat_id, chat)
+        chat.update(changes)
+        self._index(chat_id, chat)
+        self._save(chat_id, chat)
+        return chat
+
+    def _save(self, chat_id: int, chat: Dict):
+        if self.db is None:
+            return
+        try:
+            with self.db:
+                self.db.execute('INSERT OR REPLACE INTO chats (chat_id, enabled, threshold, interval) '
+                                'VALUES (?, ?, ?, ?)',
+                                (chat_id, int(chat['enabled']), chat['threshold'], chat['interval']))
+                self.db.execute('DELETE FROM watchlist WHERE chat_id = ?', (chat_id,))
+                self.db.executemany('INSERT INTO watchlist (chat_id, symbol) VALUES (?, ?)',
+                                    [(chat_id, symbol) for symbol in sorted(chat['symbols'])])
+        except sqlite3.Error as e:
+            print(f"Ошибка сохранения подписки {chat_id}: {e}")
+
+    # ========== ИНДЕКС ==========
+    def _keys(self, chat: Dict) -> List[Tuple[str, int]]:
+        bucket = bucket_of(chat['threshold'])
+        return [(symbol, bucket) for symbol in chat['symbols']] or [(ALL_SYMBOLS, bucket)]
+
+    def _index(self, chat_id: int, chat: Dict):
+        if not chat['enabled']:
+            return
+        for key in self._keys(chat):
+            self.index.setdefault(key, set()).add(chat_id)
+        bucket = bucket_of(chat['threshold'])
+        self.bucket_chats[bucket] = self.bucket_chats.get(bucket, 0) + 1
+        if bucket not in self.trackers:
+            self.trackers[bucket] = AlertTracker(bucket * THRESHOLD_STEP)
+
+    def _unindex(self, chat_id: int, chat: Dict):
+        if not chat['enabled']:
+            return
+        for key in self._keys(chat):
+            chats = self.index.get(key)
+            if chats is not None:
+                chats.discard(chat_id)
+                if not chats:
+                    del self.index[key]
+        bucket = bucket_of(chat['threshold'])
+        self.bucket_chats[bucket] -= 1
+        if not self.bucket_chats[bucket]:
+            del self.bucket_chats[bucket]
+            del self.trackers[bucket]
+
+    # ========== РАССЫЛКА ==========
+    def update(self, snapshot: Dict[str, Dict], now: float) -> List[Dict]:
+        # Переходы по каждой корзине порогов раскладываются по чатам через индекс:
+        # работа пропорциональна числу получателей, а не числу подписанных чатов.
+        # Каждый чат стоит ровно в одной корзине и либо в ALL_SYMBOLS, либо в своих парах,
+        # поэтому событие не попадает в чат дважды.
+        matched = []
+        for bucket, tracker in self.trackers.items():
+            for event in tracker.update(snapshot, now):
+                receivers = (self.index.get((event['symbol'], bucket), ()),
+                             self.index.get((ALL_SYMBOLS, bucket), ()))
+                if not any(receivers):
+                    continue
+                for chats in receivers:
+                    for chat_id in chats:
+                        self._queue(chat_id, event)
+                matched.append(event)
+        return matched
+
+    def _queue(self, chat_id: int, event: Dict):
+        pending = self.pending.get(chat_id)
+        if pending is None:
+            pending = self.pending[chat_id] = []
+            due = self.last_sent.get(chat_id, -math.inf) + self.chats[chat_id]['interval']
+            heapq.heappush(self.due, (due, chat_id))
+        pending.append(event)
+
+    def deliveries(self, now: float) -> List[Tuple[int, List[Dict]]]:
+        # Один планировщик на все чаты: из кучи достаются только чаты, чья сводка подошла.
+        # Допуск в полпериода опроса: тик, пришедший чуть раньше срока, не откладывает сводку на целый период.
+        ready = []
+        slack = self.min_interval / 2
+        while self.due and self.due[0][0] <= now + slack:
+            _, chat_id = heapq.heappop(self.due)
+            events = self.pending.pop(chat_id, None)
+            chat = self.chats.get(chat_id)
+            if not events or not chat or not chat['enabled']:
+                continue
+            due = self.last_sent.get(chat_id, -math.inf) + chat['interval']
+            if due > now + slack:
+                # Период увеличили, пока события ждали сводки
+                self.pending[chat_id] = events
+                heapq.heappush(self.due, (due, chat_id))
+                continue
+            self.last_sent[chat_id] = now
+            ready.append((chat_id, events))
+        return ready
@@ -0,0 +1,75 @@
+import json
+from typing import Dict, Iterable, Optional, Tuple
+
+# Быстрый JSON, если установлен (pip install orjson); иначе стандартный модуль.
+# orjson разбирает bytes без промежуточного декодирования в str.
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    loads = json.loads
+    JSON_BACKEND = 'json'
+
+
+class Ticker:
+    # Строка таблицы котировок: один объект на (биржа, символ), перезаписывается на месте каждый тик.
+    # Читается как dict (ticker['bid']), чтобы код, работающий с ценами, не менялся.
+    __slots__ = ('exchange', 'symbol', 'price', 'volume', 'bid', 'ask')
+
+    def __init__(self, exchange: str, symbol: str):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.price = 0.0
+        self.volume = 0.0
+        self.bid = 0.0
+        self.ask = 0.0
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def copy(self) -> 'Ticker':
+        # Значения на момент тика: сама строка перезаписывается следующим ответом биржи
+        row = Ticker(self.exchange, self.symbol)
+        row.price, row.volume, row.bid, row.ask = self.price, self.volume, self.bid, self.ask
+        return row
+
+    def __repr__(self) -> str:
+        return f'Ticker({self.exchange} {self.symbol} {self.bid}/{self.ask} last={self.price})'
+
+
+class TickerTable:
+    # Заранее выделенные строки по (биржа, символ): нормализация пишет поля в готовый объект,
+    # без нового dict на каждый тикер каждого ответа. Строки биржи - отдельный словарь,
+    # чтобы горячий цикл адаптера искал строку по символу без составного ключа.
+    def __init__(self):
+        self.venues: Dict[str, Dict[object, Ticker]] = {}
+
+    def venue(self, exchange: str) -> Dict[object, Ticker]:
+        rows = self.venues.get(exchange)
+        if rows is None:
+            rows = self.venues[exchange] = {}
+        return rows
+
+    def row(self, exchange: str, symbol) -> Ticker:
+        rows = self.venue(exchange)
+        row = rows.get(symbol)
+        if row is None:
+            row = rows[symbol] = Ticker(exchange, symbol)
+        return row
+
+    def reserve(self, exchange: str, symbols: Iterable):
+        for symbol in symbols:
+            self.row(exchange, symbol)
+
+    def get(self, exchange: str, symbol) -> Optional[Ticker]:
+        return self.venues.get(exchange, {}).get(symbol)
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Хранилище тиков: по файлу на UTC-день, файл = последовательность чанков.
+# Чанк: заголовок + колонки фиксированной ширины, каждая выровнена на 8 байт.
+# Рядом лежит индекс чанков (время, символы) и словарь имен бирж/символов.
+COLUMNS = [
+    ('ts', '<f8'),
+    ('venue', '<u2'),
+    ('symbol', '<u4'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('last', '<f8'),
+    ('volume', '<f8'),
+]
+CHUNK_MAGIC = b'TCK1'
+CHUNK_HEADER = struct.Struct('<4sIdd')  # magic, число записей, ts_min, ts_max
+
+# Чанк сбрасывается на диск при заполнении или раз в FLUSH_INTERVAL секунд
+CHUNK_RECORDS = 8192
+FLUSH_INTERVAL = 300
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d')
+
+
+class TickRecorder:
+    # Запись без блокировки event loop: в цикле только копирование в заранее выделенные
+    # массивы, сериализация и запись - в отдельном потоке (один поток = порядок сохраняется).
+    def __init__(self, root: str, chunk_records: int = CHUNK_RECORDS, flush_interval: float = FLUSH_INTERVAL):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.chunk_records = chunk_records
+        self.flush_interval = flush_interval
+        self.buffer = {name: np.zeros(chunk_records, dtype=dtype) for name, dtype in COLUMNS}
+        self.count = 0
+        self.day: Optional[str] = None
+        self.started = time.monotonic()
+        self.names = _load_names(root)
+        self._venue_ids = {name: i for i, name in enumerate(self.names['venues'])}
+        self._symbol_ids = {name: i for i, name in enumerate(self.names['symbols'])}
+        self._names_dirty = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tickstore')
+        self._pending: List[asyncio.Future] = []
+        self.written = 0
+
+    def _id(self, ids: Dict[str, int], kind: str, name: str) -> int:
+        value = ids.get(name)
+        if value is None:
+            value = ids[name] = len(self.names[kind])
+            self.names[kind].append(name)
+            self._names_dirty = True
+        return value
+
+    def record(self, results: Dict[str, List[Dict]], ts: Optional[float] = None):
+        # results в формате monitor_all: {символ: [цены бирж]}
+        ts = time.time() if ts is None else ts
+        day = _day(ts)
+        if self.day is not None and day != self.day:
+            self.flush()
+        self.day = day
+
+        buf = self.buffer
+        for symbol, prices in results.items():
+            symbol_id = self._id(self._symbol_ids, 'symbols', symbol)
+            for price in prices:
+                if self.count == self.chunk_records:
+                    self.flush()
+                    self.day = day
+                i = self.count
+                buf['ts'][i] = ts
+                buf['venue'][i] = self._id(self._venue_ids, 'venues', price['exchange'])
+                buf['symbol'][i] = symbol_id
+                buf['bid'][i] = price['bid'] or 0.0
+                buf['ask'][i] = price['ask'] or 0.0
+                buf['last'][i] = price['price']
+                buf['volume'][i] = price['volume'] or 0.0
+                self.count += 1
+
+        if time.monotonic() - self.started >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.started = time.monotonic()
+        if not self.count:
+            return
+        columns = {name: self.buffer[name][:self.count].copy() for name, _ in COLUMNS}
+        names = json.loads(json.dumps(self.names)) if self._names_dirty else None
+        self._names_dirty = False
+        day, self.count = self.day, 0
+
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._write, day, columns, names)
+        self._pending = [f for f in self._pending if not f.done()] + [future]
+
+    def _write(self, day: str, columns: Dict[str, np.ndarray], names: Optional[Dict]):
+        if names is not None:
+            _save_names(self.root, names)
+
+        count = len(columns['ts'])
+        path = os.path.join(self.root, f'{day}.ticks')
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            ts = columns['ts']
+            f.write(CHUNK_HEADER.pack(CHUNK_MAGIC, count, float(ts.min()), float(ts.max())))
+            for name, dtype in COLUMNS:
+                data = columns[name].tobytes()
+                f.write(data)
+                f.write(b'\0' * (_padded(len(data)) - len(data)))
+
+        entry = {
+            'offset': offset,
+            'count': count,
+            'ts_min': float(ts.min()),
+            'ts_max': float(ts.max()),
+            'symbols': sorted(int(s) for s in np.unique(columns['symbol']))
+        }
+        with open(os.path.join(self.root, f'{day}.idx'), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        self.written += count
+
+    async def close(self):
+        self.flush()
+        if self._pending:
+            await asyncio.gather(*self._pending)
+        self._executor.shutdown(wait=True)
+
+
+class TickReader:
+    # Чтение через memmap: колонки чанка отображаются без загрузки файла целиком,
+    # индекс позволяет пропускать чанки вне диапазона времени и без нужных символов.
+    def __init__(self, root: str):
+        self.root = root
+        self.names = _load_names(root)
+        self._maps: Dict[str, np.memmap] = {}
+
+    def days(self) -> List[str]:
+        return sorted(f[:-6] for f in os.listdir(self.root) if f.endswith('.ticks'))
+
+    def index(self, day: str) -> List[Dict]:
+        path = os.path.join(self.root, f'{day}.idx')
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _columns(self, day: str, entry: Dict) -> Dict[str, np.ndarray]:
+        count = entry['count']
+        end = entry['offset'] + CHUNK_HEADER.size + sum(_padded(np.dtype(d).itemsize * count) for _, d in COLUMNS)
+        raw = self._maps.get(day)
+        if raw is None or len(raw) < end:
+            # Файл дописывается: перемапливаем, если чанк за пределами старого отображения
+            raw = self._maps[day] = np.memmap(os.path.join(self.root, f'{day}.ticks'), dtype=np.uint8, mode='r')
+        pos = entry['offset'] + CHUNK_HEADER.size
+        columns = {}
+        for name, dtype in COLUMNS:
+            size = np.dtype(dtype).itemsize * count
+            columns[name] = raw[pos:pos + size].view(dtype)
+            pos += _padded(size)
+        return columns
+
+    def scan(self, start: float = 0.0, end: float = float('inf'), symbols: Optional[List[str]] = None,
+             venues: Optional[List[str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+        # Отдает колонки по чанкам; записи внутри чанка идут по неубыванию ts
+        symbol_ids = None
+        if symbols is not None:
+            symbol_ids = {self.names['symbols'].index(s) for s in symbols if s in self.names['symbols']}
+        venue_ids = None
+        if venues is not None:
+            venue_ids = [self.names['venues'].index(v) for v in venues if v in self.names['venues']]
+
+        first_day, last_day = _day(start) if start > 0 else '', _day(end) if end != float('inf') else '~'
+        for day in self.days():
+            if not first_day <= day <= last_day:
+                continue
+            for entry in self.index(day):
+                if entry['ts_max'] < start or entry['ts_min'] > end:
+                    continue
+                if symbol_ids is not None and symbol_ids.isdisjoint(entry['symbols']):
+                    continue
+
+                columns = self._columns(day, entry)
+                lo = int(np.searchsorted(columns['ts'], start, 'left'))
+                hi = int(np.searchsorted(columns['ts'], end, 'right'))
+                if lo >= hi:
+                    continue
+                selected = {name: col[lo:hi] for name, col in columns.items()}
+
+                mask = None
+                if symbol_ids is not None:
+                    mask = np.isin(selected['symbol'], list(symbol_ids))
+                if venue_ids is not None:
+                    venue_mask = np.isin(selected['venue'], venue_ids)
+                    mask = venue_mask if mask is None else mask & venue_mask
+                if mask is not None:
+                    selected = {name: col[mask] for name, col in selected.items()}
+                if len(selected['ts']):
+                    yield selected
+
+    def read(self, start: float = 0.0, end: float = float('inf'), symbols: Optional[List[str]] = None,
+             venues: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        chunks = list(self.scan(start, end, symbols, venues))
+        return {
+            name: np.concatenate([c[name] for c in chunks]) if chunks else np.zeros(0, dtype=dtype)
+            for name, dtype in COLUMNS
+        }
+
+
+def _load_names(root: str) -> Dict[str, List[str]]:
+    path = os.path.join(root, 'names.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'venues': [], 'symbols': []}
+
+
+def _save_names(root: str, names: Dict[str, List[str]]):
+    path = os.path.join(root, 'names.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(names, f)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,172 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+# Контракты Ethereum mainnet: фабрика Uniswap V3 и Multicall3 (один адрес во всех сетях)
+FACTORY = '0x1F98431c8aD98523631AE4a59f267346ea31F984'
+MULTICALL3 = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+# Уровни комиссии пулов V3 (в миллионных долях)
+FEE_TIERS = (100, 500, 3000, 10000)
+
+# Селекторы функций: первые 4 байта keccak256 сигнатуры
+SELECTOR_AGGREGATE3 = '82ad56cb'      # aggregate3((address,bool,bytes)[])
+SELECTOR_BLOCK_NUMBER = '42cbb15c'    # getBlockNumber()
+SELECTOR_GET_POOL = '1698ee82'        # getPool(address,address,uint24)
+SELECTOR_SLOT0 = '3850c7bd'           # slot0()
+SELECTOR_LIQUIDITY = '1a686502'       # liquidity()
+SELECTOR_DECIMALS = '313ce567'        # decimals()
+
+Q96 = 2 ** 96
+
+# Новый блок Ethereum примерно раз в 12 с: чаще состояние пулов не перечитываем
+BLOCK_TIME = 12.0
+
+# Шаг цены между уровнями стакана, построенного по кривой пула (доля)
+LEVEL_STEP = 0.001
+
+# (адрес контракта, calldata без 0x)
+Call = Tuple[str, str]
+
+
+# ========== ABI ==========
+def _word(value: int) -> str:
+    return format(value, '064x')
+
+
+def _address(address: str) -> str:
+    return address.lower().replace('0x', '').rjust(64, '0')
+
+
+def get_pool_call(token_a: str, token_b: str, fee: int) -> Call:
+    return FACTORY, SELECTOR_GET_POOL + _address(token_a) + _address(token_b) + _word(fee)
+
+
+def block_number_call() -> Call:
+    return MULTICALL3, SELECTOR_BLOCK_NUMBER
+
+
+def slot0_call(pool: str) -> Call:
+    return pool, SELECTOR_SLOT0
+
+
+def liquidity_call(pool: str) -> Call:
+    return pool, SELECTOR_LIQUIDITY
+
+
+def decimals_call(token: str) -> Call:
+    return token, SELECTOR_DECIMALS
+
+
+def encode_aggregate3(calls: List[Call]) -> str:
+    # aggregate3(Call3[] calls), Call3 = (address target, bool allowFailure, bytes callData);
+    # allowFailure везде true: упавший вызов одного пула не роняет весь пакет
+    tuples = []
+    for target, data in calls:
+        padded = data + '0' * (-len(data) % 64)
+        tuples.append(_address(target) + _word(1) + _word(0x60) + _word(len(data) // 2) + padded)
+    offsets, position = [], 32 * len(calls)
+    for encoded in tuples:
+        offsets.append(_word(position))
+        position += len(encoded) // 2
+    return '0x' + SELECTOR_AGGREGATE3 + _word(0x20) + _word(len(calls)) + ''.join(offsets) + ''.join(tuples)
+
+
+def decode_aggregate3(result: str) -> List[Optional[bytes]]:
+    # Result[] = (bool success, bytes returnData)[]; для неудачных вызовов - None
+    data = bytes.fromhex(result[2:] if result.startswith('0x') else result)
+    array = word_at(data, 0)
+    count = word_at(data, array)
+    heads = array + 32
+    decoded = []
+    for i in range(count):
+        item = heads + word_at(data, heads + 32 * i)
+        success = word_at(data, item)
+        start = item + word_at(data, item + 32)
+        size = word_at(data, start)
+        decoded.append(data[start + 32:start + 32 + size] if success and size else None)
+    return decoded
+
+
+def word_at(data: bytes, offset: int = 0) -> int:
+    return int.from_bytes(data[offset:offset + 32], 'big')
+
+
+def address_at(data: bytes, offset: int = 0) -> str:
+    return '0x' + data[offset + 12:offset + 32].hex()
+
+
+# ========== МАТЕМАТИКА ПУЛА ==========
+class PoolState:
+    # Пул в ориентации base/quote. Внутри текущего диапазона тиков ликвидность L постоянна:
+    # виртуальные резервы base = L / s, quote = L * s, где s - корень цены base в сырых единицах quote.
+    # Переходы через границы тиков не учитываются: для глубоких пулов это доли процента цены.
+    __slots__ = ('address', 'fee', 'sqrt_price', 'liquidity', 'base_scale', 'quote_scale')
+
+    def __init__(self, address: str, fee: int, sqrt_price_x96: int, liquidity: int,
+                 base_is_token0: bool, base_decimals: int, quote_decimals: int):
+        sqrt_price = sqrt_price_x96 / Q96
+        self.address = address
+        self.fee = fee / 1e6
+        self.sqrt_price = sqrt_price if base_is_token0 else 1 / sqrt_price
+        self.liquidity = float(liquidity)
+        self.base_scale = 10 ** base_decimals
+        self.quote_scale = 10 ** quote_decimals
+
+    def price(self) -> float:
+        # Средняя цена base в quote без комиссии
+        return self.sqrt_price ** 2 * self.base_scale / self.quote_scale
+
+    def depth(self) -> float:
+        # Виртуальный резерв quote в текущем диапазоне
+        return self.liquidity * self.sqrt_price / self.quote_scale
+
+    def levels(self, side: str, count: int, step: float = LEVEL_STEP) -> List[Tuple[float, float]]:
+        # Кривая пула как стакан: уровень - участок кривой между ценами p*(1+step)^(i-1) и p*(1+step)^i.
+        # Объем уровня - сколько base проходит на этом участке, цена - средняя на нем с комиссией,
+        # так что проход по уровням на сумму сделки дает цену исполнения с проскальзыванием.
+        L = self.liquidity
+        ratio = (1 + step) ** 0.5 if side == 'ask' else (1 + step) ** -0.5
+        scale = self.base_scale / self.quote_scale
+        levels = []
+        low = self.sqrt_price
+        for _ in range(count):
+            high = low * ratio
+            a, b = min(low, high), max(low, high)
+            qty = L * (1 / a - 1 / b) / self.base_scale
+            if side == 'ask':
+                levels.append((a * b * scale / (1 - self.fee), qty))
+            else:
+                levels.append((a * b * scale * (1 - self.fee), qty / (1 - self.fee)))
+            low = high
+        return levels
+
+
+# ========== КЭШ АДРЕСОВ ПУЛОВ ==========
+def pair_key(pair: Tuple[str, str]) -> str:
+    return '/'.join(token.lower() for token in pair)
+
+
+def read_pool_cache(path: str) -> Tuple[Dict[str, List], Dict[str, int]]:
+    # Адреса пулов неизменны (CREATE2 от фабрики): кэш не устаревает.
+    # {'pools': {'0xbase/0xquote': [[адрес, комиссия], ...]}, 'decimals': {'0xtoken': 18}}
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        return cached.get('pools', {}), cached.get('decimals', {})
+    except FileNotFoundError:
+        return {}, {}
+    except Exception as e:
+        print(f"Ошибка чтения кэша пулов {path}: {e}")
+        return {}, {}
+
+
+def write_pool_cache(path: str, pools: Dict[str, List], decimals: Dict[str, int]):
+    # Кэш могут писать несколько воркеров шардов одновременно: у каждого свой временный файл
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'w') as f:
+            json.dump({'pools': pools, 'decimals': decimals}, f, indent=1)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Ошибка записи кэша пулов {path}: {e}")